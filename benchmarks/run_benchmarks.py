@@ -0,0 +1,211 @@
+'''
+@author: Kevin Vecmanis
+
+Offline benchmark suite for PortfolioOptimizer and RebalancingSimulator.  Every case runs on
+a SyntheticPriceSource panel, so no network access or Quandl key is needed, and times each
+stage of a typical run.  The time to import each package module in a fresh interpreter is
+measured as well.  Results are written to a JSON file that can be compared against the
+results of another version to catch performance regressions.
+
+Usage, from the repository root:
+
+    python -m benchmarks.run_benchmarks --cases 12x756 25x1260 --output new.json
+    python -m benchmarks.run_benchmarks --cases 12x756 25x1260 --compare old.json
+'''
+#Standard Python libary imports
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import subprocess
+import numpy as np
+
+#Local imports
+from roboadvisor.datasource import SyntheticPriceSource
+from roboadvisor.optimizer import PortfolioOptimizer
+from roboadvisor.rebalancer import RebalancingSimulator
+
+#3rd party imports
+
+
+def _timed(stages, name, function, *args, **kwargs):
+    '''
+    Runs function with its output suppressed and records its wall and CPU time in seconds
+    under stages[name].
+    '''
+    wall=time.perf_counter()
+    cpu=time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result=function(*args, **kwargs)
+    stages[name]={'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+    return result
+
+
+def run_case(n_assets, n_days, portfolio_size=4, sim_iterations=250, walk_days=252, mc_paths=20, seed=0):
+    '''
+    Times every stage of one optimizer and rebalancer run on a synthetic panel.
+
+    Returns:
+    --------
+        dict, the case settings and the wall and CPU seconds of each stage under 'stages'.
+    '''
+    np.random.seed(seed)
+    source=SyntheticPriceSource(n_assets, n_days, seed=seed)
+    stages={}
+    p=PortfolioOptimizer(source.tickers_, portfolio_size=portfolio_size, price_source=source,
+                         print_init=False, lazy=True, max_pos=0.5)
+    _timed(stages, 'fetch_align', p._fetch_data)
+    _timed(stages, 'package_build', lambda: sum(len(chunk) for chunk in p._iter_packages()))
+    _timed(stages, 'optimize_for_sharpe', p.optimize_for_sharpe)
+    _timed(stages, 'optimize_for_return', p.optimize_for_return)
+    _timed(stages, 'optimize_for_volatility', p.optimize_for_volatility)
+    p.sim_iterations_=sim_iterations
+    _timed(stages, 'portfolio_simulation', p.portfolio_simulation)
+
+    r=_timed(stages, 'rebalancer_init', RebalancingSimulator, p)
+    r.random_walk_iters_=walk_days
+    _timed(stages, 'random_walks', r._random_walks)
+    _timed(stages, 'run_simulation', r.run_simulation)
+    _timed(stages, 'run_monte_carlo', r.run_monte_carlo, iterations=mc_paths, seed=seed)
+
+    return {'n_assets': n_assets,
+            'n_days': n_days,
+            'portfolio_size': portfolio_size,
+            'combinations': int(p.n_combos_),
+            'sim_iterations': sim_iterations,
+            'walk_days': walk_days,
+            'mc_paths': mc_paths,
+            'seed': seed,
+            'stages': stages}
+
+
+#Libraries the package modules should only import on the code paths that use them.
+_optional_modules=('scipy', 'matplotlib', 'quandl')
+
+_import_script='''
+import sys, time, json
+wall=time.perf_counter()
+import %s
+wall=time.perf_counter() - wall
+print(json.dumps({'wall': wall, 'loaded': [name for name in %r if name in sys.modules]}))
+'''
+
+
+def measure_import(module, repeat=3):
+    '''
+    Times importing a module in a fresh interpreter, keeping the fastest of repeat runs, and
+    lists which of the optional libraries the import pulled in.
+
+    Returns:
+    --------
+        dict, the import's 'wall' seconds and the 'loaded' optional libraries.
+    '''
+    best=None
+    for _ in range(max(1, repeat)):
+        output=subprocess.run([sys.executable, '-c', _import_script % (module, _optional_modules)],
+                              capture_output=True, text=True, check=True).stdout
+        run=json.loads(output.strip().splitlines()[-1])
+        if (best is None or run['wall'] < best['wall']):
+            best=run
+    return best
+
+
+def _metadata():
+    try:
+        commit=subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit=''
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform()}
+
+
+def compare(results, baseline, tolerance=0.25):
+    '''
+    Prints the wall time ratio of each stage against a baseline result file and returns the
+    (case, stage, ratio) of every stage more than tolerance slower.
+    '''
+    previous={(case['n_assets'], case['n_days']): case for case in baseline['cases']}
+    regressions=[]
+    for case in results['cases']:
+        old=previous.get((case['n_assets'], case['n_days']))
+        if old is None:
+            continue
+        label='%dx%d' % (case['n_assets'], case['n_days'])
+        regressions+=_compare_stages(label, case['stages'], old['stages'], tolerance)
+    regressions+=_compare_stages('import', results.get('imports', {}), baseline.get('imports', {}), tolerance)
+    return regressions
+
+
+def _compare_stages(label, stages, old_stages, tolerance):
+    regressions=[]
+    for stage, timing in stages.items():
+        if stage not in old_stages:
+            continue
+        ratio=timing['wall'] / max(old_stages[stage]['wall'], 1e-9)
+        flag='  REGRESSION' if ratio > 1 + tolerance else ''
+        print('%-10s %-26s %9.4fs  x%.2f%s' % (label, stage, timing['wall'], ratio, flag))
+        if flag:
+            regressions.append((label, stage, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Offline benchmarks of the optimizer and rebalancer.')
+    parser.add_argument('--cases', nargs='+', default=['12x756', '20x1260'],
+                        help='universe sizes and history lengths as <assets>x<days>')
+    parser.add_argument('--portfolio-size', type=int, default=4)
+    parser.add_argument('--sim-iterations', type=int, default=250)
+    parser.add_argument('--walk-days', type=int, default=252)
+    parser.add_argument('--mc-paths', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per case; the fastest time of each stage is kept')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--imports', nargs='*', default=['roboadvisor.optimizer', 'roboadvisor.rebalancer'],
+                        help='modules whose import time is measured')
+    parser.add_argument('--compare', help='a previous result file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='slowdown ratio above which a stage counts as a regression')
+    args=parser.parse_args(argv)
+
+    results={'meta': _metadata(), 'imports': {}, 'cases': []}
+    for module in args.imports:
+        timing=measure_import(module, args.repeat)
+        results['imports'][module]=timing
+        print('%-10s %-26s %9.4fs wall  loads %s' % ('import', module, timing['wall'], ', '.join(timing['loaded']) or 'nothing optional'))
+    for case in args.cases:
+        n_assets, n_days=(int(x) for x in case.lower().split('x'))
+        result=None
+        for _ in range(max(1, args.repeat)):
+            run=run_case(n_assets, n_days, args.portfolio_size, args.sim_iterations, args.walk_days, args.mc_paths, args.seed)
+            if result is None:
+                result=run
+            else:
+                for stage, timing in run['stages'].items():
+                    if (timing['wall'] < result['stages'][stage]['wall']):
+                        result['stages'][stage]=timing
+        result['repeat']=max(1, args.repeat)
+        results['cases'].append(result)
+        for stage, timing in result['stages'].items():
+            print('%-10s %-26s %9.4fs wall %9.4fs cpu' % (case, stage, timing['wall'], timing['cpu']))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Results written to ' + args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline=json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+#Local imports
+
+#3rd party imports
+
+
+def content_key(frame, **settings):
+    '''
+    Hashes a price panel and the settings that determine what is computed from it into a
+    hex key.  Two runs get the same key exactly when their prices (dates, columns and values)
+    and settings are identical, so the key can't go stale when new bars arrive.
+
+    Parameters:
+    -----------
+        frame : DataFrame
+            The aligned price panel, e.g. PortfolioOptimizer.raw_asset_data.
+        settings :
+            JSON serializable values, e.g. portfolio_size, min_pos and max_pos.
+
+    Returns:
+    --------
+        str, a sha256 hex digest.
+    '''
+    digest=hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in frame.columns]).encode())
+    digest.update(np.ascontiguousarray(frame.index.values.astype('datetime64[ns]').view(np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(frame.values, dtype=float).tobytes())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    '''
+    Two level least-recently-used cache of optimization results.  A small in-memory layer
+    sits in front of a directory of pickled results that is kept under max_bytes by deleting
+    the least recently used files.  File modification times record use, so the eviction order
+    survives restarts and is shared by every process using the directory.
+
+    Parameters:
+    -----------
+        root : str, optional (default=None)
+            Directory the results are stored in.  None keeps results in memory only.
+        max_bytes : int, optional (default=256 * 2**20)
+            Maximum total size of the stored results.
+        memory_items : int, optional (default=32)
+            Maximum number of results kept in memory.
+    '''
+
+    def __init__(self, root=None, max_bytes=256 * 2**20, memory_items=32):
+        self.root_=root
+        self.max_bytes_=max_bytes
+        self.memory_items_=memory_items
+        self.memory_=OrderedDict()
+        self.hits_=0
+        self.misses_=0
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root_, key + '.pkl')
+
+    def _remember(self, key, value):
+        self.memory_[key]=value
+        self.memory_.move_to_end(key)
+        while (len(self.memory_) > self.memory_items_):
+            self.memory_.popitem(last=False)
+
+    def get(self, key):
+        '''
+        Returns the result stored under key, or None.
+        '''
+        if key in self.memory_:
+            self.memory_.move_to_end(key)
+            self.hits_+=1
+            return self.memory_[key]
+        if self.root_ is not None:
+            path=self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    value=pickle.load(f)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                value=None
+            if value is not None:
+                self._remember(key, value)
+                self.hits_+=1
+                return value
+        self.misses_+=1
+        return None
+
+    def put(self, key, value):
+        '''
+        Stores a result under key, then evicts the least recently used stored results until
+        the directory is within max_bytes.
+        '''
+        self._remember(key, value)
+        if self.root_ is None:
+            return
+        path=self._path(key)
+        tmp=path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        entries=[]
+        for name in os.listdir(self.root_):
+            if name.endswith('.pkl'):
+                stat=os.stat(os.path.join(self.root_, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total=sum(size for mtime, size, name in entries)
+        for mtime, size, name in sorted(entries):
+            if (total <= self.max_bytes_):
+                break
+            os.remove(os.path.join(self.root_, name))
+            self.memory_.pop(name[:-len('.pkl')], None)
+            total-=size
+
+    def clear(self):
+        '''
+        Removes every stored result.
+        '''
+        self.memory_.clear()
+        if self.root_ is not None:
+            for name in os.listdir(self.root_):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.root_, name))
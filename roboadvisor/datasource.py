@@ -0,0 +1,302 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import os
+import json
+import numpy as np
+import pandas as pd
+
+#Local imports
+
+#3rd party imports
+
+
+class TickerNotFoundError(Exception):
+    '''
+    Raised by a price source when it has no data for the requested ticker.
+    '''
+    pass
+
+
+class PriceSource:
+    '''
+    Base class for the end-of-day price sources used by PortfolioOptimizer.  A price source
+    only has to implement get(), which returns a DataFrame of daily bars indexed by date with
+    the Quandl EOD column names (Open, High, Low, Close, Volume, ..., Adj_Close).
+
+    Methods:
+    --------
+        get - return the daily bars for one ticker, raising TickerNotFoundError if unknown.
+    '''
+
+    def get(self, ticker, start_date=None):
+        '''
+        Parameters:
+        -----------
+            ticker : str
+                The ticker to fetch.
+            start_date : str or datetime, optional (default=None)
+                Only return bars on or after this date.
+
+        Returns:
+        --------
+            DataFrame, daily bars for the ticker.
+        '''
+        raise NotImplementedError
+
+
+class QuandlSource(PriceSource):
+    '''
+    Fetches end-of-day bars from Quandl.  The quandl package is only imported when data
+    is actually requested, so it is not needed when prices come from a local store.
+
+    Parameters:
+    -----------
+        auth_token : str, optional (default=None)
+            Quandl authentication token.
+        database : str, optional (default='EOD')
+            The Quandl database code to query.
+    '''
+
+    def __init__(self, auth_token=None, database='EOD'):
+        self.auth_token_=auth_token
+        self.database_=database
+
+    def get(self, ticker, start_date=None):
+        import quandl as q
+        from quandl.errors.quandl_error import NotFoundError
+
+        kwargs={'authtoken': self.auth_token_}
+        if start_date is not None:
+            kwargs['start_date']=start_date
+        try:
+            return q.get(self.database_ + '/' + ticker, **kwargs)
+        except NotFoundError:
+            raise TickerNotFoundError(ticker)
+
+
+class LocalPriceStore(PriceSource):
+    '''
+    On-disk columnar store of daily bars.  Each ticker gets its own directory holding one
+    raw binary file per column plus a small JSON header with the column names and row count.
+    Columns are memory-mapped on read and new bars are appended to the end of each file,
+    so refreshing a ticker never rewrites its history.
+
+    The row count in the header is only updated after the column files have been written,
+    which means an interrupted append leaves the previously stored bars readable.
+
+    Parameters:
+    -----------
+        root : str
+            Directory the store lives in.  Created if it doesn't exist.
+    '''
+
+    _index_file='_index.i8'
+    _meta_file='_meta.json'
+
+    def __init__(self, root):
+        self.root_=root
+        os.makedirs(root, exist_ok=True)
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root_, ticker)
+
+    def _read_meta(self, ticker):
+        path=os.path.join(self._ticker_dir(ticker), self._meta_file)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, ticker, meta):
+        path=os.path.join(self._ticker_dir(ticker), self._meta_file)
+        tmp=path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _column_file(column):
+        return column + '.f8'
+
+    def has(self, ticker):
+        '''Whether the store holds any bars for ticker.'''
+        return self._read_meta(ticker) is not None
+
+    def tickers(self):
+        '''List of every ticker held in the store.'''
+        return sorted(t for t in os.listdir(self.root_) if self.has(t))
+
+    def last_date(self, ticker):
+        '''
+        Returns the date of the most recent stored bar, or None if the ticker isn't stored.
+        '''
+        meta=self._read_meta(ticker)
+        if meta is None or meta['rows'] == 0:
+            return None
+        index=self._memmap(ticker, self._index_file, np.int64, meta['rows'])
+        return pd.Timestamp(int(index[-1]), unit='D')
+
+    def _memmap(self, ticker, filename, dtype, rows):
+        path=os.path.join(self._ticker_dir(ticker), filename)
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def get(self, ticker, start_date=None):
+        meta=self._read_meta(ticker)
+        if meta is None:
+            raise TickerNotFoundError(ticker)
+
+        rows=meta['rows']
+        days=self._memmap(ticker, self._index_file, np.int64, rows)
+        first=0
+        if start_date is not None:
+            start=(pd.Timestamp(start_date) - pd.Timestamp(0)).days
+            first=int(np.searchsorted(days, start, side='left'))
+
+        index=pd.DatetimeIndex(days[first:].astype('datetime64[D]'), name='Date')
+        data={}
+        for column in meta['columns']:
+            data[column]=self._memmap(ticker, self._column_file(column), np.float64, rows)[first:]
+        return pd.DataFrame(data, index=index, columns=meta['columns'])
+
+    @staticmethod
+    def _to_days(index):
+        return np.asarray(pd.DatetimeIndex(index).normalize().values.astype('datetime64[D]').astype(np.int64))
+
+    def write(self, ticker, df):
+        '''
+        Replaces everything stored for ticker with the bars in df.
+        '''
+        path=self._ticker_dir(ticker)
+        os.makedirs(path, exist_ok=True)
+        df=df.sort_index()
+        columns=[c for c in df.columns if np.issubdtype(df[c].dtype, np.number)]
+
+        #Invalidate the header first so a crash mid-write can't expose mixed columns.
+        self._write_meta(ticker, {'columns': columns, 'rows': 0})
+        self._to_days(df.index).tofile(os.path.join(path, self._index_file))
+        for column in columns:
+            df[column].to_numpy(dtype=np.float64).tofile(os.path.join(path, self._column_file(column)))
+        self._write_meta(ticker, {'columns': columns, 'rows': len(df)})
+
+    def append(self, ticker, df):
+        '''
+        Appends the bars in df that are newer than the last stored bar for ticker.  If the
+        ticker isn't stored yet this is the same as write().
+
+        Returns:
+        --------
+            int, the number of bars appended.
+        '''
+        meta=self._read_meta(ticker)
+        if meta is None or meta['rows'] == 0:
+            self.write(ticker, df)
+            return len(df)
+
+        df=df.sort_index()
+        last=self.last_date(ticker)
+        df=df[df.index.normalize() > last]
+        if len(df) == 0:
+            return 0
+
+        path=self._ticker_dir(ticker)
+        rows=meta['rows']
+        with open(os.path.join(path, self._index_file), 'r+b') as f:
+            f.seek(rows * 8)
+            f.truncate()
+            self._to_days(df.index).tofile(f)
+        for column in meta['columns']:
+            values=df[column].to_numpy(dtype=np.float64) if column in df else np.full(len(df), np.nan)
+            with open(os.path.join(path, self._column_file(column)), 'r+b') as f:
+                f.seek(rows * 8)
+                f.truncate()
+                values.tofile(f)
+        meta['rows']=rows + len(df)
+        self._write_meta(ticker, meta)
+        return len(df)
+
+
+class CachedPriceSource(PriceSource):
+    '''
+    Serves bars from a LocalPriceStore and only goes to the remote source for tickers the
+    store hasn't seen.  With refresh=True, stored tickers are topped up with any bars newer
+    than the last stored date.
+
+    Parameters:
+    -----------
+        store : LocalPriceStore
+            The local store to read from and write to.
+        remote : PriceSource, optional (default=None)
+            Source used to fill the store, e.g. QuandlSource.  With no remote the store is
+            used read-only.
+        refresh : bool, optional (default=False)
+            Whether to fetch new bars for tickers that are already stored.
+    '''
+
+    def __init__(self, store, remote=None, refresh=False):
+        self.store_=store
+        self.remote_=remote
+        self.refresh_=refresh
+
+    def get(self, ticker, start_date=None):
+        if self.store_.has(ticker):
+            if self.refresh_ and self.remote_ is not None:
+                last=self.store_.last_date(ticker)
+                start=None if last is None else last + pd.Timedelta(days=1)
+                try:
+                    self.store_.append(ticker, self.remote_.get(ticker, start_date=start))
+                except TickerNotFoundError:
+                    pass
+            return self.store_.get(ticker, start_date=start_date)
+
+        if self.remote_ is None:
+            raise TickerNotFoundError(ticker)
+        self.store_.write(ticker, self.remote_.get(ticker))
+        return self.store_.get(ticker, start_date=start_date)
+
+
+class SyntheticPriceSource(PriceSource):
+    '''
+    Generates a reproducible panel of correlated daily bars without any network access, for
+    benchmarks and tests.  Daily log returns follow a factor model: each asset loads on a 
+    market factor and a few other common factors plus its own noise, so the assets are 
+    correlated the way real equities are.  Tickers are named SYN0000, SYN0001, ...
+
+    Parameters:
+    -----------
+        n_assets : int
+            Number of tickers in the panel.
+        n_days : int, optional (default=1260)
+            Number of business days of history.
+        n_factors : int, optional (default=3)
+            Number of common factors driving the correlations.
+        seed : int, optional (default=0)
+            Seed for the generated returns.
+        start : str, optional (default='2010-01-01')
+            Date of the first bar.
+    '''
+
+    def __init__(self, n_assets, n_days=1260, n_factors=3, seed=0, start='2010-01-01'):
+        rng=np.random.default_rng(seed)
+        #The first factor is the market, which every asset loads on positively.
+        loadings=rng.normal(0.0, 0.005, size=(n_factors, n_assets))
+        loadings[0]=rng.uniform(0.004, 0.012, size=n_assets)
+        drift=rng.normal(0.0003, 0.0003, size=n_assets)
+        noise=rng.uniform(0.005, 0.015, size=n_assets)
+        returns=drift + rng.standard_normal((n_days, n_factors)) @ loadings + rng.standard_normal((n_days, n_assets)) * noise
+        self.index_=pd.bdate_range(start, periods=n_days)
+        self.tickers_=['SYN%04d' % i for i in range(n_assets)]
+        self.prices_=100.0 * np.exp(np.cumsum(returns, axis=0))
+
+    def get(self, ticker, start_date=None):
+        if ticker not in self.tickers_:
+            raise TickerNotFoundError(ticker)
+        prices=self.prices_[:, self.tickers_.index(ticker)]
+        df=pd.DataFrame({'Open': prices, 'High': prices, 'Low': prices, 'Close': prices,
+                         'Volume': 1e6, 'Adj_Close': prices}, index=self.index_)
+        if start_date is not None:
+            df=df[df.index >= pd.Timestamp(start_date)]
+        return df
@@ -0,0 +1,166 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+#Local imports
+
+#3rd party imports
+
+
+class StageRecord:
+    '''
+    What was measured for one run of a stage.
+
+    Attributes:
+    -----------
+        name - the stage name, e.g. 'fetch_data' or 'optimize'.
+        title - how the stage is described in printed output.
+        wall - wall clock seconds.
+        cpu - CPU seconds of this process (work done in pool workers isn't included).
+        peak_memory - peak bytes allocated by Python during the stage, or None when memory
+            isn't traced.
+        counts - dict of counters, e.g. tickers fetched or solver iterations.
+        notes - list of informational messages produced during the stage.
+    '''
+
+    def __init__(self, name, title):
+        self.name=name
+        self.title=title
+        self.wall=0.0
+        self.cpu=0.0
+        self.peak_memory=None
+        self.counts={}
+        self.notes=[]
+
+    def count(self, key, n=1):
+        '''
+        Adds n to a counter.
+        '''
+        self.counts[key]=self.counts.get(key, 0) + n
+
+    def note(self, *message):
+        '''
+        Records a message, joined like print() would join its arguments.
+        '''
+        self.notes.append(' '.join(str(part) for part in message))
+
+    def as_dict(self):
+        return {'name': self.name,
+                'wall': self.wall,
+                'cpu': self.cpu,
+                'peak_memory': self.peak_memory,
+                'counts': dict(self.counts)}
+
+
+def print_record(record):
+    '''
+    The printing sink: prints a stage's notes and timing the way PortfolioOptimizer always has.
+    '''
+    for note in record.notes:
+        print(note)
+    print('---')
+    line='Time to %s: %.2f seconds' % (record.title, record.wall)
+    if record.peak_memory is not None:
+        line+=' (peak memory %.1f MB)' % (record.peak_memory / 2**20)
+    print(line)
+    print('---')
+
+
+class Instrumentation:
+    '''
+    Records wall time, CPU time, peak memory and counters for each stage of a run and hands
+    every finished stage to a list of callbacks, for example to export them to a metrics
+    system.  Printing is just another sink, print_record, which verbose switches on and off.
+
+    Parameters:
+    -----------
+        callbacks : list, optional (default=None)
+            Functions called with the StageRecord of every finished stage.
+        verbose : bool, optional (default=True)
+            Whether to print the notes and timing of each stage that isn't nested in another,
+            e.g. run_monte_carlo but not the random walks of each of its paths.
+        trace_memory : bool, optional (default=False)
+            Whether to measure peak memory with tracemalloc, which slows down code that
+            allocates many Python objects.
+
+    Attributes:
+    -----------
+        metrics_ - dict keyed by stage name with the number of 'calls' and the total 'wall',
+            'cpu' and 'counts' and the largest 'peak_memory' over every run of the stage.
+        last_ - dict keyed by stage name with the StageRecord of the stage's latest run.
+    '''
+
+    def __init__(self, callbacks=None, verbose=True, trace_memory=False):
+        self.callbacks_=list(callbacks or [])
+        self.verbose_=verbose
+        self.trace_memory_=trace_memory
+        self.metrics_={}
+        self.last_={}
+        self._memory_stack=[]
+        self._depth=0
+
+    def add_callback(self, callback):
+        self.callbacks_.append(callback)
+
+    @contextmanager
+    def stage(self, name, title=None):
+        '''
+        Measures the code run inside the with block as one run of a stage, and yields the
+        StageRecord so the block can add counts and notes.
+        '''
+        record=StageRecord(name, title or name.replace('_', ' '))
+        started_tracing=False
+        if self.trace_memory_:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing=True
+            #Resetting the peak for a nested stage would lose the enclosing stage's peak so 
+            #far, so it is folded into that stage's running peak first.
+            current, peak=tracemalloc.get_traced_memory()
+            if self._memory_stack:
+                self._memory_stack[-1][1]=max(self._memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._memory_stack.append([current, current])
+        wall=time.perf_counter()
+        cpu=time.process_time()
+        self._depth+=1
+        try:
+            yield record
+        finally:
+            self._depth-=1
+            record.wall=time.perf_counter() - wall
+            record.cpu=time.process_time() - cpu
+            if self.trace_memory_:
+                baseline, running=self._memory_stack.pop()
+                peak=max(running, tracemalloc.get_traced_memory()[1])
+                record.peak_memory=max(peak - baseline, 0)
+                if self._memory_stack:
+                    self._memory_stack[-1][1]=max(self._memory_stack[-1][1], peak)
+                if started_tracing:
+                    tracemalloc.stop()
+        self._record(record)
+
+    def _record(self, record):
+        metrics=self.metrics_.setdefault(record.name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None, 'counts': {}})
+        metrics['calls']+=1
+        metrics['wall']+=record.wall
+        metrics['cpu']+=record.cpu
+        if record.peak_memory is not None:
+            metrics['peak_memory']=max(metrics['peak_memory'] or 0, record.peak_memory)
+        for key, n in record.counts.items():
+            metrics['counts'][key]=metrics['counts'].get(key, 0) + n
+        self.last_[record.name]=record
+        if (self.verbose_ and self._depth == 0):
+            print_record(record)
+        for callback in self.callbacks_:
+            callback(record)
+
+    def as_dict(self):
+        '''
+        A copy of metrics_ that can be serialized.
+        '''
+        return {name: dict(metrics, counts=dict(metrics['counts'])) for name, metrics in self.metrics_.items()}
@@ -0,0 +1,139 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import numpy as np
+
+#Local imports
+from roboadvisor.stats import RunningMoments, QuantileSketch
+
+#3rd party imports
+
+
+class SimulationSummary:
+    '''
+    Aggregate statistics of a Monte Carlo rebalancing simulation, for
+    RebalancingSimulator.run_monte_carlo(summary=True) and each policy of 
+    RebalancingSimulator.sweep_policies().  Each block of paths is folded in as it
+    finishes and then discarded, so memory stays the same whether 100 or a million paths are
+    run.  Blocks are folded in path order, which makes the result independent of how the work
+    was scheduled.
+
+    Parameters:
+    -----------
+        asset_list : list
+            The tickers of the simulated portfolio.
+        target_weights : list
+            The target weight of each asset.
+        relative_accuracy : float, optional (default=0.005)
+            Relative accuracy of the terminal value and drawdown quantiles.
+
+    Attributes:
+    -----------
+        paths_ - number of paths simulated.
+        days_ - number of days in each path.
+        terminal_ - RunningMoments of the terminal portfolio values.
+        terminal_sketch_ - QuantileSketch of the terminal portfolio values.
+        terminal_mean_, terminal_std_ - mean and standard deviation of the terminal values.
+        total_trades_ - number of trades over every path.
+        trades_ - RunningMoments of the number of trades in each path.
+        trades_mean_, trades_std_ - mean and standard deviation of the trades per path.
+        drawdown_ - RunningMoments of the maximum drawdown of each path, as a fraction of the
+            path's running peak value.
+        drawdown_sketch_ - QuantileSketch of the maximum drawdowns.
+        drawdown_mean_ - mean maximum drawdown.
+        max_drawdown_ - the largest drawdown of any path.
+        tracking_ - RunningMoments of the annualized tracking error of each path: the standard
+            deviation of its daily returns less those of the target weights rebalanced daily 
+            at no cost, times the square root of 252.
+        tracking_error_mean_ - mean tracking error.
+        weight_min_, weight_max_, weight_mean_, weight_std_ - per asset minimum, maximum, mean
+            and standard deviation of the weight over every day of every path.
+    '''
+
+    def __init__(self, asset_list, target_weights, relative_accuracy=0.005):
+        self.asset_list_=list(asset_list)
+        self.target_weights_=np.asarray(target_weights, dtype=float)
+        num_assets=len(self.asset_list_)
+        self.paths_=0
+        self.days_=0
+        self.terminal_=RunningMoments(1)
+        self.terminal_sketch_=QuantileSketch(relative_accuracy)
+        self.total_trades_=0
+        self.trades_=RunningMoments(1)
+        self.drawdown_=RunningMoments(1)
+        self.drawdown_sketch_=QuantileSketch(relative_accuracy)
+        self.max_drawdown_=0.0
+        self.tracking_=RunningMoments(1)
+        self.weight_min_=np.full(num_assets, np.inf)
+        self.weight_max_=np.full(num_assets, -np.inf)
+        self._weight_count=0
+        self.weight_mean_=self.target_weights_.copy()
+        self._weight_m2=np.zeros(num_assets)
+        self._set_moments()
+
+    def add_block(self, block):
+        '''
+        Folds in the statistics of a block of paths returned by
+        RebalancingSimulator._step_paths(summarize=True).
+        '''
+        paths=len(block['terminal'])
+        if (paths == 0):
+            return self
+        self.paths_+=paths
+        self.days_=block['days']
+        self.terminal_.extend(block['terminal'][:, None])
+        self.terminal_sketch_.extend(block['terminal'])
+        self.total_trades_+=int(block['trades'].sum())
+        self.trades_.extend(block['trades'][:, None])
+        self.drawdown_.extend(block['drawdown'][:, None])
+        self.drawdown_sketch_.extend(block['drawdown'])
+        self.max_drawdown_=max(self.max_drawdown_, float(block['drawdown'].max()))
+        self.tracking_.extend(block['tracking'][:, None])
+        self.weight_min_=np.minimum(self.weight_min_, block['weight_min'])
+        self.weight_max_=np.maximum(self.weight_max_, block['weight_max'])
+
+        #The block's weight sums are of the deviations from the target weights, which keeps
+        #the sum of squares from cancelling.  They are merged like RunningMoments._merge.
+        count=paths * block['days']
+        if (count > 0):
+            deviation=block['weight_sum'] / count
+            m2=block['weight_sq'] - block['weight_sum'] * deviation
+            total=self._weight_count + count
+            delta=self.target_weights_ + deviation - self.weight_mean_
+            self._weight_m2=self._weight_m2 + m2 + delta * delta * (self._weight_count * count / total)
+            self.weight_mean_=self.weight_mean_ + delta * (count / total)
+            self._weight_count=total
+        self._set_moments()
+        return self
+
+    def _set_moments(self):
+        self.terminal_mean_=float(self.terminal_.mean_[0])
+        self.terminal_std_=float(np.sqrt(self.terminal_.cov()[0, 0]))
+        self.trades_mean_=float(self.trades_.mean_[0])
+        self.trades_std_=float(np.sqrt(self.trades_.cov()[0, 0]))
+        self.drawdown_mean_=float(self.drawdown_.mean_[0])
+        self.tracking_error_mean_=float(self.tracking_.mean_[0])
+        self.weight_std_=np.sqrt(self._weight_m2 / max(self._weight_count - 1, 1))
+
+    def as_dict(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        '''
+        The summary as plain numbers, with the terminal value and drawdown quantiles keyed by q.
+        '''
+        return {'paths': self.paths_,
+                'days': self.days_,
+                'terminal_mean': self.terminal_mean_,
+                'terminal_std': self.terminal_std_,
+                'terminal_quantiles': {q: self.terminal_sketch_.quantile(q) for q in quantiles},
+                'total_trades': self.total_trades_,
+                'trades_mean': self.trades_mean_,
+                'trades_std': self.trades_std_,
+                'drawdown_mean': self.drawdown_mean_,
+                'drawdown_quantiles': {q: self.drawdown_sketch_.quantile(q) for q in quantiles},
+                'max_drawdown': self.max_drawdown_,
+                'tracking_error_mean': self.tracking_error_mean_,
+                'weights': {asset: {'min': float(self.weight_min_[i]),
+                                    'max': float(self.weight_max_[i]),
+                                    'mean': float(self.weight_mean_[i]),
+                                    'std': float(self.weight_std_[i])}
+                            for i, asset in enumerate(self.asset_list_)}}
@@ -0,0 +1,165 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import numpy as np
+
+#Local imports
+from roboadvisor.solvers import max_sharpe_weights, max_return_weights, min_volatility_weights, portfolio_performance
+
+#3rd party imports
+
+
+class Objective:
+    '''
+    Describes one objective PortfolioOptimizer.optimize() can solve for each asset combination.
+
+    Parameters:
+    -----------
+        name : str
+            Key the objective is registered and requested under.
+        solver : callable
+            solver(returns, cov_matrix, bounds, x0, workspace) returning a dict with the optimal 
+            weights under 'x' and the iteration count under 'nit'.  x0 is a feasible starting 
+            point and workspace a SolverWorkspace, both of which the solver may ignore.
+        rank_by : str
+            Which portfolio statistic ranks the results: 'return', 'volatility' or 'sharpe'.
+        largest : bool, optional (default=True)
+            Whether a larger rank_by statistic is better.
+        position_bounds : bool, optional (default=True)
+            Whether the optimizer's min_pos/max_pos apply.  If False weights are bounded by (0, 1).
+        title : str, optional (default=None)
+            Used in the printed report.  Defaults to the name.
+        attr : str, optional (default=None)
+            Results are stored on the optimizer as <attr>_scores_ and best_<attr>_portfolio_.
+            Defaults to the name.
+        warm_start : bool, optional (default=True)
+            Whether the solver benefits from starting at the previous combination's solution.
+        bound : callable, optional (default=None)
+            bound(returns, cov_matrix) returning a cheap optimistic value of the rank_by statistic
+            that no portfolio of the combination can beat, or None.  Used to prune combinations.
+    '''
+
+    _stat_index={'return': 2, 'volatility': 3, 'sharpe': 4}
+    _stat_scale={'return': 100, 'volatility': 100, 'sharpe': 1}
+
+    def __init__(self, name, solver, rank_by, largest=True, position_bounds=True, title=None, attr=None, warm_start=True, bound=None):
+        if rank_by not in self._stat_index:
+            raise ValueError("rank_by must be one of 'return', 'volatility' or 'sharpe'")
+        self.name=name
+        self.solver=solver
+        self.rank_by=rank_by
+        self.largest=largest
+        self.position_bounds=position_bounds
+        self.title=title or name
+        self.attr=attr or name
+        self.warm_start=warm_start
+        self.bound=bound
+
+    def solve_row(self, returns, cov_matrix, bounds, x0, workspace=None):
+        '''
+        Solves the objective for one asset combination.
+
+        Returns:
+        --------
+            row: tuple, the weights rounded to 4 places and the return %, volatility % and 
+                Sharpe ratio computed from them, each rounded to 4 places.
+            optimal: dict, the solver's result with the unrounded weights and iteration count.
+        '''
+        optimal=self.solver(returns, cov_matrix, bounds, x0, workspace)
+        optimal_weights=optimal['x'].round(4)
+        optimal_stats=portfolio_performance(optimal_weights, returns, cov_matrix)
+        row=(optimal_weights,
+             round(optimal_stats[0] * 100, 4),
+             round(optimal_stats[1] * 100, 4),
+             round(optimal_stats[2], 4))
+        return row, optimal
+
+    def score_row(self, row):
+        '''
+        The ranking statistic of a row returned by solve_row().
+        '''
+        return row[self._stat_index[self.rank_by] - 1]
+
+    def can_beat(self, returns, cov_matrix, threshold):
+        '''
+        Whether a combination might produce a score better than threshold.  Returns False
+        only when the objective's bound proves it can't; a small allowance covers the 
+        rounding of weights and statistics in the result entries.
+        '''
+        if (self.bound is None or threshold is None):
+            return True
+        bound=self.bound(returns, cov_matrix)
+        if bound is None:
+            return True
+        bound=bound * self._stat_scale[self.rank_by]
+        slack=1e-3 * abs(threshold) + 1e-4
+        if self.largest:
+            return bound + slack >= threshold
+        return bound - slack <= threshold
+
+
+def tangency_sharpe_bound(returns, cov_matrix):
+    '''
+    Sharpe ratio of the unconstrained tangency portfolio, sqrt(mu' C^-1 mu).  By Cauchy-Schwarz
+    no weights on the same assets have a higher Sharpe ratio.
+    '''
+    try:
+        return np.sqrt(max(returns @ np.linalg.solve(cov_matrix, returns), 0.0))
+    except np.linalg.LinAlgError:
+        return None
+
+
+def best_asset_return_bound(returns, cov_matrix):
+    '''
+    Weights are non-negative and sum to 1, so no portfolio returns more than its best asset.
+    '''
+    return np.max(returns)
+
+
+def min_variance_vol_bound(returns, cov_matrix):
+    '''
+    Volatility of the unconstrained minimum-variance portfolio, 1 / sqrt(1' C^-1 1), which no 
+    fully invested weights on the same assets can go below.
+    '''
+    try:
+        inverse_ones=np.linalg.solve(cov_matrix, np.ones(len(cov_matrix)))
+    except np.linalg.LinAlgError:
+        return None
+    total=inverse_ones.sum()
+    if (total <= 0):
+        return None
+    return np.sqrt(1.0 / total)
+
+
+OBJECTIVES={}
+
+
+def register_objective(objective):
+    '''
+    Registers an Objective so it can be requested by name from PortfolioOptimizer.optimize().
+    '''
+    OBJECTIVES[objective.name]=objective
+    return objective
+
+
+register_objective(Objective('sharpe',
+                             lambda returns, cov_matrix, bounds, x0, workspace: max_sharpe_weights(returns, cov_matrix, bounds, x0, workspace),
+                             rank_by='sharpe',
+                             title='Sharpe Ratio',
+                             bound=tangency_sharpe_bound))
+register_objective(Objective('return',
+                             lambda returns, cov_matrix, bounds, x0, workspace: max_return_weights(returns, bounds, x0, workspace),
+                             rank_by='return',
+                             position_bounds=False,
+                             title='Pure Return',
+                             warm_start=False,
+                             bound=best_asset_return_bound))
+register_objective(Objective('volatility',
+                             lambda returns, cov_matrix, bounds, x0, workspace: min_volatility_weights(cov_matrix, bounds, x0, workspace),
+                             rank_by='volatility',
+                             largest=False,
+                             position_bounds=False,
+                             title='Minimal Volatility',
+                             attr='vol',
+                             bound=min_variance_vol_bound))
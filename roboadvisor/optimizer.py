@@ -2,25 +2,115 @@
 @author: Kevin Vecmanis
 '''
 #Standard Python libary imports
-import matplotlib
 import pandas as pd
 import numpy as np
-import time
 import random
-from itertools import combinations
-import scipy.optimize as optimize
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import numpy as np
-from operator import itemgetter
+from math import comb
 
 #Local imports
-from config import config
+try:
+    from config import config
+except ImportError:
+    config=None
+from roboadvisor.datasource import QuandlSource, TickerNotFoundError
+from roboadvisor.search import iter_combination_chunks, heuristic_search, TopK
+from roboadvisor.solvers import SolverWorkspace, warm_start_weights, project_weights, efficient_frontier
+from roboadvisor.stats import RunningMoments
+from roboadvisor.cache import content_key
+from roboadvisor.results import ResultTable
+from roboadvisor.instrumentation import Instrumentation
+from roboadvisor.profiles import solve_profile_packages, merge_profile_best, _solve_shared_profile_packages
+from roboadvisor.objectives import OBJECTIVES
+from roboadvisor.parallel import SharedArrays, attach_shared, shared, resolve_n_jobs
 
 #3rd party imports
-import quandl as q
-from quandl.errors.quandl_error import NotFoundError 
 
 
 
+def _solve_packages(packages, first_order, universe_mean, universe_cov, objective_names, tickers, min_pos, max_pos, top_k,
+                    warm_start=True, thresholds=None):
+    '''
+    Solves every named objective on a chunk of asset combinations.  This runs in the main 
+    process for a serial run and in pool workers when n_jobs > 1.
+
+    With warm_start, each solve starts from the objective's previous solution in the chunk
+    mapped onto the assets the two combinations share.  All solves share one SolverWorkspace.
+
+    When thresholds are given, a combination is skipped for an objective if the objective's 
+    bound shows it can't beat the current K-th best score, either the threshold passed in 
+    from earlier chunks or the chunk's own.
+
+    Returns:
+    --------
+        list, for each objective a dict with the chunk's top_k results as a ResultTable under 
+        'table', whose orders are the combinations' positions in the overall visit order, and 
+        the 'pruned', 'solves' and solver 'iterations' counts.
+    '''
+    objectives = [OBJECTIVES[name] for name in objective_names]
+    tops = [TopK(top_k, largest=objective.largest) for objective in objectives]
+    counts = [{'pruned': 0, 'solves': 0, 'iterations': 0} for objective in objectives]
+    previous = [None] * len(objectives)
+    rows, num_assets = packages.shape
+    weights = [np.empty((rows, num_assets)) for objective in objectives]
+    stats = [np.empty((rows, 3)) for objective in objectives]
+    solved = [np.zeros(rows, dtype=bool) for objective in objectives]
+    workspace = SolverWorkspace(num_assets)
+    initializer = np.full(num_assets, 1. / num_assets)
+    position_bounds = tuple((min_pos, max_pos) for x in range(num_assets))
+    unit_bounds = tuple((0, 1) for x in range(num_assets))
+
+    for i, package in enumerate(packages):
+        returns = universe_mean[package]
+        cov_matrix = universe_cov[np.ix_(package, package)]
+
+        for j, (objective, top) in enumerate(zip(objectives, tops)):
+            if thresholds is not None:
+                threshold = _best_threshold(objective, thresholds[j], top.threshold())
+                if not objective.can_beat(returns, cov_matrix, threshold):
+                    counts[j]['pruned'] += 1
+                    continue
+            bounds = position_bounds if objective.position_bounds else unit_bounds
+            x0 = initializer
+            if (warm_start and objective.warm_start and previous[j] is not None):
+                x0 = warm_start_weights(previous[j][0], previous[j][1], package, bounds)
+            row, optimal = objective.solve_row(returns, cov_matrix, bounds, x0, workspace)
+            previous[j] = (package, optimal['x'])
+            counts[j]['solves'] += 1
+            counts[j]['iterations'] += optimal['nit']
+            weights[j][i] = row[0]
+            stats[j][i] = row[1:]
+            solved[j][i] = True
+            if thresholds is not None:
+                top.push(objective.score_row(row), order=first_order + i)
+
+    orders = first_order + np.arange(rows)
+    for objective, count, w, stat, mask in zip(objectives, counts, weights, stats, solved):
+        table = ResultTable(w[mask], packages[mask], stat[mask, 0], stat[mask, 1], stat[mask, 2], tickers, orders[mask])
+        count['table'] = table.top(top_k, objective.rank_by, objective.largest)
+    return counts
+
+
+def _best_threshold(objective, a, b):
+    '''
+    The harder of two K-th best scores to beat, ignoring ones that are None.
+    '''
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b) if objective.largest else min(a, b)
+
+
+def _solve_shared_packages(packages, first_order, *settings, thresholds=None):
+    '''
+    Pool worker entry point: _solve_packages on the universe statistics in shared memory.
+    '''
+    return _solve_packages(packages, first_order, shared('mean'), shared('cov'), *settings, thresholds=thresholds)
+
+
 class PortfolioOptimizer:
     '''
     This class object receives a list of assets (tickers) and a portfolio size
@@ -36,46 +126,114 @@ class PortfolioOptimizer:
         portfolio_size: int, optional (default=5)
             The number of assets that should be in the final optimal portfolio. 
         max_iters: int, optional (default=None)
-            The number of times the portfolio simulation should be run by the optimizer.
+            The budget of asset combinations to analyze.  When there are more combinations than
+            this, a uniform random sample of max_iters combinations is analyzed.
         print_init : bool, optional (default=True)
             Whether or not to print the portfolio metrics after initialization.
         max_pos : float, optional (default=1.0)
             The maximum weight that one asset can occupy in a portfolio.  
         min_pos : float, optional (default=0.0)
             The minimum weight that one asset can occupy in a portfolio.
+        price_source : PriceSource, optional (default=None)
+            Where to get daily bars from, e.g. a CachedPriceSource over a LocalPriceStore.  
+            Defaults to querying Quandl directly with the QUANDL_KEY in config/config.py, or
+            without a key when there is no such module.
+        fetch_workers : int, optional (default=8)
+            The maximum number of tickers fetched concurrently. 1 fetches them one at a time.
+        top_k : int, optional (default=100)
+            The number of best portfolios kept for each objective. None keeps every result.
+        chunk_size : int, optional (default=1024)
+            The number of asset combinations streamed through the optimizer at a time.
+        random_state : int, optional (default=None)
+            Seed for sampling combinations when max_iters is smaller than the number of combinations.
+        n_jobs : int, optional (default=1)
+            The number of processes the combinations are optimized on. -1 uses every core.  
+            Results are identical to a serial run, with or without prune.
+        selection : str, optional (default='exhaustive')
+            How asset combinations are chosen. 'exhaustive' solves every combination (up to max_iters). 
+            'heuristic' relaxes each objective over the whole universe, keeps the assets with the 
+            largest weights and refines the set with asset swaps, which scales to universes far too 
+            large to enumerate.
+        prune : bool, optional (default=False)
+            Whether to skip combinations whose cheap upper bound (e.g. the unconstrained tangency 
+            Sharpe ratio) can't beat the current top_k-th best score.  So that results don't 
+            depend on n_jobs, the score a chunk prunes against comes from its own results and 
+            those of the chunks at least 16 before it.  The top_k combinations are the same as 
+            without pruning, but a skipped combination changes which solution the next solve 
+            warm-starts from, so their scores only agree to within solver tolerance.
+        warm_start : bool, optional (default=True)
+            Whether each solve starts from the previous combination's solution mapped onto the 
+            assets they share, rather than from equal weights.
+        lazy : bool, optional (default=False)
+            Whether to defer fetching data and optimizing until fit() is called or a result 
+            attribute is first read.  Only the objectives that are asked for get solved.
+        stats_window : int, optional (default=None)
+            The number of most recent daily returns the mean and covariance are estimated from.
+            None uses the whole history.
+        stats_halflife : float, optional (default=None)
+            Estimate the mean and covariance with exponentially weighted returns whose weight 
+            halves every stats_halflife days, instead of weighting every day equally.
+        result_cache : ResultCache, optional (default=None)
+            Where fit() looks up and stores results, keyed on a hash of the price panel and every 
+            setting that affects them.  A hit restores an objective's results without solving.
+        instrumentation : Instrumentation, optional (default=None)
+            Records the wall time, CPU time, memory and counts of each stage (fetch_data, 
+            optimize, portfolio_simulation, ...) and passes them to its callbacks.  Defaults to 
+            one that prints each stage's timing.  Pass Instrumentation(verbose=False) to silence it.
 
     Attributes:
     ----------- 
         asset_basket_ - the list of assets in its entirety
         asset_errors_ - the number of stock tickers that weren't found on Quandl.
-        cov_matrix_results - list of the covariance matrices for each unique asset combination.
-        return_matrix_results - list of the return matrices for each unique asset combination.
-        asset_combo_list - list of all the unique asset combinations.
+        n_combos_ - the number of unique asset combinations in the universe.
         max_iters_ - number of portfolio combinations to analyze
         portfolio_size_ - the number of assets that can be used in the optimal portfolio
         assets_ - instantiation of an attribute to be used during optimization
         risk_tolerance - maximum volatality client is will to incur. 1.0 = 100%
         raw_asset_data - a master copy of the adjusted close dataframe from our quandl query.
         auth_token - Quandl authentication token
+        price_source_ - the PriceSource bars are fetched from (None means Quandl).
+        fetch_workers_ - the maximum number of concurrent ticker fetches.
         sim_iterations - the number of random portfolio weights to simulate for each asset combination.
-        sim_packages - a master queue of all the asset combinations and corresponding data to be analyzed.
+        sim_returns_ - simulated portfolio returns from portfolio_simulation, one row per asset combination.
+        sim_vols_ - simulated portfolio volatilities from portfolio_simulation, one row per asset combination.
+        sim_sharpes_ - simulated portfolio Sharpe ratios from portfolio_simulation, one row per asset combination.
+        universe_assets_ - the adjusted close column names of every asset in the universe.
+        universe_returns_ - daily log returns of every asset in the universe.
+        universe_mean_ - annualized mean return of every asset in the universe.
+        universe_cov_ - annualized covariance matrix of the whole universe.
+        moments_ - the RunningMoments of the daily log returns that update() adds new bars to.
         _sharpe_ - local variable for storing and passing sharpe score
         _port_return_ - local variable for storing and passing portfolio return
         _port_vol_ - local variable for storing and passing portfolio volatility
         portfolio_stats_ - list portfolio stats for a given asset combo and weight.
-        sharpe_scores_ - comphrehensive matrix of simulation results for sharpe optimization
-        return_scores_ - comphrehensive matrix of simulation results for return optimization
-        vol_scores - comphrehensive matrix of simulation results for colatility optimization
+        pruned_counts_ - the number of combinations pruned for each objective by the last optimize() call.
+        solver_calls_ - the number of solves for each objective in the last optimize() call.
+        solver_iterations_ - the total solver iterations for each objective in the last optimize() call.
+        sharpe_scores_ - ResultTable of the top_k results of sharpe optimization, best first
+        return_scores_ - ResultTable of the top_k results of return optimization, best first
+        vol_scores - ResultTable of the top_k results of volatility optimization, best first
+        fitted_objectives_ - names of the objectives solved so far.
+        cache_hits_ - names of the objectives the last fit() call restored from result_cache.
+        profile_portfolios_ - the best result entry for each profile of the last optimize_profiles() call.
+        frontier_ - the frontier arrays from the last efficient_frontier() call.
+        instrumentation_ - the Instrumentation recording each stage; see its metrics_ and last_.
         
     Methods:
     --------  
+        fit - Fetches the data if needed and solves the requested objectives not solved yet.
+        update - Adds new daily bars to the statistics and re-solves the fitted objectives.
         _fetch_data - Get data from quandl using the list of assets in asset_basket
         _plot_asset_prices - plot the normalized adjusted closes for all the assets.
+        _iter_packages - stream the asset combinations to be analyzed in chunks of universe indices.
         portfolio_simulation - simulate and plot markowitz bullet for one specified asset combination.
+        efficient_frontier - trace the exact constrained efficient frontier of one asset combination.
         portfolio_stats - calculates performance metrics for one set of weights on one asset combination.
+        optimize - Finds the optimal portfolios for several objectives in one pass over the combinations.
         optimize_for_sharpe - Finds the optimal portfolio that provides best Sharpe ratio
         optimize_for_return - Finds the optimal portfolio that provides the best Return.
-        optimize_for_volatility - Finds the optimal portfolio that provides the smallest volatility.      
+        optimize_for_volatility - Finds the optimal portfolio that provides the smallest volatility.
+        optimize_profiles - Finds the best portfolio for each of a batch of client profiles.      
     '''
     
     def __init__(self,
@@ -85,158 +243,442 @@ class PortfolioOptimizer:
                  max_iters=None, 
                  print_init=True, 
                  max_pos=1.0,
-                 min_pos=0.0):
+                 min_pos=0.0,
+                 price_source=None,
+                 fetch_workers=8,
+                 top_k=100,
+                 chunk_size=1024,
+                 random_state=None,
+                 n_jobs=1,
+                 selection='exhaustive',
+                 prune=False,
+                 warm_start=True,
+                 lazy=False,
+                 stats_window=None,
+                 stats_halflife=None,
+                 result_cache=None,
+                 instrumentation=None):
         
         '''
-        Initiation calls four functions and instatiates 7 attributes.
+        Initiation records the configuration and, unless lazy=True, fetches the data and
+        solves the default objectives straight away.  A lazy optimizer does no work until
+        fit() is called or a result attribute such as best_sharpe_portfolio_ is first read,
+        and then only computes what that needs.
         '''
-        matplotlib.use('PS')
         self.max_pos_=max_pos
         self.min_pos_=min_pos
         self.print_init_=print_init
         self.asset_basket_=assets
-        self.max_iters_=max_iters
+        self._max_iters=max_iters
         self.portfolio_size_=portfolio_size
         self.assets_=assets
         self.num_assets_=portfolio_size
         self.risk_tolerance_=risk_tolerance
-        self.auth_token_=config.QUANDL_KEY
+        self.auth_token_=getattr(config, 'QUANDL_KEY', None)
+        self.price_source_=price_source
+        self.fetch_workers_=fetch_workers
+        self.top_k_=top_k
+        self.chunk_size_=chunk_size
+        self.random_state_=random_state
+        self.n_jobs_=n_jobs
+        if selection not in ('exhaustive', 'heuristic'):
+            raise ValueError("selection must be 'exhaustive' or 'heuristic'")
+        self.selection_=selection
+        self.prune_=prune
+        self.warm_start_=warm_start
+        self.stats_window_=stats_window
+        self.stats_halflife_=stats_halflife
+        self.result_cache_=result_cache
+        self.instrumentation_=instrumentation if instrumentation is not None else Instrumentation()
         self.sim_iterations_=2500
-        self._fetch_data()
-        self.optimize_for_sharpe()
-        self.optimize_for_return()
-        self.optimize_for_volatility()
+        self.lazy_=lazy
+        self.fitted_objectives_=[]
+        if not lazy:
+            self.fit()
+
+    #With prune, the number of chunks between a chunk and the last one whose results its
+    #thresholds include.  It bounds how many chunks a pruned run solves at once.
+    _prune_lag=16
+
+    #Attributes set by _fetch_data(), computed on first access by a lazy optimizer.
+    _data_attributes=('raw_asset_data', 'asset_errors_', 'n_combos_', 'max_iters_', 'universe_assets_',
+                      'universe_returns_', 'universe_mean_', 'universe_cov_', 'moments_')
+
+    def __getattr__(self, name):
+        '''
+        Only called when normal attribute lookup fails.  Computes the data or the objective
+        results the missing attribute belongs to and caches them on the instance.
+        '''
+        if (name.startswith('__') or name in ('fitted_objectives_', 'price_source_', 'result_cache_', 'instrumentation_')):
+            raise AttributeError(name)
+        if name in self._data_attributes:
+            self._fetch_data()
+        else:
+            for objective in OBJECTIVES.values():
+                if name in (objective.attr + '_scores_', 'best_' + objective.attr + '_portfolio_'):
+                    self.fit(objectives=[objective.name])
+                    break
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name)) from None
+
+    def fit(self, objectives=None):
+        '''
+        Fetches the data if it hasn't been yet and solves the requested objectives that 
+        haven't been solved already.  Results are cached on the instance, so repeated calls
+        are free, and in result_cache when one is set, so identical runs are only solved once.
+
+        Parameters:
+        -----------
+            objectives: list, optional (default=None)
+                Names of registered objectives to solve.  Defaults to 'sharpe', 'return' 
+                and 'volatility'.
+
+        Returns:
+        --------
+            self
+        '''
+        if objectives is None:
+            objectives=['sharpe', 'return', 'volatility']
+        if 'universe_cov_' not in self.__dict__:
+            self._fetch_data()
+        missing=[name for name in objectives if name not in self.fitted_objectives_]
+        self.cache_hits_=[]
+        if self.result_cache_ is not None:
+            for name in list(missing):
+                scores=self.result_cache_.get(self._result_key(name))
+                if scores is not None:
+                    self._set_scores(OBJECTIVES[name], scores)
+                    self.cache_hits_.append(name)
+                    missing.remove(name)
+        if missing:
+            self.optimize(objectives=missing)
+            if self.result_cache_ is not None:
+                for name in missing:
+                    self.result_cache_.put(self._result_key(name), getattr(self, OBJECTIVES[name].attr + '_scores_'))
+        return self
+
+    def _result_key(self, name):
+        '''
+        The result_cache key of an objective's results: a hash of the price panel and of 
+        every setting the results depend on.
+        '''
+        return content_key(self.raw_asset_data,
+                           objective=name,
+                           portfolio_size=self.portfolio_size_,
+                           min_pos=self.min_pos_,
+                           max_pos=self.max_pos_,
+                           max_iters=self.max_iters_,
+                           random_state=self.random_state_,
+                           top_k=self.top_k_,
+                           chunk_size=self.chunk_size_,
+                           selection=self.selection_,
+                           prune=self.prune_,
+                           warm_start=self.warm_start_,
+                           stats_window=self.stats_window_,
+                           stats_halflife=self.stats_halflife_)
            
     def _fetch_data(self):
         '''
         this function inherits the class and declares additional class attributes
-        pertaining to the data we'll need for analysis.  We fetch data from quandl and 
-        declare the following class attributes. sim_packages gets passed to our optimization
-        functions where it gets iterated through during analysis.
+        pertaining to the data we'll need for analysis.  We fetch data from the price source and 
+        declare the following class attributes. The universe statistics get sliced by our 
+        optimization functions for each combination streamed from _iter_packages.
         
         asset_errors_
-        asset_combos_
+        n_combos_
+        max_iters_
         raw_asset_data
-        sim_packages
+        universe_mean_
+        universe_cov_
+        moments_
         
         Returns:   
             None
         '''
-        start=time.time()
-        count=0
-        auth_tok = self.auth_token_
+        with self.instrumentation_.stage('fetch_data', 'fetch data') as stage:
+            source=self.price_source_
+            if source is None:
+                source=QuandlSource(auth_token=self.auth_token_)
 
-        self.asset_errors_=[]
-        self.cov_matrix_results=[]
-        self.return_matrix_results=[]
-        self.asset_combo_list=[]
-        df=pd.DataFrame()
-        
-        #Because we will potentially be merging multiple tickers, we want to rename
-        #all of the income column names so that they can be identified by their ticker name.
-        
-        for asset in self.asset_basket_:        
-            if (count==0):      
-                try:      
-                    df=q.get('EOD/' + asset, authtoken = auth_tok)                      
-                    column_names=list(df)
-                    for i in range(len(column_names)):
-                        column_names[i] = asset + '_' + column_names[i]
-                    df.columns = column_names   
-                    count += 1                 
-                except NotFoundError:
-                    self.asset_errors_.append(asset)                               
-            else:           
-                try:     
-                    temp = q.get('EOD/' + asset, authtoken = auth_tok)       
-                    column_names=list(temp)
-                    for i in range(len(column_names)):
-                        column_names[i] = asset + '_' + column_names[i]                 
-                    temp.columns = column_names
-                    df = pd.merge(df, temp, how='outer', left_index=True, right_index=True)            
-                except NotFoundError:
-                    self.asset_errors_.append(asset)      
-
-        df = df.dropna()
-        features=[f for f in list(df) if "Adj_Close" in f]
-        df=df[features]
-        self.raw_asset_data=df.copy()
-        self.asset_combos_=list([combo for combo in combinations(features, self.portfolio_size_)])
-        print('Number of unique asset combinations: ', len(self.asset_combos_))
+            self.asset_errors_=[]
+
+            def _get_adj_close(asset):
+                try:
+                    return source.get(asset)['Adj_Close']
+                except TickerNotFoundError:
+                    return None
+
+            #Tickers are fetched on a bounded thread pool since the work is almost all
+            #network latency.  map() hands results back in basket order.
+            workers=max(1, min(self.fetch_workers_, len(self.asset_basket_)))
+            if (workers == 1):
+                fetched=[_get_adj_close(asset) for asset in self.asset_basket_]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    fetched=list(pool.map(_get_adj_close, self.asset_basket_))
+
+            #We only keep the adjusted closes, renamed so that they can be identified by their 
+            #ticker name, and align them all in a single outer join.
+            series=[]
+            for asset, adj_close in zip(self.asset_basket_, fetched):
+                if adj_close is None:
+                    self.asset_errors_.append(asset)
+                else:
+                    series.append(adj_close.rename(asset + '_Adj_Close'))
+
+            df=pd.concat(series, axis=1, join='outer') if series else pd.DataFrame()
+            df = df.dropna()
+            features=list(df)
+            self.raw_asset_data=df.copy()
+            self.n_combos_=comb(len(features), self.portfolio_size_)
+            stage.note('Number of unique asset combinations: ', self.n_combos_)
         
-        if (self.max_iters_ == None):
-            self.max_iters_ = len(self.asset_combos_)
+            #max_iters is the requested budget, max_iters_ the number actually analyzed.
+            self.max_iters_ = self._max_iters
+            if (self.max_iters_ == None):
+                self.max_iters_ = self.n_combos_
         
-        elif (len(self.asset_combos_) < self.max_iters_):            
-            self.max_iters_ = len(self.asset_combos_)
+            elif (self.n_combos_ < self.max_iters_):            
+                self.max_iters_ = self.n_combos_
                 
-        print('Analyzing ' + str(self.max_iters_) + ' of ' + str(len(self.asset_combos_)) + ' asset combinations...')
+            stage.note('Analyzing ' + str(self.max_iters_) + ' of ' + str(self.n_combos_) + ' asset combinations...')
         
-        self.sim_packages=[] 
-        for i in range(self.max_iters_):     
-            assets = list(self.asset_combos_[i])        
-            filtered_df = df[assets].copy()
-            returns = np.log(filtered_df / filtered_df.shift(1))
-            return_matrix = returns.mean() * 252  # Generate annualized return matrix
-            cov_matrix = returns.cov() * 252  # Generate annualized covariance matrix
-            self.num_assets_ = len(assets)
-            self.sim_packages.append([assets, cov_matrix, return_matrix])
+            #Log returns, mean vector and covariance matrix are computed once for the whole
+            #universe.  Each package is just a row of column indices into them.
+            prices=df.values
+            returns=np.log(prices[1:] / prices[:-1])
+            self.universe_assets_=features
+            self.universe_returns_=returns
+            self.moments_=RunningMoments(len(features), window=self.stats_window_, halflife=self.stats_halflife_)
+            self.moments_.extend(returns)
+            self._set_universe_stats()
         
-        print('Omitted assets: ', self.asset_errors_)
-        print('---')
-        print('Time to fetch data: %.2f seconds' % (time.time() - start))
-        print('---')
+            stage.note('Omitted assets: ', self.asset_errors_)
+            stage.count('tickers_requested', len(self.asset_basket_))
+            stage.count('tickers_fetched', len(features))
+            stage.count('tickers_omitted', len(self.asset_errors_))
+            stage.count('bars', len(df))
+            stage.count('combinations', self.n_combos_)
+            stage.count('combinations_analyzed', self.max_iters_)
     
-    def portfolio_simulation(self):
+    def _set_universe_stats(self):
+        '''
+        Annualizes the running daily statistics into universe_mean_ and universe_cov_.
+        '''
+        self.universe_mean_=self.moments_.mean_ * 252  # Annualized return vector
+        self.universe_cov_=np.atleast_2d(self.moments_.cov()) * 252  # Annualized covariance matrix
+
+    def update(self, new_prices, full=False):
+        '''
+        Brings the optimizer up to date with new daily bars without refetching the history.
+        The log returns of the new bars are pushed into moments_, which only costs an update 
+        of the mean and covariance, and every fitted objective is re-solved starting from the 
+        previous optimal weights.
+
+        By default only the combinations in each objective's current top_k results are 
+        re-solved and re-ranked, which takes a fraction of a full optimization.  A day's bar 
+        rarely moves a combination from outside the top_k to the top, but full=True re-runs 
+        optimize() over every combination when that matters.
+
+        Parameters:
+        -----------
+            new_prices: DataFrame or Series
+                Adjusted closes of every asset in the universe, one row per new day, with 
+                columns named by ticker (or by the '<ticker>_Adj_Close' column names).  A Series 
+                indexed by ticker is taken as a single bar dated by its name.  Dates may be 
+                anything pd.to_datetime accepts, e.g. '2019-03-01'.  Rows dated on or before 
+                the last stored bar are ignored.
+            full: bool, optional (default=False)
+                Whether to re-optimize over every combination instead of re-solving the 
+                current top_k results.
+
+        Returns:
+        --------
+            self
+        '''
+        if isinstance(new_prices, pd.Series):
+            if new_prices.name is None:
+                raise ValueError('A Series of new prices must be named by the date of its bar')
+            new_prices=new_prices.to_frame().T
+        new_prices=new_prices.set_axis(pd.to_datetime(new_prices.index), axis=0)
+        new_prices=new_prices.rename(columns=lambda column: column if column.endswith('_Adj_Close') else column + '_Adj_Close')
+        missing=[asset for asset in self.universe_assets_ if asset not in new_prices.columns]
+        if missing:
+            raise ValueError('new_prices has no prices for ' + ', '.join(missing))
+        new_prices=new_prices[self.universe_assets_].dropna()
+        new_prices=new_prices[new_prices.index > self.raw_asset_data.index[-1]]
+        if (len(new_prices) == 0):
+            return self
+
+        with self.instrumentation_.stage('update') as stage:
+            prices=np.vstack([self.raw_asset_data.values[-1:], new_prices.values.astype(float)])
+            returns=np.log(prices[1:] / prices[:-1])
+            self.raw_asset_data=pd.concat([self.raw_asset_data, new_prices])
+            self.universe_returns_=np.vstack([self.universe_returns_, returns])
+            self.moments_.extend(returns)
+            self._set_universe_stats()
+            stage.count('bars', len(new_prices))
+
+            if full:
+                fitted=list(self.fitted_objectives_)
+                if fitted:
+                    self.optimize(objectives=fitted)
+                return self
+            for name in self.fitted_objectives_:
+                self._resolve_scores(OBJECTIVES[name])
+                stage.count('solver_calls', self.solver_calls_[name])
+                stage.count('solver_iterations', self.solver_iterations_[name])
+            return self
+
+    def _resolve_scores(self, objective):
+        '''
+        Re-solves the combinations in an objective's current results on the current universe 
+        statistics, each starting from its previous optimal weights, and re-ranks them.
+        '''
+        scores=getattr(self, objective.attr + '_scores_')
+        rows, num_assets=scores.packages_.shape
+        workspace=SolverWorkspace(num_assets)
+        if objective.position_bounds:
+            bounds=tuple((self.min_pos_, self.max_pos_) for x in range(num_assets))
+        else:
+            bounds=tuple((0, 1) for x in range(num_assets))
+
+        weights=np.empty((rows, num_assets))
+        stats=np.empty((rows, 3))
+        iterations=0
+        for i, package in enumerate(scores.packages_):
+            row, optimal=objective.solve_row(self.universe_mean_[package],
+                                             self.universe_cov_[np.ix_(package, package)],
+                                             bounds,
+                                             project_weights(scores.weights_[i], bounds),
+                                             workspace)
+            iterations+=optimal['nit']
+            weights[i]=row[0]
+            stats[i]=row[1:]
+
+        self.solver_calls_[objective.name]=rows
+        self.solver_iterations_[objective.name]=iterations
+        table=ResultTable(weights, scores.packages_, stats[:, 0], stats[:, 1], stats[:, 2], scores.tickers_)
+        self._set_scores(objective, table.top(self.top_k_, objective.rank_by, objective.largest))
+
+    def _set_scores(self, objective, scores):
+        '''
+        Stores an objective's ranked ResultTable as <attr>_scores_ and its best entry as 
+        best_<attr>_portfolio_, and prints the report.
+        '''
+        setattr(self, objective.attr + '_scores_', scores)
+        setattr(self, 'best_' + objective.attr + '_portfolio_', scores[0])
+        if (self.print_init_ == True):
+            self._print_portfolio(objective.title, scores[0])
+        if objective.name not in self.fitted_objectives_:
+            self.fitted_objectives_.append(objective.name)
+
+    def _iter_packages(self):
+        '''
+        Streams the asset combinations to be analyzed as (rows, portfolio_size) arrays of 
+        universe indices, chunk_size rows at a time.
+        '''
+        return iter_combination_chunks(len(self.universe_assets_),
+                                       self.portfolio_size_,
+                                       max_iters=self.max_iters_,
+                                       chunk_size=self.chunk_size_,
+                                       seed=self.random_state_)
+
+    def portfolio_simulation(self, batch_size=64):
         '''
         Runs a simulation by randomly selecting portfolio weights a specified
         number of times (iterations), returns the list of results and plots 
         all the portfolios as well.
+
+        Weights for a whole block of combinations are drawn in one call and the 
+        returns and volatilities come from batched matrix products, written straight
+        into preallocated sim_returns_, sim_vols_ and sim_sharpes_ arrays with one 
+        row per combination.
+
+        Parameters:
+        -----------
+            batch_size: int, optional (default=64)
+                The number of asset combinations simulated together in one block.
         
         Returns:
         -------
             port_returns: array, array of all the simulated portfolio returns.
             port_vols: array, array of all the simulated portfolio volatilities.
         '''
-        start=time.time()
-        iterations=self.sim_iterations_
-        self.simulation_results=[]
+        with self.instrumentation_.stage('portfolio_simulation', 'simulate portfolios') as stage:
+            iterations=self.sim_iterations_
+            num_assets=self.portfolio_size_
+            self.simulation_results=[]
+            self.sim_returns_=np.empty((self.max_iters_, iterations))
+            self.sim_vols_=np.empty((self.max_iters_, iterations))
+            self.sim_sharpes_=np.empty((self.max_iters_, iterations))
+            alpha=np.ones(num_assets)
+            row=0
         
-        #Take a copy of simulation packages so that the original copy isn't altered
-        sim_packages=self.sim_packages.copy()
-        
-        #Loop through each return and covariance matrix from all the asset combos.
-        for _ in range(len(self.sim_packages)):
-            #pop a simulation package and load returns, cov_matrix, and asset list from it.
-            sim=sim_packages.pop()
-            returns=np.array(sim[2])
-            cov_matrix=np.array(sim[1])
-            assets=sim[0]
-                       
-            port_sharpes=[]
-            port_returns=[]
-            port_vols=[]
-                        
-            for _ in range (iterations):
-                weights=np.random.dirichlet(np.ones(self.num_assets_), size=1)
-                weights=weights[0]
-                ret=np.sum(returns * weights)
-                vol=np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-                port_returns.append(ret)
-                port_vols.append(vol)
-                port_sharpes.append(ret / vol)
-            
-            #Declare additional class attributes from the results
-            port_returns=np.array(port_returns)
-            port_vols=np.array(port_vols)
-            port_sharpes=np.array(port_sharpes)            
-            self.simulation_results.append([assets, port_returns,port_vols, port_sharpes])
+            #Loop through blocks of asset combos.
+            for chunk in self._iter_packages():
+                for first in range(0, len(chunk), batch_size):
+                    block=chunk[first:first + batch_size]
+                    rows=slice(row, row + len(block))
+                    returns=self.universe_mean_[block]
+                    cov_matrix=self.universe_cov_[block[:, :, None], block[:, None, :]]
+
+                    #weights has shape (combos, iterations, assets).
+                    weights=np.random.dirichlet(alpha, size=(len(block), iterations))
+                    np.einsum('bik,bk->bi', weights, returns, out=self.sim_returns_[rows])
+                    np.sqrt(np.einsum('bik,bik->bi', weights @ cov_matrix, weights), out=self.sim_vols_[rows])
+                    np.divide(self.sim_returns_[rows], self.sim_vols_[rows], out=self.sim_sharpes_[rows])
+
+                    for i, package in enumerate(block):
+                        assets=[self.universe_assets_[j] for j in package]
+                        self.simulation_results.append([assets, 
+                                                        self.sim_returns_[row + i],
+                                                        self.sim_vols_[row + i], 
+                                                        self.sim_sharpes_[row + i]])
+                    row+=len(block)
      
-        print('---')
-        print('Time to simulate portfolios: %.2f seconds' % (time.time() - start))
-        print('---')
+            stage.count('combinations', row)
+            stage.count('simulations', row * iterations)
         
-    def portfolio_stats(self,weights):
+    def efficient_frontier(self, assets=None, n_points=50):
+        '''
+        Traces the efficient frontier of one asset combination under the min_pos/max_pos 
+        bounds, from its minimum volatility portfolio up to its maximum return portfolio.  
+        Every point is an exact solve, so a few dozen points replace the thousands of random 
+        weights portfolio_simulation draws per combination.
+
+        Parameters:
+        -----------
+            assets: list, optional (default=None)
+                Tickers of the combination.  Defaults to the assets of best_sharpe_portfolio_.
+            n_points: int, optional (default=50)
+                The number of points on the frontier.
+
+        Returns:
+        --------
+            dict, the tickers under 'tickers' and arrays 'weights' (n_points, assets), 
+            'returns', 'vols' and 'sharpes' of the frontier portfolios as annualized 
+            fractions, in order of increasing return.  Also stored as frontier_.
+        '''
+        if assets is None:
+            assets=[ticker for ticker, weight in self.best_sharpe_portfolio_[1]]
+        index={asset.split('_')[0]: i for i, asset in enumerate(self.universe_assets_)}
+        missing=[ticker for ticker in assets if ticker not in index]
+        if missing:
+            raise ValueError('Not in the universe: ' + ', '.join(missing))
+        package=np.array([index[ticker] for ticker in assets], dtype=np.intp)
+        bounds=tuple((self.min_pos_, self.max_pos_) for x in range(len(package)))
+        frontier=efficient_frontier(self.universe_mean_[package],
+                                    self.universe_cov_[np.ix_(package, package)],
+                                    bounds,
+                                    n_points)
+        frontier['tickers']=list(assets)
+        self.frontier_=frontier
+        return frontier
+
+    def portfolio_stats(self,weights,assets=None):
         '''
         We can gather the portfolio performance metrics for a specific set of weights.
         This function will be important because we'll want to pass it to an optmization
@@ -248,12 +690,24 @@ class PortfolioOptimizer:
         Paramaters: 
         ----------
             weights: array, asset weights in the portfolio.
+            assets: list, optional (default=None)
+                Tickers of the combination, in the order of the weights.  Defaults to the 
+                assets of best_sharpe_portfolio_.
         
         Returns: 
         --------
             array, portfolio statistics - mean, volatility, sharp ratio.
         
         '''        
+        if assets is None:
+            assets=[ticker for ticker, weight in self.best_sharpe_portfolio_[1]]
+        index={asset.split('_')[0]: i for i, asset in enumerate(self.universe_assets_)}
+        missing=[ticker for ticker in assets if ticker not in index]
+        if missing:
+            raise ValueError('Not in the universe: ' + ', '.join(missing))
+        package=np.array([index[ticker] for ticker in assets], dtype=np.intp)
+        self.return_matrix_=self.universe_mean_[package]
+        self.cov_matrix_=self.universe_cov_[np.ix_(package, package)]
         returns=self.return_matrix_
         cov_matrix=self.cov_matrix_
         
@@ -271,196 +725,201 @@ class PortfolioOptimizer:
         
         return np.array(stats)
 
-    def optimize_for_sharpe(self):
-        '''Optimization function to optimize on Sharpe Ratio.
-        ''' 
-        min_con = self.min_pos_
-        max_con = self.max_pos_  
-        num_assets = self.portfolio_size_     
-
-        constraints = ({'type':'eq', 'fun': lambda x: np.sum(x) -1})
-        bounds= tuple((min_con, max_con) for x in range(num_assets))
-        initializer=num_assets * [1. / num_assets,]
-        sim_packages=self.sim_packages.copy()
-            
-        def _maximize_sharpe(weights):     
-            self.portfolio_stats(weights)
-            sharpe=self._sharpe_         
-            return -sharpe
-           
-        self.sharpe_scores_=[]
-
-        for _ in range(len(sim_packages)):
-
-            sim=sim_packages.pop()
-            self.return_matrix_=np.array(sim[2])
-            self.cov_matrix_=np.array(sim[1])
-            self.assets_=sim[0]
-            
-            optimal_sharpe=optimize.minimize(
-                _maximize_sharpe,
-                initializer,
-                method = 'SLSQP',
-                bounds = bounds,
-                constraints = constraints,
-            )
-            
-            optimal_sharpe_weights_ = optimal_sharpe['x'].round(4)
-            optimal_sharpe_stats_ = self.portfolio_stats(optimal_sharpe_weights_)
-            
-            #Here we just stripe our the 'Adj_close' tag from the asset list
-            x = self.assets_
-            asset_list = []
-            for i in range(len(x)):
-                temp=x[i].split('_')
-                asset_list.append(temp[0])            
-            
-            optimal_sharpe_portfolio_ = list(zip(asset_list, list(optimal_sharpe_weights_)))
-            self.sharpe_scores_.append([optimal_sharpe_weights_,
-                                        optimal_sharpe_portfolio_,
-                                        round(optimal_sharpe_stats_[0] * 100, 4),
-                                        round(optimal_sharpe_stats_[1] * 100, 4),
-                                        round(optimal_sharpe_stats_[2], 4)])
-        
-        self.sharpe_scores_ = sorted(self.sharpe_scores_, key = itemgetter(4), reverse=True)
-        self.best_sharpe_portfolio_ = self.sharpe_scores_[0]
-        temp = self.best_sharpe_portfolio_
-        
-        print('-----------------------------------------------')
-        print('----- Portfolio Optimized for Sharpe Ratio ----')
-        print('-----------------------------------------------')
+    def optimize(self, objectives=None):
+        '''
+        Single-pass optimization driver.  Each asset combination is visited once, its 
+        inputs are sliced once, and then every requested objective is solved on it.  With 
+        n_jobs > 1 chunks of combinations are spread over a process pool that maps the 
+        universe statistics from shared memory.  For each objective the top_k results are 
+        stored as a ResultTable <attr>_scores_ (best first) and the best one as 
+        best_<attr>_portfolio_, e.g. sharpe_scores_ and best_sharpe_portfolio_.
+
+        Parameters:
+        -----------
+            objectives: list, optional (default=None)
+                Names of registered objectives to solve.  Defaults to 'sharpe', 'return' 
+                and 'volatility'.  See roboadvisor.objectives.register_objective.
+        '''
+        if objectives is None:
+            objectives=['sharpe', 'return', 'volatility']
+        names = list(objectives)
+        objectives = [OBJECTIVES[name] for name in names]
+        with self.instrumentation_.stage('optimize', 'optimize ' + ', '.join(names)) as stage:
+            tickers = [asset.split('_')[0] for asset in self.universe_assets_]
+            tables = [ResultTable.empty(self.portfolio_size_, tickers) for objective in objectives]
+            settings = (names, tickers, self.min_pos_, self.max_pos_, self.top_k_, self.warm_start_)
+            n_jobs = resolve_n_jobs(self.n_jobs_)
+
+            self.pruned_counts_ = dict.fromkeys(names, 0)
+            self.solver_calls_ = dict.fromkeys(names, 0)
+            self.solver_iterations_ = dict.fromkeys(names, 0)
+
+            def _merge(partials):
+                for j, (objective, partial) in enumerate(zip(objectives, partials)):
+                    self.pruned_counts_[objective.name] += partial['pruned']
+                    self.solver_calls_[objective.name] += partial['solves']
+                    self.solver_iterations_[objective.name] += partial['iterations']
+                    tables[j] = ResultTable.concat([tables[j], partial['table']]).top(self.top_k_, objective.rank_by, objective.largest)
+
+            def _thresholds():
+                if not self.prune_:
+                    return None
+                return [table.threshold(self.top_k_, objective.rank_by, objective.largest)
+                        for objective, table in zip(objectives, tables)]
+
+            #Chunk i is merged before chunk i + lag is started.  With prune, chunk i is pruned
+            #against the merged results of chunks 0..i - _prune_lag, whatever n_jobs is, so a
+            #parallel run prunes exactly like a serial one with up to _prune_lag chunks in flight.
+            if self.prune_:
+                lag = self._prune_lag
+            else:
+                lag = 1 if n_jobs == 1 else 2 * n_jobs
+
+            if (self.selection_ == 'heuristic'):
+                _merge([heuristic_search(objective, self.universe_mean_, self.universe_cov_, tickers,
+                                         self.portfolio_size_, self.min_pos_, self.max_pos_, self.top_k_)
+                        for objective in objectives])
+            elif (n_jobs == 1):
+                pending = deque()
+                order = 0
+                for i, chunk in enumerate(self._iter_packages()):
+                    while (pending and pending[0][0] <= i - lag):
+                        _merge(pending.popleft()[1])
+                    pending.append((i, _solve_packages(chunk, order, self.universe_mean_, self.universe_cov_, *settings,
+                                                       thresholds=_thresholds())))
+                    order += len(chunk)
+                while pending:
+                    _merge(pending.popleft()[1])
+            else:
+                #Each chunk carries the visit order of its first combination, so results can be
+                #merged as they complete and still rank exactly like a serial run.
+                with SharedArrays({'mean': self.universe_mean_, 'cov': self.universe_cov_}) as arrays, \
+                     ProcessPoolExecutor(max_workers=n_jobs, initializer=attach_shared, initargs=(arrays.specs_,)) as pool:
+                    pending = deque()
+                    order = 0
+                    for i, chunk in enumerate(self._iter_packages()):
+                        while (pending and pending[0][0] <= i - lag):
+                            _merge(pending.popleft()[1].result())
+                        pending.append((i, pool.submit(_solve_shared_packages, chunk, order, *settings,
+                                                       thresholds=_thresholds())))
+                        order += len(chunk)
+                    while pending:
+                        _merge(pending.popleft()[1].result())
+
+            if self.prune_:
+                for name in names:
+                    stage.note('Combinations pruned for ' + name + ': ' + str(self.pruned_counts_[name]) + ' of ' + str(self.max_iters_))
+            if (self.selection_ == 'exhaustive'):
+                stage.count('combinations', self.max_iters_)
+            stage.count('solver_calls', sum(self.solver_calls_.values()))
+            stage.count('solver_iterations', sum(self.solver_iterations_.values()))
+            stage.count('pruned', sum(self.pruned_counts_.values()))
+
+        for objective, table in zip(objectives, tables):
+            self._set_scores(objective, table)
+
+    def optimize_profiles(self, profiles, max_iters=None, n_jobs=None):
+        '''
+        Finds the highest Sharpe ratio portfolio for each of a batch of ClientProfiles, 
+        against the universe statistics this optimizer has already computed, so onboarding 
+        many clients costs one data load.  Profiles sharing a portfolio size and position 
+        bounds are solved in the same pass over the combinations, and each combination is 
+        only solved once for all the volatility caps above its maximum Sharpe portfolio's 
+        volatility.  With n_jobs > 1 chunks of combinations are solved on a process pool.
+
+        Parameters:
+        -----------
+            profiles: list
+                ClientProfiles to optimize for.
+            max_iters: int, optional (default=None)
+                The budget of combinations to analyze for each portfolio size.  None analyzes 
+                every combination.
+            n_jobs: int, optional (default=None)
+                The number of processes to use.  Defaults to the optimizer's n_jobs.
+
+        Returns:
+        --------
+            list, the best result entry for each profile, in order, or None for a profile 
+            whose volatility cap no combination can meet.  Also stored as profile_portfolios_.
+        '''
+        n_jobs = resolve_n_jobs(self.n_jobs_ if n_jobs is None else n_jobs)
+        tickers = [asset.split('_')[0] for asset in self.universe_assets_]
+        groups = {}
+        for i, profile in enumerate(profiles):
+            groups.setdefault(profile.group_key(), []).append(i)
+
+        def _cap(profile):
+            return np.inf if profile.max_vol is None else profile.max_vol / 100
+
+        with self.instrumentation_.stage('optimize_profiles', 'optimize client profiles') as stage:
+            results = [None] * len(profiles)
+            for (portfolio_size, min_pos, max_pos), members in groups.items():
+                caps = np.unique([_cap(profiles[i]) for i in members])
+                settings = (caps, min_pos, max_pos)
+                best = [None] * len(caps)
+                chunks = iter_combination_chunks(len(self.universe_assets_), portfolio_size, max_iters=max_iters,
+                                                 chunk_size=self.chunk_size_, seed=self.random_state_)
+                if (n_jobs == 1):
+                    order = 0
+                    for chunk in chunks:
+                        merge_profile_best(best, solve_profile_packages(chunk, order, self.universe_mean_, self.universe_cov_, *settings))
+                        order += len(chunk)
+                else:
+                    with SharedArrays({'mean': self.universe_mean_, 'cov': self.universe_cov_}) as arrays, \
+                         ProcessPoolExecutor(max_workers=n_jobs, initializer=attach_shared, initargs=(arrays.specs_,)) as pool:
+                        pending = deque()
+                        order = 0
+                        for chunk in chunks:
+                            pending.append(pool.submit(_solve_shared_profile_packages, chunk, order, *settings))
+                            order += len(chunk)
+                            if (len(pending) >= 2 * n_jobs):
+                                merge_profile_best(best, pending.popleft().result())
+                        while pending:
+                            merge_profile_best(best, pending.popleft().result())
+
+                for i in members:
+                    found = best[int(np.searchsorted(caps, _cap(profiles[i])))]
+                    if found is not None:
+                        sharpe, order, package, weights, stats = found
+                        results[i] = ResultTable([weights], [package], [stats[0]], [stats[1]], [stats[2]], tickers)[0]
+
+            stage.count('profiles', len(profiles))
+            stage.count('profile_groups', len(groups))
+
+        self.profile_portfolios_ = results
+        return results
+
+    def _print_portfolio(self, title, portfolio):
+        '''
+        Prints the report for one optimized portfolio.
+        '''
+        heading = '----- Portfolio Optimized for ' + title + ' ----'
+        print('-' * len(heading))
+        print(heading)
+        print('-' * len(heading))
         print('')
-        print(*temp[1], sep = '\n')
+        print(*portfolio[1], sep='\n')
         print('')
-        print('Optimal Portfolio Return: ', temp[2])
-        print('Optimal Portfolio Volatility: ', temp[3])
-        print('Optimal Portfolio Sharpe Ratio: ', temp[4])
+        print('Optimal Portfolio Return: ', portfolio[2])
+        print('Optimal Portfolio Volatility: ', portfolio[3])
+        print('Optimal Portfolio Sharpe Ratio: ', portfolio[4])
         print('')
         print('')
 
+    def optimize_for_sharpe(self):
+        '''Optimization function to optimize on Sharpe Ratio, using SLSQP with the 
+        exact Sharpe gradient.
+        ''' 
+        self.optimize(objectives=['sharpe'])
+
     def optimize_for_return(self):
-        '''Function to optimize purely on return.
-        '''
-        num_assets = self.portfolio_size_       
-        constraints=({'type':'eq', 'fun': lambda x: np.sum(x) -1})
-        bounds = tuple((0, 1) for x in range(num_assets))
-        initializer = num_assets * [1. / num_assets,]
-        sim_packages = self.sim_packages.copy()
-         
-        def _maximize_return(weights): 
-            self.portfolio_stats(weights)
-            port_return = self._port_return_
-            return -port_return
-        
-        self.return_scores_ = []
-        for _ in range(len(sim_packages)):
-            sim = sim_packages.pop()
-            self.return_matrix_ = np.array(sim[2])
-            self.cov_matrix_ = np.array(sim[1])
-            self.assets_ = sim[0]
-            
-            optimal_return = optimize.minimize(
-                _maximize_return,
-                initializer,
-                method = 'SLSQP',
-                bounds = bounds,
-                constraints = constraints,
-            )
-            
-            optimal_return_weights_ = optimal_return['x'].round(4)
-            optimal_return_stats_ = self.portfolio_stats(optimal_return_weights_)
-            
-            #Here we just stripe our the 'Adj_close' tag from the asset list
-            x = self.assets_
-            asset_list = []
-            for i in range(len(x)):
-                temp = x[i].split('_')
-                asset_list.append(temp[0])
-                
-            optimal_return_portfolio_ = list(zip(asset_list, list(optimal_return_weights_)))
-            self.return_scores_.append([optimal_return_weights_,
-                                        optimal_return_portfolio_,
-                                        round(optimal_return_stats_[0] * 100, 4),
-                                        round(optimal_return_stats_[1] * 100, 4),
-                                        round(optimal_return_stats_[2], 4)])
-        
-        self.return_scores_ = sorted(self.return_scores_, key = itemgetter(2), reverse=True)
-        self.best_return_portfolio_ = self.return_scores_[0]
-        temp = self.best_return_portfolio_
-        
-        if (self.print_init_ == True):
-        
-            print('-----------------------------------------------')
-            print('----- Portfolio Optimized for Pure Return ----')
-            print('-----------------------------------------------')
-            print('')
-            print(*temp[1], sep='\n')
-            print('')
-            print('Optimal Portfolio Return: ', temp[2])
-            print('Optimal Portfolio Volatility: ', temp[3])
-            print('Optimal Portfolio Sharpe Ratio: ', temp[4])
-            print('')
-            print('')
+        '''Function to optimize purely on return.  The optimum is a greedy fill of 
+        the highest-returning assets, so no numerical solver is needed.
+        '''
+        self.optimize(objectives=['return'])
     
     def optimize_for_volatility(self):
-        '''Function to optimize on volatility only (risk)
+        '''Function to optimize on volatility only (risk), solved as a quadratic 
+        program over the portfolio variance.
         '''  
-        num_assets = self.portfolio_size_       
-        constraints = ({'type':'eq', 'fun': lambda x: np.sum(x) -1})
-        bounds = tuple((0,1) for x in range(num_assets))
-        initializer = num_assets * [1. / num_assets,]
-        sim_packages = self.sim_packages.copy()
-        
-        def _minimize_volatility(weights):           
-            self.portfolio_stats(weights)
-            port_vol = self._port_vol_     
-            return port_vol
-        
-        self.vol_scores_ = []
-        for _ in range(len(sim_packages)):
-            sim = sim_packages.pop()
-            self.return_matrix_ = np.array(sim[2])
-            self.cov_matrix_ = np.array(sim[1])
-            self.assets_ = sim[0]
-            
-            optimal_vol=optimize.minimize(
-                _minimize_volatility,
-                initializer,
-                method = 'SLSQP',
-                bounds = bounds,
-                constraints = constraints,
-            )
-            
-            optimal_vol_weights_ = optimal_vol['x'].round(4)
-            optimal_vol_stats_ = self.portfolio_stats(optimal_vol_weights_)
-            
-            #Here we just stripe our the 'Adj_close' tag from the asset list
-            x = self.assets_
-            asset_list = []
-            for i in range(len(x)):
-                temp = x[i].split('_')
-                asset_list.append(temp[0])
-                
-            optimal_vol_portfolio_ = list(zip(asset_list, list(optimal_vol_weights_)))
-            self.vol_scores_.append([optimal_vol_weights_,
-                                     optimal_vol_portfolio_,
-                                     round(optimal_vol_stats_[0] * 100, 4),
-                                     round(optimal_vol_stats_[1] * 100, 4),
-                                     round(optimal_vol_stats_[2], 4)])
-        
-        self.vol_scores_ = sorted(self.vol_scores_, key = itemgetter(3))
-        self.best_vol_portfolio_ = self.vol_scores_[0]
-        temp = self.best_vol_portfolio_
-
-        if (self.print_init_ == True):      
-            print('-----------------------------------------------------')
-            print('----- Portfolio Optimized for Minimal Volatility ----')
-            print('-----------------------------------------------------')
-            print('')
-            print(*temp[1], sep='\n')
-            print('')
-            print('Optimal Portfolio Return: ', temp[2])
-            print('Optimal Portfolio Volatility: ', temp[3])
-            print('Optimal Portfolio Sharpe Ratio: ', temp[4])
-            print('')
-            print('')  
\ No newline at end of file
+        self.optimize(objectives=['volatility'])
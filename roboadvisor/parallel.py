@@ -0,0 +1,80 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import os
+import numpy as np
+from multiprocessing import shared_memory
+
+#Local imports
+
+#3rd party imports
+
+
+#Arrays attached by attach_shared() in a pool worker, keyed by name.
+_attached={}
+
+
+def resolve_n_jobs(n_jobs):
+    '''
+    Converts an n_jobs option into a worker count.  None means 1 and negative values count
+    back from the number of CPUs, so -1 uses every core.
+    '''
+    if n_jobs is None:
+        return 1
+    if (n_jobs < 0):
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+class SharedArrays:
+    '''
+    Copies a dict of numpy arrays into shared memory blocks once so that process pool workers
+    can map them instead of receiving a pickled copy with every task.  Pass specs_ to
+    attach_shared() as the pool initializer and use shared(name) inside the worker.  Use as a
+    context manager so the blocks are released when the pool is done.
+
+    Parameters:
+    -----------
+        arrays : dict
+            Arrays to share, keyed by the name workers will look them up with.
+    '''
+
+    def __init__(self, arrays):
+        self.blocks_=[]
+        self.specs_={}
+        for name, array in arrays.items():
+            array=np.ascontiguousarray(array)
+            block=shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...]=array
+            self.blocks_.append(block)
+            self.specs_[name]=(block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks_:
+            block.close()
+            block.unlink()
+        self.blocks_=[]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared(specs):
+    '''
+    Pool initializer that maps the blocks described by SharedArrays.specs_ into this process.
+    '''
+    _attached.clear()
+    for name, (block_name, shape, dtype) in specs.items():
+        block=shared_memory.SharedMemory(name=block_name)
+        _attached[name]=(block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def shared(name):
+    '''
+    Returns an array attached by attach_shared().
+    '''
+    return _attached[name][1]
@@ -0,0 +1,132 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import numpy as np
+
+#Local imports
+from roboadvisor.solvers import SolverWorkspace, min_volatility_weights, max_sharpe_weights, portfolio_performance
+from roboadvisor.parallel import shared
+
+#3rd party imports
+
+
+class ClientProfile:
+    '''
+    The constraints one client's portfolio is optimized under, for
+    PortfolioOptimizer.optimize_profiles().
+
+    Parameters:
+    -----------
+        max_vol : float, optional (default=None)
+            The client's risk tolerance as a cap on annualized volatility, in percent like the
+            volatility of the result entries.  None means no cap.
+        min_pos : float, optional (default=0.0)
+            The minimum weight of an asset in the portfolio.
+        max_pos : float, optional (default=1.0)
+            The maximum weight of an asset in the portfolio.
+        portfolio_size : int, optional (default=5)
+            The number of assets in the portfolio.
+        name : str, optional (default=None)
+            A label for reports, e.g. a client id.
+    '''
+
+    def __init__(self, max_vol=None, min_pos=0.0, max_pos=1.0, portfolio_size=5, name=None):
+        self.max_vol=max_vol
+        self.min_pos=min_pos
+        self.max_pos=max_pos
+        self.portfolio_size=portfolio_size
+        self.name=name
+
+    def __repr__(self):
+        return 'ClientProfile(max_vol=%r, min_pos=%r, max_pos=%r, portfolio_size=%r, name=%r)' % (
+            self.max_vol, self.min_pos, self.max_pos, self.portfolio_size, self.name)
+
+    def group_key(self):
+        '''
+        Profiles with the same key search the same combinations under the same bounds and
+        only differ in their volatility cap, so they are solved together.
+        '''
+        return (self.portfolio_size, self.min_pos, self.max_pos)
+
+
+def solve_profile_packages(packages, first_order, universe_mean, universe_cov, caps, min_pos, max_pos):
+    '''
+    Finds, for each volatility cap, the combination in a chunk with the highest Sharpe ratio
+    under the cap.  Each combination is solved once for its minimum volatility, which rules
+    out the caps below it, and once for its maximum Sharpe ratio, which is the answer for
+    every cap above its volatility.  Only the caps in between need a capped solve.
+
+    Parameters:
+    -----------
+        packages : array
+            (rows, k) universe indices of the combinations.
+        first_order : int
+            Visit order of the first combination, used to break ties deterministically.
+        universe_mean, universe_cov : array
+            Annualized universe statistics.
+        caps : array
+            Sorted, distinct annualized volatility caps as fractions.  np.inf means no cap.
+        min_pos, max_pos : float
+            Weight bounds.
+
+    Returns:
+    --------
+        list, for each cap None or the best (sharpe, order, package, weights, stats) found,
+        where weights are rounded to 4 places and stats are the return %, volatility % and
+        Sharpe ratio computed from them.
+    '''
+    rows, num_assets=packages.shape
+    workspace=SolverWorkspace(num_assets)
+    bounds=tuple((min_pos, max_pos) for x in range(num_assets))
+    best=[None] * len(caps)
+
+    def _offer(j, optimal, package, order, returns, cov_matrix):
+        weights=optimal['x'].round(4)
+        port_return, port_vol, sharpe=portfolio_performance(weights, returns, cov_matrix)
+        stats=(round(port_return * 100, 4), round(port_vol * 100, 4), round(sharpe, 4))
+        if (best[j] is None or stats[2] > best[j][0]):
+            best[j]=(stats[2], order, package.copy(), weights, stats)
+
+    for i, package in enumerate(packages):
+        returns=universe_mean[package]
+        cov_matrix=universe_cov[np.ix_(package, package)]
+        lowest=min_volatility_weights(cov_matrix, bounds, workspace=workspace)['x']
+        lowest_vol=np.sqrt(lowest @ cov_matrix @ lowest)
+        first=int(np.searchsorted(caps, lowest_vol * (1 - 1e-9)))
+        if (first == len(caps)):
+            continue
+        tangency=max_sharpe_weights(returns, cov_matrix, bounds, lowest, workspace)
+        tangency_vol=np.sqrt(tangency['x'] @ cov_matrix @ tangency['x'])
+        for j in range(first, len(caps)):
+            if (caps[j] >= tangency_vol):
+                optimal=tangency
+            else:
+                optimal=max_sharpe_weights(returns, cov_matrix, bounds, lowest, workspace, max_vol=caps[j])
+                #Fall back on the minimum volatility weights, which meet the cap, if SLSQP 
+                #didn't converge inside it.
+                if not (optimal['success'] and np.sqrt(optimal['x'] @ cov_matrix @ optimal['x']) <= caps[j] * (1 + 1e-6)):
+                    optimal={'x': lowest}
+            _offer(j, optimal, package, first_order + i, returns, cov_matrix)
+    return best
+
+
+def merge_profile_best(best, partial):
+    '''
+    Merges a chunk's solve_profile_packages() result into the best found so far, keeping the
+    earlier combination when Sharpe ratios are equal.
+    '''
+    for j, candidate in enumerate(partial):
+        if candidate is None:
+            continue
+        if (best[j] is None or candidate[0] > best[j][0] or
+                (candidate[0] == best[j][0] and candidate[1] < best[j][1])):
+            best[j]=candidate
+    return best
+
+
+def _solve_shared_profile_packages(packages, first_order, caps, min_pos, max_pos):
+    '''
+    Pool worker entry point: solve_profile_packages on the universe statistics in shared memory.
+    '''
+    return solve_profile_packages(packages, first_order, shared('mean'), shared('cov'), caps, min_pos, max_pos)
@@ -3,11 +3,15 @@
 '''
 #Standard Python Library imports
 import numpy as np
-import matplotlib
-import time
 import statistics
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 #Local imports
+from roboadvisor.instrumentation import Instrumentation
+from roboadvisor.montecarlo import SimulationSummary
+from roboadvisor.parallel import resolve_n_jobs
 
 #3rd party imports
 
@@ -30,24 +34,43 @@ class RebalancingSimulator:
         The factor by which an asset weight can exceed its target threshold on the upside.
     min_thres: float, optional (default=0.9)
         The factor by which an asset weight can exceed its target threshold on the downside.                 
+    instrumentation : Instrumentation, optional (default=None)
+        Records the timing and counts of the rebalancer_init, random_walks, run_simulation and
+        run_monte_carlo stages, and prints their reports unless it is quiet.  Defaults to the 
+        optimizer's instrumentation_.
     '''
     
     
-    def __init__(self,p,frac_units=True,starting_cash=20000,trade_cost=5.99,max_thresh=1.1, min_thresh=0.9):
+    #Size of the block of random walks run_monte_carlo draws at a time, in bytes and paths.
+    _walk_block_bytes=128 * 2**20
+    _block_paths=1024
+
+    #What a pool worker needs to draw and step paths.
+    _engine_attributes=('starting_vals_', 'target_weights_', 'asset_list_', 'starting_unit_holdings_',
+                        'starting_residual_cash', 'starting_portfolio_value_', 'trade_cost_', 
+                        'frac_units_', 'thresh_high_', 'thresh_low_', 'random_walk_iters_')
+
+    def __init__(self,p,frac_units=True,starting_cash=20000,trade_cost=5.99,max_thresh=1.1, min_thresh=0.9, instrumentation=None):
         
         import numpy as np
+        if instrumentation is None:
+            instrumentation=getattr(p, 'instrumentation_', None) or Instrumentation()
+        self.instrumentation_=instrumentation
+        self.sim_summary_=None
         self.thresh_high_=max_thresh
         self.thresh_low_=min_thresh
         self.trade_cost_=trade_cost
         self.optimal_portfolio_=p
         self.frac_units_=frac_units
         self.starting_portfolio_value_=starting_cash      
-        self._data_prep()
-        self.cash_balance_=self.starting_portfolio_value_
-        self.starting_cash_balance_=starting_cash
-        self._initialize_portfolio()
+        with self.instrumentation_.stage('rebalancer_init', 'initialize rebalancer') as stage:
+            self._data_prep()
+            stage.note('Target weights: ', list(zip(self.asset_list_,self.target_weights_)))
+            self.cash_balance_=self.starting_portfolio_value_
+            self.starting_cash_balance_=starting_cash
+            self._initialize_portfolio()
+            stage.note('Cash balance after portfolio initialization: ',self.starting_residual_cash)
         self.random_walk_iters_=2520 
-        print('Cash balance after portfolio initialization: ',self.starting_residual_cash)
         
 
     def _data_prep(self):
@@ -95,7 +118,6 @@ class RebalancingSimulator:
         self.starting_vals_=starting_vals 
         self.target_weights_=weights
         self.asset_list_=[x[0] for x in self.starting_vals_]
-        print('Target weights: ', list(zip(self.asset_list_,self.target_weights_))) 
         return   
     
     
@@ -105,83 +127,109 @@ class RebalancingSimulator:
         and the desired weights of each asset.  
         '''
     
+        portfolio_init, self.starting_residual_cash=self._initial_holdings(self.trade_cost_, self.frac_units_)
+        self.starting_unit_holdings_=[x[1] for x in portfolio_init]
+        self.initialized_portfolio_=portfolio_init     
+        return
+
+
+    def _initial_holdings(self, trade_cost, frac_units):
+        '''
+        The (asset, units) bought of each asset at T=0 and the cash left over, for a trade cost
+        and fractional units setting.
+        '''
+        
         #initialize portfolio:
         starting_vals=self.starting_vals_
-        trade_cost=self.trade_cost_
         portfolio_init=[]
-        self.starting_residual_cash=self.starting_portfolio_value_
+        residual_cash=self.starting_portfolio_value_
         
         for i in range(len(starting_vals)):
             
             allocated_capital=round(starting_vals[i][4]*self.starting_portfolio_value_,4)
             start_price=starting_vals[i][1]
             
-            if (self.frac_units_==True):
+            if (frac_units==True):
                 num_units=(allocated_capital-trade_cost)/start_price
                 cash_used=num_units*start_price
-                self.starting_residual_cash=self.starting_residual_cash-cash_used
-                self.starting_residual_cash=round(self.starting_residual_cash,4)
+                residual_cash=residual_cash-cash_used
+                residual_cash=round(residual_cash,4)
                 
             else:
                 num_units=(allocated_capital-trade_cost)//start_price
                 cash_used=num_units*start_price
-                self.starting_residual_cash=self.starting_residual_cash-cash_used
-                self.starting_residual_cash=round(self.starting_residual_cash,4)
+                residual_cash=residual_cash-cash_used
+                residual_cash=round(residual_cash,4)
                 
             portfolio_init.append((starting_vals[i][0],round(num_units,4)))
         
-        self.starting_unit_holdings_=[x[1] for x in portfolio_init]
-        self.initialized_portfolio_=portfolio_init     
-        return
+        return portfolio_init, residual_cash
     
 
-    def _random_walks(self,plot=False):
+    def _random_walks(self,plot=False,paths=1,seed=None,first_path=0):
         '''
         Using the historical mean daily return and volatility of each asset,
         we're going to create random walks to simulatate returns for each asset
         in the portfolio. 
+
+        The walks are built in one (paths, assets, steps) array: the starting prices go in the
+        first step, the simulated daily growth factors after them, and a cumulative product 
+        along the steps turns it into prices in place.  Draws are made path by path and asset
+        by asset, so the walks of a path don't depend on how many paths are drawn at once.
+
+        Without a seed the draws come from the global np.random state.  With a root 
+        SeedSequence, path first_path + p is drawn from its own generator, seeded with the 
+        root's child for that path number, so a path's walks only depend on the seed and the 
+        path number, not on which process draws it or in which block.
         '''
 
         starting_vals=self.starting_vals_
-        random_walks=[]
+        T=self.random_walk_iters_ #Number of trading days in simulation
+        S=np.array([x[1] for x in starting_vals], dtype=float) #starting stock prices
+        mu=np.array([x[2] for x in starting_vals], dtype=float)[:, None] #Returns
+        vol=np.array([x[3] for x in starting_vals], dtype=float)[:, None] #Volatilities
 
-        for i in range(len(starting_vals)):
-            
-            S = starting_vals[i][1] #starting stock price
-            T = self.random_walk_iters_ #Number of trading days in simulation
-            mu = starting_vals[i][2] #Return
-            vol = starting_vals[i][3] #Volatility
-             
-            #create list of daily returns using random normal distribution
-            simulated_returns=np.random.normal(mu,vol,T)+1
-            simulated_prices = [S]
-     
-            for x in simulated_returns:
-                simulated_prices.append(simulated_prices[-1]*x)
-            
-            random_walks.append(simulated_prices)
+        with self.instrumentation_.stage('random_walks', 'simulate random walks') as stage:
+            random_walks=np.empty((paths, len(starting_vals), T + 1))
+            random_walks[:, :, 0]=S
+            #create daily returns using random normal distribution
+            if seed is None:
+                random_walks[:, :, 1:]=np.random.normal(mu, vol, (paths, len(starting_vals), T))
+            else:
+                for p in range(paths):
+                    child=np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (first_path + p,), 
+                                                 pool_size=seed.pool_size)
+                    random_walks[p, :, 1:]=np.random.default_rng(child).normal(mu, vol, (len(starting_vals), T))
+            random_walks[:, :, 1:]+=1
+            np.cumprod(random_walks, axis=2, out=random_walks)
+            stage.count('walks', paths * len(starting_vals))
+            stage.count('steps', paths * len(starting_vals) * T)
         
         if (plot==True):
-            plt.figure(figsize=(10,4))
-            plt.title(starting_vals[i][0])
-            plt.plot(simulated_prices)        
-            plt.show()
+            import matplotlib.pyplot as plt
+            for i in range(len(starting_vals)):
+                plt.figure(figsize=(10,4))
+                plt.title(starting_vals[i][0])
+                plt.plot(random_walks[0, i])        
+                plt.show()
         
         self.random_walks=random_walks
             
         return random_walks    
     
     
-    def run_simulation(self, plot=False):
+    def run_simulation(self, plot=False, seed=None):
         '''
         Runs the rebalancing simulation, tracking the following:
             - Cash history
             - Number of trades
             - Portfolio Value
             - Asset weights and their deviations
+
+        With a seed (an int or SeedSequence) the walks are those of path 0 of 
+        run_monte_carlo with the same seed.
         '''
         
-        start=time.time() 
         self.total_trades_=0  
         portfolio_values=[]
         weight_history=[]
@@ -189,31 +237,65 @@ class RebalancingSimulator:
         cash_history=[]
         trade_history=[]
             
-        price_simulations=self._random_walks(plot=False)
-        self.current_unit_holdings_=self.starting_unit_holdings_
-        self.sim_cash_balance_=self.cash_balance_
-        
-        for j in range(1,len(price_simulations[0])-1):
+        with self.instrumentation_.stage('run_simulation', 'run rebalancing simulation') as stage:
+            if (seed is not None and not isinstance(seed, np.random.SeedSequence)):
+                seed=np.random.SeedSequence(seed)
+            price_simulations=self._random_walks(plot=False, seed=seed)[0]
+            self.current_unit_holdings_=self.starting_unit_holdings_
+            self.sim_cash_balance_=self.cash_balance_
+        
+            for unit_prices in price_simulations[:, 1:-1].T.tolist():
             
-            #Get portfolio value and updated weights based on asset prices 
-            #at current time step.
-            self.current_unit_prices_=[item[j] for item in price_simulations]
-            port_val, new_weights, weight_diffs, new_target_vals,unit_holdings,trade_count=self._get_portfolio_values()
+                #Get portfolio value and updated weights based on asset prices 
+                #at current time step.
+                self.current_unit_prices_=unit_prices
+                port_val, new_weights, weight_diffs, new_target_vals,unit_holdings,trade_count=self._get_portfolio_values()
             
-            portfolio_values.append(port_val)
-            weight_history.append(new_weights)
-            unit_history.append(unit_holdings)
-            cash_history.append(self.sim_cash_balance_)
-            trade_history.append(trade_count)
+                portfolio_values.append(port_val)
+                weight_history.append(new_weights)
+                unit_history.append(list(unit_holdings))
+                cash_history.append(self.sim_cash_balance_)
+                trade_history.append(trade_count)
+            stage.count('paths', 1)
+            stage.count('steps', len(portfolio_values))
+            stage.count('trades', sum(trade_history))
+        
+            self.sim_port_vals_=portfolio_values
+            self.sim_weight_vals_=weight_history
+            self.sim_holding_history_=unit_history
+            self.sim_cash_history_=cash_history
+            self.sim_trade_history_=trade_history
+            self.total_trades_=sum(self.sim_trade_history_)
+            self.total_trade_cost_=self.trade_cost_*self.total_trades_
+        
+            stage.note('')
+            stage.note('')
+            stage.note('SIMULATION REPORT')
+            stage.note('-----------------')
+            stage.note('Total number of trades executed: ', self.total_trades_)
+            stage.note('Cost per trade: ', round(self.trade_cost_,2))
+            stage.note('Total trading costs: ', round(self.total_trade_cost_,2))
+            stage.note('Maximum cash balance: ', round(max(self.sim_cash_history_),2))
+            stage.note('Minimum cash balance: ', round(min(self.sim_cash_history_),2))
+            stage.note('Average cash balance: ', round((sum(self.sim_cash_history_)/len(self.sim_cash_history_)),2))
+            stage.note('Fractional units allowed? ',str(self.frac_units_))
+            stage.note('')
         
-        self.sim_port_vals_=portfolio_values
-        self.sim_weight_vals_=weight_history
-        self.sim_holding_history_=unit_history
-        self.sim_cash_history_=cash_history
-        self.sim_trade_history_=trade_history
+            for i in range(len(self.asset_list_)):
+                weight_history=[x[i] for x in self.sim_weight_vals_]
+                asset=self.asset_list_[i]
+                stage.note('Weight metrics for: ',asset)
+                stage.note('-------------------------')
+                stage.note('  Target portfolio weight: ',self.target_weights_[i])
+                stage.note('  Standard deviation of '+asset+' portfolio weight: ',round(statistics.stdev(weight_history),4))
+                stage.note('  Maximum weight reached for '+asset+': ', round(max(weight_history),4))
+                stage.note('  Minimum weight reached for '+asset+': ', round(min(weight_history),4))
+                stage.note('  Average of '+asset+' portfolio weight: ',round(statistics.mean(weight_history),4))
+                stage.note('')
 
 
         if plot==True:
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(12,4))
             plt.title('Simulated Portfolio Value')
             plt.plot(self.sim_port_vals_)        
@@ -236,35 +318,6 @@ class RebalancingSimulator:
                 plt.plot(trace,label=self.asset_list_[i])
             plt.legend()    
             plt.show()           
-
-        self.total_trades_=sum(self.sim_trade_history_)
-        self.total_trade_cost_=self.trade_cost_*self.total_trades_
-        
-        print('')
-        print('')
-        print('SIMULATION REPORT')
-        print('-----------------')
-        print('Rebalancing simulation finished in: %.2f seconds' % (time.time() - start))
-        print('Total number of trades executed: ', self.total_trades_)
-        print('Cost per trade: ', round(self.trade_cost_,2))
-        print('Total trading costs: ', round(self.total_trade_cost_,2))
-        print('Maximum cash balance: ', round(max(self.sim_cash_history_),2))
-        print('Minimum cash balance: ', round(min(self.sim_cash_history_),2))
-        print('Average cash balance: ', round((sum(self.sim_cash_history_)/len(self.sim_cash_history_)),2))
-        print('Fractional units allowed? ',str(self.frac_units_))
-        print('')
-        
-        for i in range(len(self.asset_list_)):
-            weight_history=[x[i] for x in self.sim_weight_vals_]
-            asset=self.asset_list_[i]
-            print('Weight metrics for: ',asset)
-            print('-------------------------')
-            print('  Target portfolio weight: ',self.target_weights_[i])
-            print('  Standard deviation of '+asset+' portfolio weight: ',round(statistics.stdev(weight_history),4))
-            print('  Maximum weight reached for '+asset+': ', round(max(weight_history),4))
-            print('  Minimum weight reached for '+asset+': ', round(min(weight_history),4))
-            print('  Average of '+asset+' portfolio weight: ',round(statistics.mean(weight_history),4))
-            print('')
         
         return    
     
@@ -279,11 +332,49 @@ class RebalancingSimulator:
         return
 
 
-    def run_monte_carlo(self,iterations=1,print_report=False):
+    def run_monte_carlo(self,iterations=1,print_report=False,batched=True,summary=False,sample_paths=0,n_jobs=None,seed=None):
         '''
         Runs a monte carlo simulation on possible trajectories of the optimal portfolio
+
+        Parameters:
+        -----------
+            iterations : int, optional (default=1)
+                The number of paths to simulate.
+            print_report : bool, optional (default=False)
+                Whether or not to plot the simulated paths.
+            batched : bool, optional (default=True)
+                Whether to step every path of a block of walks at once with array operations
+                (see _step_paths) instead of one path at a time with _get_portfolio_values.  
+                Both give the same results for the same random draws, but the batched engine
+                stores the histories as arrays: sim_port_vals_, sim_cash_history_ and 
+                sim_trade_history_ of shape (paths, days), and sim_weight_vals_ and 
+                sim_holding_history_ of shape (paths, days, assets).
+            summary : bool, optional (default=False)
+                Whether to only keep aggregate statistics, in sim_summary_, instead of the full
+                history of every path.  Needs the batched engine.
+            sample_paths : int, optional (default=0)
+                With summary=True, the number of paths whose full history is still kept in the
+                sim_* arrays, e.g. for plotting.  Paths are independent and identically 
+                distributed, so the first sample_paths paths are a uniform random sample.
+            n_jobs : int, optional (default=None)
+                The number of processes blocks of paths are simulated on.  None or 1 runs in this
+                process and -1 uses every core.  Needs the batched engine.
+            seed : int or SeedSequence, optional (default=None)
+                Root seed of the simulation.  Every path draws from its own stream derived from
+                it (see _random_walks) and blocks of paths are merged in path order, so a run 
+                is reproduced exactly, whatever n_jobs is.  Without a seed a fresh root seed is 
+                used.  The root seed's entropy is recorded in sim_seed_ either way, so passing 
+                it back as the seed reproduces any run.
         '''
-        start=time.time()
+        if (summary==True and batched!=True):
+            raise ValueError('summary=True needs the batched engine')
+        n_jobs=resolve_n_jobs(n_jobs)
+        if (n_jobs > 1 and batched!=True):
+            raise ValueError('n_jobs > 1 needs the batched engine')
+        if not isinstance(seed, np.random.SeedSequence):
+            seed=np.random.SeedSequence(seed)
+        self.sim_seed_=seed.entropy
+        self.sim_summary_=None
         self.sim_port_vals_=[]
         self.sim_weight_vals_=[]
         self.sim_holding_history_=[]
@@ -291,41 +382,398 @@ class RebalancingSimulator:
         self.sim_trade_history_=[]
         self.reset_sim()
 
-        
-        for i in range(iterations):
+        #Walks are drawn for a block of paths at a time to bound memory.
+        block=max(1, min(self._block_paths, self._walk_block_bytes // (8 * len(self.starting_vals_) * (self.random_walk_iters_ + 1))))
+
+        with self.instrumentation_.stage('run_monte_carlo', 'run monte carlo simulation') as stage:
+
+            if (batched==True):
+                days=max(self.random_walk_iters_ - 1, 0)
+                num_assets=len(self.starting_vals_)
+                kept=min(sample_paths, iterations) if summary==True else iterations
+                if (summary==True):
+                    self.sim_summary_=SimulationSummary(self.asset_list_, self.target_weights_)
+                self.sim_port_vals_=np.empty((kept, days))
+                self.sim_weight_vals_=np.empty((kept, days, num_assets))
+                self.sim_holding_history_=np.empty((kept, days, num_assets))
+                self.sim_cash_history_=np.empty((kept, days))
+                self.sim_trade_history_=np.empty((kept, days), dtype=np.int64)
+
+                def _merge(i, result):
+                    histories, stats=result
+                    port_vals, weight_vals, holding_history, cash_history, trade_history=histories
+                    if stats is not None:
+                        self.sim_summary_.add_block(stats)
+                    paths=slice(i, i + port_vals.shape[1])
+                    self.sim_port_vals_[paths]=port_vals.T
+                    self.sim_weight_vals_[paths]=weight_vals.transpose(2, 0, 1)
+                    self.sim_holding_history_[paths]=holding_history.transpose(2, 0, 1)
+                    self.sim_cash_history_[paths]=cash_history.T
+                    self.sim_trade_history_[paths]=trade_history.T
+
+                tasks=[(i, min(block, iterations - i), np.arange(min(max(kept - i, 0), block)) if summary==True else None, summary)
+                       for i in range(0, iterations, block)]
+                if (n_jobs == 1):
+                    for task in tasks:
+                        _merge(task[0], _simulate_block(self, task[0], task[1], seed, *task[2:]))
+                else:
+                    #Blocks are merged in path order as they complete, so the result is the 
+                    #same as a single process run with the same seed.
+                    engine=self._engine_copy()
+                    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                        pending=deque()
+                        for task in tasks:
+                            pending.append((task[0], pool.submit(_simulate_block, engine, task[0], task[1], seed, *task[2:])))
+                            if (len(pending) >= 2 * n_jobs):
+                                i, future=pending.popleft()
+                                _merge(i, future.result())
+                        while pending:
+                            i, future=pending.popleft()
+                            _merge(i, future.result())
             
-            portfolio_values=[]
-            weight_history=[]
-            unit_history=[]
-            cash_history=[]
-            trade_history=[]
+            else:
+                for i in range(iterations):
+            
+                    portfolio_values=[]
+                    weight_history=[]
+                    unit_history=[]
+                    cash_history=[]
+                    trade_history=[]
        
-            price_simulations=self._random_walks(plot=False)
+                    if (i % block == 0):
+                        walks=self._random_walks(plot=False, paths=min(block, iterations - i), seed=seed, first_path=i)
+                    price_simulations=walks[i % block]
             
-            for j in range(1,len(price_simulations[0])-1):
+                    for unit_prices in price_simulations[:, 1:-1].T.tolist():
                 
-                #Get portfolio value and updated weights based on asset prices 
-                #at current time step.
-                self.current_unit_prices_=[item[j] for item in price_simulations]
-                port_val, new_weights, weight_diffs, new_target_vals,unit_holdings,trade_count=self._get_portfolio_values()
+                        #Get portfolio value and updated weights based on asset prices 
+                        #at current time step.
+                        self.current_unit_prices_=unit_prices
+                        port_val, new_weights, weight_diffs, new_target_vals,unit_holdings,trade_count=self._get_portfolio_values()
                 
-                portfolio_values.append(port_val)
-                weight_history.append(new_weights)
-                unit_history.append(unit_holdings)
-                cash_history.append(self.sim_cash_balance_)
-                trade_history.append(trade_count)
+                        portfolio_values.append(port_val)
+                        weight_history.append(new_weights)
+                        unit_history.append(list(unit_holdings))
+                        cash_history.append(self.sim_cash_balance_)
+                        trade_history.append(trade_count)
             
-            self.sim_port_vals_.append(portfolio_values)
-            self.sim_weight_vals_.append(weight_history)
-            self.sim_holding_history_.append(unit_history)
-            self.sim_cash_history_.append(cash_history)
-            self.sim_trade_history_.append(trade_history)
-            self.reset_sim()
+                    self.sim_port_vals_.append(portfolio_values)
+                    self.sim_weight_vals_.append(weight_history)
+                    self.sim_holding_history_.append(unit_history)
+                    self.sim_cash_history_.append(cash_history)
+                    self.sim_trade_history_.append(trade_history)
+                    self.reset_sim()
+            stage.count('paths', iterations)
+            stage.count('steps', iterations * max(self.random_walk_iters_ - 1, 0))
+            if self.sim_summary_ is not None:
+                stage.count('trades', self.sim_summary_.total_trades_)
+            else:
+                stage.count('trades', int(sum(np.sum(trades) for trades in self.sim_trade_history_)))
 
         if (print_report==True):
             self._plot_sim_results()
 
-    
+
+    def sweep_policies(self,grid,iterations=1000,n_jobs=None,seed=None):
+        '''
+        Evaluates a grid of rebalancing policies on common random numbers: each block of price 
+        paths is drawn once and every policy is stepped on it in the same pass of the batched
+        engine (see _step_paths), so the differences between policies aren't blurred by 
+        different draws and the walks aren't paid for once per policy.
+
+        Parameters:
+        -----------
+            grid : dict or list
+                A dict of lists of max_thresh, min_thresh, trade_cost and frac_units values, 
+                whose every combination is a policy, or a list of dicts, one per policy.  A 
+                parameter that isn't given takes the simulator's value.
+            iterations : int, optional (default=1000)
+                The number of paths every policy is simulated on.
+            n_jobs : int, optional (default=None)
+                The number of processes blocks of paths are simulated on.  None or 1 runs in this
+                process and -1 uses every core.
+            seed : int or SeedSequence, optional (default=None)
+                Root seed of the paths, as in run_monte_carlo, recorded in sweep_seed_.  A 
+                policy is stepped on the same paths as run_monte_carlo(summary=True) with the 
+                same seed and that policy, but the sweep folds them into its statistics in 
+                smaller blocks, so means and standard deviations only agree with that run's to 
+                floating-point rounding.
+
+        Returns:
+        --------
+            DataFrame with one row per policy: its parameters, the number of paths, the mean,
+            standard deviation and 5th, 50th and 95th percentiles of the terminal values, the 
+            mean and standard deviation of the trades and trade costs per path, the mean 
+            maximum drawdown and the mean annualized tracking error.  Also kept in 
+            sweep_results_, and the SimulationSummary of each policy in sweep_summaries_.
+        '''
+        import pandas as pd
+
+        policies=_policy_grid(grid, {'max_thresh': self.thresh_high_, 'min_thresh': self.thresh_low_,
+                                     'trade_cost': self.trade_cost_, 'frac_units': self.frac_units_})
+        n_jobs=resolve_n_jobs(n_jobs)
+        if not isinstance(seed, np.random.SeedSequence):
+            seed=np.random.SeedSequence(seed)
+        self.sweep_seed_=seed.entropy
+        summaries=[SimulationSummary(self.asset_list_, self.target_weights_) for policy in policies]
+
+        #Every policy is stepped on each block of walks, so blocks hold fewer paths the more 
+        #policies there are.
+        block=max(1, min(self._block_paths // len(policies),
+                         self._walk_block_bytes // (8 * len(self.starting_vals_) * (self.random_walk_iters_ + 1))))
+
+        with self.instrumentation_.stage('sweep_policies', 'run policy sweep') as stage:
+
+            def _merge(result):
+                for summary, stats in zip(summaries, result[1]):
+                    summary.add_block(stats)
+
+            tasks=[(i, min(block, iterations - i)) for i in range(0, iterations, block)]
+            keep=np.arange(0)
+            if (n_jobs == 1):
+                for first_path, paths in tasks:
+                    _merge(_simulate_block(self, first_path, paths, seed, keep, True, policies))
+            else:
+                engine=self._engine_copy()
+                with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                    pending=deque()
+                    for first_path, paths in tasks:
+                        pending.append(pool.submit(_simulate_block, engine, first_path, paths, seed, keep, True, policies))
+                        if (len(pending) >= 2 * n_jobs):
+                            _merge(pending.popleft().result())
+                    while pending:
+                        _merge(pending.popleft().result())
+            stage.count('policies', len(policies))
+            stage.count('paths', iterations)
+            stage.count('steps', len(policies) * iterations * max(self.random_walk_iters_ - 1, 0))
+            stage.count('trades', sum(summary.total_trades_ for summary in summaries))
+
+        rows=[]
+        for policy, summary in zip(policies, summaries):
+            rows.append(dict(policy,
+                             paths=summary.paths_,
+                             terminal_mean=summary.terminal_mean_,
+                             terminal_std=summary.terminal_std_,
+                             terminal_q05=summary.terminal_sketch_.quantile(0.05),
+                             terminal_q50=summary.terminal_sketch_.quantile(0.5),
+                             terminal_q95=summary.terminal_sketch_.quantile(0.95),
+                             trades_mean=summary.trades_mean_,
+                             trades_std=summary.trades_std_,
+                             trade_cost_mean=summary.trades_mean_ * policy['trade_cost'],
+                             trade_cost_std=summary.trades_std_ * policy['trade_cost'],
+                             drawdown_mean=summary.drawdown_mean_,
+                             tracking_error=summary.tracking_error_mean_))
+        self.sweep_summaries_=summaries
+        self.sweep_results_=pd.DataFrame(rows)
+        return self.sweep_results_
+
+
+    def _engine_copy(self):
+        '''
+        A copy of the simulator with only what _random_walks and _step_paths use, which is
+        cheap to send to pool workers.
+        '''
+        engine=RebalancingSimulator.__new__(RebalancingSimulator)
+        for name in self._engine_attributes:
+            setattr(engine, name, getattr(self, name))
+        engine.instrumentation_=Instrumentation(verbose=False)
+        return engine
+
+
+    def _step_paths(self, walks, keep=None, summarize=False, policies=None):
+        '''
+        The batched rebalancing engine: runs _get_portfolio_values on every path of a block of
+        walks at once.  Holdings and prices are kept as (assets, paths) arrays and cash as a 
+        (paths,) array, and each day the threshold tests, sell and buy sizing, whole unit 
+        rounding and cash checks are applied to the paths that need them through index arrays.  Assets are still 
+        visited in order, because a buy can only use the cash left by the assets before it, 
+        and every expression is evaluated in the same order as the scalar engine so the 
+        results are identical.
+
+        With a list of policies every policy is run on the same walks in one pass: the columns 
+        are the paths of the first policy, then those of the second, and so on, and the 
+        thresholds, trade cost and fractional units setting are arrays over the columns.
+
+        Parameters:
+        -----------
+            walks : array
+                (paths, assets, steps) prices from _random_walks.
+            keep : array, optional (default=None)
+                Indices of the columns whose histories are returned.  None returns every column.
+            summarize : bool, optional (default=False)
+                Whether to also return the statistics SimulationSummary.add_block() needs,
+                accumulated day by day.
+            policies : list, optional (default=None)
+                Dicts of max_thresh, min_thresh, trade_cost and frac_units.  None runs the 
+                simulator's own policy from its current starting holdings.
+
+        Returns:
+        --------
+            tuple of the histories of the kept columns:
+                port_vals - (days, paths) portfolio values before trading.
+                weight_vals - (days, assets, paths) weights before trading.
+                holding_history - (days, assets, paths) unit holdings after trading.
+                cash_history - (days, paths) cash balances after trading.
+                trade_history - (days, paths) number of trades.
+            dict of summary statistics, or None unless summarize=True.  With policies, a list
+            of one dict per policy.
+        '''
+        paths=len(walks)
+        target_weights=np.asarray(self.target_weights_, dtype=float)
+        num_assets=walks.shape[1]
+        if policies is None:
+            count=1
+            thresh_high=np.full(paths, float(self.thresh_high_))
+            thresh_low=np.full(paths, float(self.thresh_low_))
+            trade_cost=np.full(paths, float(self.trade_cost_))
+            frac_units=np.full(paths, self.frac_units_==True)
+            units=np.repeat(np.asarray(self.starting_unit_holdings_, dtype=float)[:, None], paths, axis=1)
+            cash=np.full(paths, float(self.starting_residual_cash))
+        else:
+            count=len(policies)
+            starts=[self._initial_holdings(policy['trade_cost'], policy['frac_units']) for policy in policies]
+            thresh_high=np.repeat([float(policy['max_thresh']) for policy in policies], paths)
+            thresh_low=np.repeat([float(policy['min_thresh']) for policy in policies], paths)
+            trade_cost=np.repeat([float(policy['trade_cost']) for policy in policies], paths)
+            frac_units=np.repeat([policy['frac_units']==True for policy in policies], paths)
+            units=np.repeat(np.array([[x[1] for x in holdings] for holdings, residual in starts], dtype=float).T, paths, axis=1)
+            cash=np.repeat([float(residual) for holdings, residual in starts], paths)
+        columns=count * paths
+
+        #Units are sized with a true division or a floor division depending on each column's
+        #fractional units setting.
+        if frac_units.all():
+            def divide(amount, price, frac):
+                return amount / price
+        elif not frac_units.any():
+            def divide(amount, price, frac):
+                return amount // price
+        else:
+            def divide(amount, price, frac):
+                return np.where(frac, amount / price, amount // price)
+
+        days=max(walks.shape[2] - 2, 0)
+        record=slice(None) if keep is None else np.asarray(keep, dtype=np.intp)
+        recorded=columns if keep is None else len(record)
+        port_vals=np.empty((days, recorded))
+        weight_vals=np.empty((days, num_assets, recorded))
+        holding_history=np.empty((days, num_assets, recorded))
+        cash_history=np.empty((days, recorded))
+        trade_history=np.empty((days, recorded), dtype=np.int64)
+
+        port_val=np.full(columns, np.nan)
+        if summarize:
+            peak=np.full(columns, -np.inf)
+            drawdown=np.zeros(columns)
+            trades=np.zeros(columns, dtype=np.int64)
+            weight_min=np.full((num_assets, columns), np.inf)
+            weight_max=np.full((num_assets, columns), -np.inf)
+            weight_sum=np.zeros((num_assets, columns))
+            weight_sq=np.zeros((num_assets, columns))
+            active_sum=np.zeros(columns)
+            active_sq=np.zeros(columns)
+        
+        #Prices are copied into (days, assets, columns) order a chunk of days at a time.
+        for first in range(0, days, 256):
+            last=min(first + 256, days)
+            prices=np.ascontiguousarray(walks[:, :, 1 + first:1 + last].transpose(2, 1, 0))
+            if (count > 1):
+                prices=np.tile(prices, (1, 1, count))
+            if summarize:
+                #The return of the target weights rebalanced daily at no cost, which the active
+                #return of every policy is measured against.
+                growth=walks[:, :, 1 + first:1 + last] / walks[:, :, first:last] - 1
+                benchmark=target_weights[0] * growth[:, 0]
+                for i in range(1, num_assets):
+                    benchmark+=target_weights[i] * growth[:, i]
+                benchmark=np.tile(benchmark.T + 1, (1, count))
+            for j, unit_prices in enumerate(prices, first):
+            
+                last_val=port_val
+                values=units * unit_prices
+                port_val=values[0].copy()
+                for i in range(1, num_assets):
+                    port_val+=values[i]
+                port_val+=cash
+                new_weights=values / port_val
+                weight_diffs=new_weights / target_weights[:, None]
+                trade_count=np.zeros(columns, dtype=np.int64)
+
+                for i in range(num_assets):
+                    high=weight_diffs[i] > thresh_high
+                    low=weight_diffs[i] < thresh_low
+
+                    #Sell down to the target, in whole units unless fractional units are allowed.
+                    #Only the columns over the threshold are sized.
+                    sell=np.flatnonzero(high)
+                    if len(sell):
+                        price, cost, frac=unit_prices[i, sell], trade_cost[sell], frac_units[sell]
+                        sell_units=divide((values[i, sell] - target_weights[i] * port_val[sell]) - cost, price, frac)
+                        done=frac | (sell_units >= 1)
+                        sell, sell_units, price, cost, frac=sell[done], sell_units[done], price[done], cost[done], frac[done]
+                        proceeds=cash[sell] + sell_units * price
+                        cash[sell]=np.where(frac, proceeds - cost, proceeds)
+                        units[i, sell]=units[i, sell] - sell_units
+                        trade_count[sell]+=1
+                
+                    #Buy up to the target if there's enough cash.
+                    buy=np.flatnonzero(low & ~high)
+                    if len(buy):
+                        price, cost, frac=unit_prices[i, buy], trade_cost[buy], frac_units[buy]
+                        buy_units=divide((target_weights[i] * port_val[buy] - values[i, buy]) - cost, price, frac)
+                        funded=cash[buy] >= (buy_units * price) - (cost + 1)
+                        buy, buy_units, price, cost=buy[funded], buy_units[funded], price[funded], cost[funded]
+                        units[i, buy]=units[i, buy] + buy_units
+                        cash[buy]=cash[buy] - (buy_units * price) - cost
+                        trade_count[buy]+=1
+
+                port_vals[j]=port_val[record]
+                weight_vals[j]=new_weights[:, record]
+                holding_history[j]=units[:, record]
+                cash_history[j]=cash[record]
+                trade_history[j]=trade_count[record]
+
+                if summarize:
+                    np.maximum(peak, port_val, out=peak)
+                    np.maximum(drawdown, 1 - port_val / peak, out=drawdown)
+                    trades+=trade_count
+                    np.minimum(weight_min, new_weights, out=weight_min)
+                    np.maximum(weight_max, new_weights, out=weight_max)
+                    deviation=new_weights - target_weights[:, None]
+                    weight_sum+=deviation
+                    weight_sq+=deviation * deviation
+                    if (j > 0):
+                        active=port_val / last_val
+                        active-=benchmark[j - first]
+                        active_sum+=active
+                        active_sq+=active * active
+
+        histories=(port_vals, weight_vals, holding_history, cash_history, trade_history)
+        if not summarize:
+            return histories, None
+
+        #Annualized tracking error of each column.
+        returns=days - 1
+        if (returns > 1):
+            tracking=np.sqrt(np.maximum(active_sq - active_sum * (active_sum / returns), 0) / (returns - 1) * 252)
+        else:
+            tracking=np.full(columns, np.nan)
+
+        stats=[]
+        for k in range(count):
+            columns=slice(k * paths, (k + 1) * paths)
+            stats.append({'days': days,
+                          'terminal': port_val[columns],
+                          'trades': trades[columns],
+                          'drawdown': drawdown[columns],
+                          'tracking': tracking[columns],
+                          'weight_min': weight_min[:, columns].min(axis=1),
+                          'weight_max': weight_max[:, columns].max(axis=1),
+                          'weight_sum': weight_sum[:, columns].sum(axis=1),
+                          'weight_sq': weight_sq[:, columns].sum(axis=1)})
+        return histories, stats[0] if policies is None else stats
+
+
     def _calculate_sim_metrics(self):
         '''
         Calculates and summarizes the metrics for the trade simulation.  Calculated metrics are:
@@ -344,27 +792,38 @@ class RebalancingSimulator:
         import statistics
         #Weight metrics:
         
-        #Get Terminal Portfolio Metrics
-        self.term_port_vals_=[]
-        for i in range(len(self.sim_port_vals_)):
-            self.term_port_vals_.append(self.sim_port_vals_[i][-1])
-        
-        self.term_val_mean_=round(statistics.mean(self.term_port_vals_),4)
-        self.term_val_std_=round(statistics.stdev(self.term_port_vals_),4)
-        
-        #Get Terminal Trade Statistics
-        self.sim_trade_sums_=[]
-        self.sim_trade_costs_=[]
-        for i in range(len(self.sim_trade_history_)):
-            self.sim_trade_sums_.append(sum(self.sim_trade_history_[i]))
-            self.sim_trade_costs_.append(sum(self.sim_trade_history_[i])*self.trade_cost_)
+        summary=self.sim_summary_
+        if summary is not None:
+            #A summary=True run only kept aggregates.
+            self.term_val_mean_=round(summary.terminal_mean_,4)
+            self.term_val_std_=round(summary.terminal_std_,4)
+            self.trade_sum_mean_=round(summary.trades_mean_,4)
+            self.trade_sum_std_=round(summary.trades_std_,4)
+            self.sim_trade_cost_mean_=round(summary.trades_mean_*self.trade_cost_,4)
+            self.sim_trade_cost_std_=round(summary.trades_std_*self.trade_cost_,4)
+            n_samples=summary.paths_
+        else:
+            #Get Terminal Portfolio Metrics
+            self.term_port_vals_=[]
+            for i in range(len(self.sim_port_vals_)):
+                self.term_port_vals_.append(float(self.sim_port_vals_[i][-1]))
+        
+            self.term_val_mean_=round(statistics.mean(self.term_port_vals_),4)
+            self.term_val_std_=round(statistics.stdev(self.term_port_vals_),4)
+        
+            #Get Terminal Trade Statistics
+            self.sim_trade_sums_=[]
+            self.sim_trade_costs_=[]
+            for i in range(len(self.sim_trade_history_)):
+                self.sim_trade_sums_.append(int(sum(self.sim_trade_history_[i])))
+                self.sim_trade_costs_.append(self.sim_trade_sums_[-1]*self.trade_cost_)
                    
-        self.trade_sum_mean_=round(statistics.mean(self.sim_trade_sums_),4)
-        self.trade_sum_std_=round(statistics.stdev(self.sim_trade_sums_),4)
-        self.sim_trade_cost_mean_=round(statistics.mean(self.sim_trade_costs_),4)
-        self.sim_trade_cost_std_=round(statistics.stdev(self.sim_trade_costs_),4)   
+            self.trade_sum_mean_=round(statistics.mean(self.sim_trade_sums_),4)
+            self.trade_sum_std_=round(statistics.stdev(self.sim_trade_sums_),4)
+            self.sim_trade_cost_mean_=round(statistics.mean(self.sim_trade_costs_),4)
+            self.sim_trade_cost_std_=round(statistics.stdev(self.sim_trade_costs_),4)   
         
-        n_samples=len(self.term_port_vals_)
+            n_samples=len(self.term_port_vals_)
         
         print('Portfolio Simulation Analytics')
         print('--------------------------------')
@@ -378,6 +837,12 @@ class RebalancingSimulator:
         print('Duration of each simulation (in years): ', round((self.random_walk_iters_/252),2))
         print('Upper rebalance threshold: ', self.thresh_high_)
         print('Lower rebalance threshold: ', self.thresh_low_)
+        if summary is not None:
+            print('5th, 50th and 95th percentile Terminal Portfolio Values: ', 
+                  [round(summary.terminal_sketch_.quantile(q),2) for q in (0.05, 0.5, 0.95)])
+            print('Mean maximum drawdown: ', round(summary.drawdown_mean_,4))
+            print('Largest maximum drawdown: ', round(summary.max_drawdown_,4))
+            print('Mean annualized tracking error: ', round(summary.tracking_error_mean_,4))
         print('')
               
         
@@ -385,7 +850,8 @@ class RebalancingSimulator:
         '''
         Plots the results of the rebalancing simulation
         '''
-        
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(12,4))
         plt.title('Simulated Portfolio Value')
         for i in range(len(self.sim_port_vals_)):
@@ -492,4 +958,31 @@ class RebalancingSimulator:
         
         self.current_unit_holdings_=unit_holdings
 
-        return port_val, new_weights, weight_diffs, new_target_vals, unit_holdings, trade_count    
\ No newline at end of file
+        return port_val, new_weights, weight_diffs, new_target_vals, unit_holdings, trade_count    
+
+
+def _simulate_block(simulator, first_path, paths, seed, keep, summarize, policies=None):
+    '''
+    Draws and steps one block of paths: the unit of work of run_monte_carlo and 
+    sweep_policies, and their pool worker entry point.
+    '''
+    walks=simulator._random_walks(plot=False, paths=paths, seed=seed, first_path=first_path)
+    return simulator._step_paths(walks, keep=keep, summarize=summarize, policies=policies)
+
+
+def _policy_grid(grid, defaults):
+    '''
+    The list of policies of a sweep_policies grid, each a dict of every policy parameter.
+    '''
+    if isinstance(grid, dict):
+        names=list(grid)
+        grid=[dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    policies=[]
+    for policy in grid:
+        unknown=set(policy) - set(defaults)
+        if unknown:
+            raise ValueError('Unknown policy parameters: %s' % sorted(unknown))
+        policies.append(dict(defaults, **policy))
+    if not policies:
+        raise ValueError('The grid has no policies')
+    return policies
@@ -0,0 +1,155 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import numpy as np
+
+#Local imports
+
+#3rd party imports
+
+
+class ResultTable:
+    '''
+    Columnar table of optimized portfolios: one row per asset combination, stored as a 2-D
+    weights array, a 2-D array of universe indices and one float array per statistic.
+    Ticker names are only looked up for the rows that are read.
+
+    Indexing a row returns the result entry format used throughout the package,
+
+        [weights, [(ticker, weight), ...], return %, volatility %, Sharpe ratio]
+
+    so results[0] is the best portfolio and iterating yields entries, best first once the
+    table is ranked with top().  Slicing returns a ResultTable.
+
+    Parameters:
+    -----------
+        weights : array
+            (rows, k) portfolio weights.
+        packages : array
+            (rows, k) universe indices of the assets the weights apply to.
+        returns, vols, sharpes : array
+            Return %, volatility % and Sharpe ratio of each row.
+        tickers : list
+            Ticker of every asset in the universe.
+        orders : array, optional (default=None)
+            Visit order of each row, which breaks ties between equal scores in favour of the
+            earlier row.  Defaults to the row number.
+    '''
+
+    _columns={'return': 'returns_', 'volatility': 'vols_', 'sharpe': 'sharpes_'}
+
+    def __init__(self, weights, packages, returns, vols, sharpes, tickers, orders=None):
+        self.packages_=np.asarray(packages, dtype=np.intp)
+        rows=len(self.packages_)
+        self.weights_=np.asarray(weights, dtype=float).reshape(self.packages_.shape)
+        self.returns_=np.asarray(returns, dtype=float).reshape(rows)
+        self.vols_=np.asarray(vols, dtype=float).reshape(rows)
+        self.sharpes_=np.asarray(sharpes, dtype=float).reshape(rows)
+        self.orders_=np.arange(rows) if orders is None else np.asarray(orders, dtype=np.int64).reshape(rows)
+        self.tickers_=tickers
+
+    @classmethod
+    def empty(cls, k, tickers):
+        '''
+        A table with no rows for k-asset portfolios.
+        '''
+        return cls(np.empty((0, k)), np.empty((0, k)), [], [], [], tickers)
+
+    @classmethod
+    def concat(cls, tables):
+        '''
+        Stacks tables of portfolios over the same universe.
+        '''
+        return cls(np.concatenate([table.weights_ for table in tables]),
+                   np.concatenate([table.packages_ for table in tables]),
+                   np.concatenate([table.returns_ for table in tables]),
+                   np.concatenate([table.vols_ for table in tables]),
+                   np.concatenate([table.sharpes_ for table in tables]),
+                   tables[0].tickers_,
+                   np.concatenate([table.orders_ for table in tables]))
+
+    def __len__(self):
+        return len(self.packages_)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(np.arange(len(self))[i])
+        return self.entry(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.entry(i)
+
+    def take(self, index):
+        '''
+        A table of the rows at index, in that order.
+        '''
+        return ResultTable(self.weights_[index], self.packages_[index], self.returns_[index],
+                           self.vols_[index], self.sharpes_[index], self.tickers_, self.orders_[index])
+
+    def column(self, rank_by):
+        '''
+        The array of one statistic: 'return', 'volatility' or 'sharpe'.
+        '''
+        return getattr(self, self._columns[rank_by])
+
+    def asset_list(self, i):
+        '''
+        Tickers of the assets in row i.
+        '''
+        return [self.tickers_[j] for j in self.packages_[i]]
+
+    def entry(self, i):
+        '''
+        Row i in the result entry format.
+        '''
+        weights=self.weights_[i].copy()
+        return [weights,
+                list(zip(self.asset_list(i), list(weights))),
+                self.returns_[i],
+                self.vols_[i],
+                self.sharpes_[i]]
+
+    def _keys(self, rank_by, largest):
+        column=self.column(rank_by)
+        return -column if largest else column
+
+    def top(self, k, rank_by, largest=True):
+        '''
+        The best k rows by one statistic, best first, with ties going to the earlier row.
+        The k best are selected with a partition in linear time and only those are sorted.
+
+        Parameters:
+        -----------
+            k : int or None
+                Number of rows to keep.  None keeps every row.
+            rank_by : str
+                'return', 'volatility' or 'sharpe'.
+            largest : bool, optional (default=True)
+                Whether a larger statistic is better.
+        '''
+        keys=self._keys(rank_by, largest)
+        if (k is None or len(self) <= k):
+            index=np.arange(len(self))
+        elif (k <= 0):
+            index=np.arange(0)
+        else:
+            kth=np.partition(keys, k - 1)[k - 1]
+            better=np.flatnonzero(keys < kth)
+            ties=np.flatnonzero(keys == kth)
+            ties=ties[np.argsort(self.orders_[ties], kind='stable')][:k - len(better)]
+            index=np.concatenate([better, ties])
+        index=index[np.lexsort((self.orders_[index], keys[index]))]
+        return self.take(index)
+
+    def threshold(self, k, rank_by, largest=True):
+        '''
+        The k-th best value of a statistic, i.e. what a new row has to beat to make the top k,
+        or None while the table has fewer than k rows.
+        '''
+        if (k is None or len(self) < k):
+            return None
+        keys=self._keys(rank_by, largest)
+        kth=np.partition(keys, k - 1)[k - 1]
+        return -kth if largest else kth
@@ -0,0 +1,264 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import heapq
+import random
+import numpy as np
+from math import comb
+from itertools import combinations, islice
+
+#Local imports
+from roboadvisor.solvers import project_weights, SolverWorkspace
+from roboadvisor.results import ResultTable
+
+#3rd party imports
+
+
+def unrank_combination(rank, n, k):
+    '''
+    Returns the combination of range(n) choose k that sits at position rank in the
+    lexicographic order produced by itertools.combinations.
+    '''
+    combo=[]
+    x=0
+    for i in range(k):
+        count=comb(n - x - 1, k - i - 1)
+        while rank >= count:
+            rank-=count
+            x+=1
+            count=comb(n - x - 1, k - i - 1)
+        combo.append(x)
+        x+=1
+    return combo
+
+
+def iter_combination_chunks(n, k, max_iters=None, chunk_size=1024, seed=None):
+    '''
+    Streams the k-asset combinations of a universe of n assets as integer arrays of at most
+    chunk_size rows, so that no more than one chunk is ever held in memory.
+
+    Parameters:
+    -----------
+        n : int
+            Number of assets in the universe.
+        k : int
+            Number of assets per combination.
+        max_iters : int, optional (default=None)
+            Budget of combinations to visit.  When smaller than comb(n, k), a uniform random
+            sample of that many combinations is visited in lexicographic order instead of
+            every combination.
+        chunk_size : int, optional (default=1024)
+            Maximum number of combinations per chunk.
+        seed : int, optional (default=None)
+            Seed for the sampler used when the budget is smaller than comb(n, k).
+
+    Yields:
+    -------
+        array, (rows, k) array of universe indices.
+    '''
+    total=comb(n, k)
+    if (max_iters is None or max_iters >= total):
+        combos=combinations(range(n), k)
+    else:
+        ranks=sorted(random.Random(seed).sample(range(total), max_iters))
+        combos=(unrank_combination(rank, n, k) for rank in ranks)
+
+    while True:
+        chunk=list(islice(combos, chunk_size))
+        if not chunk:
+            return
+        yield np.array(chunk, dtype=np.intp).reshape(-1, k)
+
+
+class TopK:
+    '''
+    Keeps the best k scores pushed into it using a bounded min-heap, so memory stays fixed
+    however many scores are offered.  It only tracks the score a new one has to beat; the
+    results themselves are ranked by ResultTable.  Equal scores are ranked in the order they
+    were pushed.
+
+    Parameters:
+    -----------
+        k : int or None
+            Number of scores to keep.  None keeps every score.
+        largest : bool, optional (default=True)
+            Whether a larger score is better.
+    '''
+
+    def __init__(self, k, largest=True):
+        self.k_=k
+        self.sign_=1.0 if largest else -1.0
+        self.heap_=[]
+        self.pushed_=0
+
+    def __len__(self):
+        return len(self.heap_)
+
+    def threshold(self):
+        '''
+        The score a new one has to beat to be kept, or None while the heap isn't full.
+        '''
+        if (self.k_ is None or len(self.heap_) < self.k_):
+            return None
+        return self.sign_ * self.heap_[0][0]
+
+    def push(self, score, order=None):
+        '''
+        Offers a score.  order overrides the push counter used to break ties, which lets
+        results produced out of order be merged deterministically.
+        '''
+        if order is None:
+            order=self.pushed_
+        self.pushed_+=1
+        item=(self.sign_ * score, -order)
+        if (self.k_ is None or len(self.heap_) < self.k_):
+            heapq.heappush(self.heap_, item)
+        elif item > self.heap_[0]:
+            heapq.heapreplace(self.heap_, item)
+
+
+def _relaxed_weights(rank_by, largest, universe_mean, universe_cov, upper, max_iter=500):
+    '''
+    Continuous relaxation of the cardinality-constrained problem: optimizes the rank_by
+    statistic over every asset in the universe, with weights in (0, upper) summing to 1, by
+    projected gradient descent with a backtracking step.
+    '''
+    n=len(universe_mean)
+    bounds=[(0.0, upper)] * n
+    sign=-1.0 if largest else 1.0
+
+    def _value_and_gradient(weights):
+        if (rank_by == 'return'):
+            return sign * (universe_mean @ weights), sign * universe_mean
+        cov_weights=universe_cov @ weights
+        variance=weights @ cov_weights
+        if (rank_by == 'volatility'):
+            return sign * variance, sign * 2 * cov_weights
+        vol=np.sqrt(variance)
+        port_return=universe_mean @ weights
+        gradient=universe_mean / vol - port_return * cov_weights / (variance * vol)
+        return sign * port_return / vol, sign * gradient
+
+    weights=project_weights(np.full(n, 1.0 / n), bounds)
+    value, gradient=_value_and_gradient(weights)
+    step=1.0
+    for _ in range(max_iter):
+        while True:
+            candidate=project_weights(weights - step * gradient, bounds)
+            move=candidate - weights
+            candidate_value, candidate_gradient=_value_and_gradient(candidate)
+            if (candidate_value <= value + gradient @ move + (move @ move) / (2 * step) or step < 1e-12):
+                break
+            step*=0.5
+        if (np.abs(move).max() < 1e-9):
+            break
+        weights, value, gradient=candidate, candidate_value, candidate_gradient
+        step*=2.0
+    return weights
+
+
+def heuristic_search(objective, universe_mean, universe_cov, tickers, k, min_pos, max_pos, top_k,
+                     n_candidates=25, max_rounds=20):
+    '''
+    Finds a good k-asset portfolio for one objective without enumerating every combination.
+
+    The objective is first relaxed to a continuous problem over the whole universe and the k
+    assets with the largest relaxed weights are kept.  That set is then refined by swapping
+    one asset at a time for one of the n_candidates best-ranked assets outside it, taking the
+    best improving swap each round, until no swap improves the objective or max_rounds is hit.
+    Every combination solved along the way is ranked in the returned table.
+
+    Parameters:
+    -----------
+        objective : Objective
+            The objective to search for.
+        universe_mean : array
+            Annualized mean return of every asset in the universe.
+        universe_cov : array
+            Annualized covariance matrix of the universe.
+        tickers : list
+            Ticker of every asset in the universe.
+        k : int
+            Number of assets in the portfolio.
+        min_pos, max_pos : float
+            Weight bounds applied when the objective uses position bounds.
+        top_k : int
+            Number of results to keep.
+        n_candidates : int, optional (default=25)
+            Number of assets outside the current set considered for each swap.
+        max_rounds : int, optional (default=20)
+            Maximum number of swap rounds.
+
+    Returns:
+    --------
+        dict with the top_k best combinations evaluated as a ResultTable under 'table', best 
+        first, and the 'solves' and solver 'iterations' counts, as _solve_packages returns for
+        a chunk.  'pruned' is always 0.
+    '''
+    n=len(universe_mean)
+    k=min(k, n)
+    if objective.position_bounds:
+        bounds=tuple((min_pos, max_pos) for x in range(k))
+        upper=max_pos
+    else:
+        bounds=tuple((0, 1) for x in range(k))
+        upper=1.0
+    initializer=np.full(k, 1.0 / k)
+    workspace=SolverWorkspace(k)
+    solved={}
+    rows=[]
+    iterations=0
+
+    def _evaluate(assets):
+        nonlocal iterations
+        key=tuple(sorted(assets))
+        if key not in solved:
+            package=np.array(key, dtype=np.intp)
+            row, optimal=objective.solve_row(universe_mean[package],
+                                             universe_cov[np.ix_(package, package)],
+                                             bounds,
+                                             initializer,
+                                             workspace)
+            solved[key]=objective.score_row(row)
+            rows.append(row)
+            iterations+=optimal['nit']
+        return solved[key]
+
+    def _better(a, b):
+        return a > b if objective.largest else a < b
+
+    #Rank assets by relaxed weight, then by their own statistic as a single-asset portfolio.
+    relaxed=_relaxed_weights(objective.rank_by, objective.largest, universe_mean, universe_cov, upper)
+    own={'return': universe_mean,
+         'volatility': np.sqrt(np.diag(universe_cov)),
+         'sharpe': universe_mean / np.sqrt(np.diag(universe_cov))}[objective.rank_by]
+    if not objective.largest:
+        own=-own
+    ranking=list(np.lexsort((-own, -relaxed)))
+
+    current=ranking[:k]
+    best=_evaluate(current)
+    for _ in range(max_rounds):
+        candidates=[j for j in ranking if j not in current][:n_candidates]
+        best_swap=None
+        for i in range(k):
+            for j in candidates:
+                swapped=current[:i] + [j] + current[i + 1:]
+                score=_evaluate(swapped)
+                if _better(score, best):
+                    best, best_swap=score, swapped
+        if best_swap is None:
+            break
+        current=best_swap
+
+    table=ResultTable([row[0] for row in rows],
+                      list(solved),
+                      [row[1] for row in rows],
+                      [row[2] for row in rows],
+                      [row[3] for row in rows],
+                      tickers)
+    return {'table': table.top(top_k, objective.rank_by, objective.largest),
+            'pruned': 0,
+            'solves': len(solved),
+            'iterations': iterations}
@@ -0,0 +1,363 @@
+'''
+@author: Kevin Vecmanis
+
+Solvers for the single-combination problems PortfolioOptimizer has to answer.  Every
+problem has the same feasible set - weights inside per-asset (min, max) bounds that sum
+to 1 - and each solver takes advantage of the structure of its objective:
+
+    max_return_weights - a linear objective, solved exactly by filling the best assets first.
+    min_volatility_weights - a small quadratic program, solved with an active-set method.
+    max_sharpe_weights - SLSQP with the exact gradient of the Sharpe ratio.
+    efficient_frontier - a sweep of warm-started active-set solves along target returns.
+
+Each solver returns a dict with the same 'x', 'nit' and 'success' keys as the result of
+scipy.optimize.minimize, and accepts a starting point x0 and a SolverWorkspace that can be
+shared by every solve on combinations of the same size.  SciPy is only imported by
+max_sharpe_weights, the one solver that uses it.
+'''
+#Standard Python libary imports
+import numpy as np
+
+#Local imports
+
+#3rd party imports
+
+
+def _split_bounds(bounds, n):
+    '''
+    Converts a sequence of (min, max) pairs into lower and upper bound arrays, checking
+    that weights summing to 1 can satisfy them.
+    '''
+    bounds=np.asarray(bounds, dtype=float).reshape(n, 2)
+    lower=bounds[:, 0].copy()
+    upper=bounds[:, 1].copy()
+    if (lower.sum() > 1 + 1e-12 or upper.sum() < 1 - 1e-12):
+        raise ValueError('No weights summing to 1 satisfy bounds %s' % (bounds.tolist(),))
+    return lower, upper
+
+
+class SolverWorkspace:
+    '''
+    Buffers and constraint definitions reused across solves on n-asset combinations, so a
+    sweep over thousands of combinations doesn't rebuild them for every solve.
+
+    Parameters:
+    -----------
+        n : int
+            Number of assets per combination.
+    '''
+
+    def __init__(self, n):
+        self.n_=n
+        self.ones_=np.ones(n)
+        self.cov_weights_=np.empty(n)
+        self.gradient_=np.empty(n)
+        self.zeros_=np.zeros(n)
+        self.budget_row_=np.ones((1, n))
+        self.budget_={'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: self.ones_}
+        self.returns_=None
+        self.cov_matrix_=None
+        self._bounds={}
+
+    def split_bounds(self, bounds):
+        '''
+        Cached _split_bounds for the bounds tuples the optimizer reuses.
+        '''
+        key=tuple(map(tuple, bounds))
+        if key not in self._bounds:
+            self._bounds[key]=_split_bounds(bounds, self.n_)
+        return self._bounds[key]
+
+    def negative_sharpe(self, weights):
+        '''
+        Negative Sharpe ratio of the loaded combination and its exact gradient
+
+            d(-S)/dw = -mu / vol + (mu'w) * Cw / vol^3
+        '''
+        cov_weights=np.dot(self.cov_matrix_, weights, out=self.cov_weights_)
+        variance=weights @ cov_weights
+        vol=np.sqrt(variance)
+        port_return=self.returns_ @ weights
+        gradient=np.multiply(self.returns_, -1.0 / vol, out=self.gradient_)
+        gradient+=(port_return / (variance * vol)) * cov_weights
+        return -port_return / vol, gradient.copy()
+
+    def vol_headroom(self, weights, max_vol):
+        '''
+        How far the loaded combination's volatility is below max_vol, max_vol - sqrt(w'Cw).
+        '''
+        return max_vol - np.sqrt(weights @ self.cov_matrix_ @ weights)
+
+    def vol_headroom_jac(self, weights, max_vol):
+        cov_weights=self.cov_matrix_ @ weights
+        return -cov_weights / np.sqrt(weights @ cov_weights)
+
+
+def warm_start_weights(previous_package, previous_weights, package, bounds):
+    '''
+    Maps the solution for a previous combination onto a new one: assets the two share keep
+    their weights, new assets split whatever weight is left, and the result is projected
+    back inside the bounds.  Neighbouring combinations in lexicographic order share all but
+    one asset, so this usually starts the solver close to the new optimum.
+
+    Both packages are sorted arrays of universe indices, as streamed by _iter_packages.
+    '''
+    position=np.minimum(np.searchsorted(previous_package, package), len(previous_package) - 1)
+    shared=previous_package[position] == package
+    x0=np.where(shared, previous_weights[position], 0.0)
+    new=~shared
+    if new.any():
+        x0[new]=max(1.0 - x0.sum(), 0.0) / new.sum()
+    return project_weights(x0, bounds)
+
+
+def portfolio_performance(weights, returns, cov_matrix):
+    '''
+    Parameters:
+    -----------
+        weights: array, asset weights in the portfolio.
+        returns: array, annualized mean return of each asset.
+        cov_matrix: array, annualized covariance matrix of the assets.
+
+    Returns:
+    --------
+        tuple, portfolio return, volatility and Sharpe ratio (risk-free rate of 0).
+    '''
+    port_return=returns @ weights
+    port_vol=np.sqrt(weights @ cov_matrix @ weights)
+    return port_return, port_vol, port_return / port_vol
+
+
+def project_weights(weights, bounds):
+    '''
+    Euclidean projection of weights onto the set of bounded weights summing to 1.  The
+    projection is clip(weights - t, min, max) for the shift t that makes the weights sum
+    to 1.  That sum is piecewise linear in t with a breakpoint wherever an asset leaves or
+    reaches a bound, so t is found exactly by walking the sorted breakpoints.
+    '''
+    weights=np.asarray(weights, dtype=float)
+    lower, upper=_split_bounds(bounds, len(weights))
+    n=len(weights)
+    if (abs(weights.sum() - 1.0) < 1e-12 and np.all(weights >= lower) and np.all(weights <= upper)):
+        return weights
+
+    #As t increases an asset leaves its upper bound at weights - upper, reducing the slope 
+    #of the sum by 1, and reaches its lower bound at weights - lower, restoring it.
+    events=np.concatenate([weights - upper, weights - lower])
+    changes=np.concatenate([-np.ones(n), np.ones(n)])
+    order=np.argsort(events, kind='stable')
+    events=events[order]
+    slopes=np.cumsum(changes[order])
+    sums=upper.sum() + np.concatenate([[0.0], np.cumsum(slopes[:-1] * np.diff(events))])
+
+    j=int(np.argmax(sums <= 1.0))
+    if (j == 0 or slopes[j - 1] == 0):
+        shift=events[j]
+    else:
+        shift=events[j - 1] + (sums[j - 1] - 1.0) / -slopes[j - 1]
+    return np.clip(weights - shift, lower, upper)
+
+
+def max_return_weights(returns, bounds, x0=None, workspace=None):
+    '''
+    Maximizes portfolio return.  With a linear objective and box plus budget constraints
+    the optimum is found greedily: every asset starts at its minimum weight and what's left
+    of the budget goes to the highest-returning assets, each up to its maximum weight.
+    '''
+    returns=np.asarray(returns, dtype=float)
+    if workspace is None:
+        workspace=SolverWorkspace(len(returns))
+    lower, upper=workspace.split_bounds(bounds)
+    weights=lower.copy()
+    remaining=1.0 - lower.sum()
+    for i in np.argsort(-returns, kind='stable'):
+        if (remaining <= 0):
+            break
+        add=min(upper[i] - lower[i], remaining)
+        weights[i]+=add
+        remaining-=add
+    return {'x': weights, 'nit': 1, 'success': True}
+
+
+def solve_qp(Q, c, A, lower, upper, x0, max_iter=200, tol=1e-12):
+    '''
+    Primal active-set method for the small convex quadratic program
+
+        minimize 0.5 * x'Qx + c'x   subject to   Ax = Ax0,  lower <= x <= upper
+
+    starting from a point x0 inside the bounds.  Each iteration solves the equality-constrained
+    problem over the assets not pinned to a bound, then either steps towards its solution
+    until a bound blocks or releases the pinned asset with the most negative multiplier.
+
+    Returns:
+    --------
+        dict, the solution 'x', iteration count 'nit', 'success' and the final working set
+        'active' (-1 at lower bound, 1 at upper bound, 0 free).
+    '''
+    Q=np.asarray(Q, dtype=float)
+    c=np.asarray(c, dtype=float)
+    A=np.atleast_2d(np.asarray(A, dtype=float))
+    n=len(c)
+    m=A.shape[0]
+    x=np.array(x0, dtype=float)
+    scale=max(1.0, np.abs(Q).max())
+
+    #Every asset starts free.  One sitting on a bound that the first step would push
+    #through gets pinned by the ratio test with a zero-length step.
+    active=np.zeros(n, dtype=np.int8)
+    active[lower == upper]=-1
+
+    for nit in range(1, max_iter + 1):
+        free=np.flatnonzero(active == 0)
+        nf=len(free)
+        grad=Q @ x + c
+
+        kkt=np.zeros((nf + m, nf + m))
+        kkt[:nf, :nf]=Q[np.ix_(free, free)]
+        kkt[:nf, nf:]=A[:, free].T
+        kkt[nf:, :nf]=A[:, free]
+        rhs=np.concatenate([-grad[free], np.zeros(m)])
+        try:
+            solution=np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            solution=np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        step=np.zeros(n)
+        step[free]=solution[:nf]
+
+        if (np.abs(step).max() <= 1e-12):
+            #Multipliers of the pinned bounds: an asset at its lower bound should want to
+            #move up (r >= 0) and one at its upper bound should want to move down (r <= 0).
+            multipliers=np.linalg.lstsq(A[:, free].T, -grad[free], rcond=None)[0] if nf else \
+                        np.linalg.lstsq(A.T, -grad, rcond=None)[0]
+            r=grad + A.T @ multipliers
+            violation=np.where(active == -1, -r, np.where(active == 1, r, 0.0))
+            violation[lower == upper]=0.0
+            j=int(np.argmax(violation))
+            if (violation[j] <= tol * scale):
+                return {'x': x, 'nit': nit, 'success': True, 'active': active}
+            active[j]=0
+            continue
+
+        alpha=1.0
+        blocking=-1
+        for i in free:
+            if (step[i] < 0):
+                t=(lower[i] - x[i]) / step[i]
+                if (t < alpha):
+                    alpha, blocking, side=t, i, -1
+            elif (step[i] > 0):
+                t=(upper[i] - x[i]) / step[i]
+                if (t < alpha):
+                    alpha, blocking, side=t, i, 1
+        x=x + max(alpha, 0.0) * step
+        if (blocking >= 0):
+            active[blocking]=side
+            x[blocking]=lower[blocking] if side == -1 else upper[blocking]
+
+    return {'x': x, 'nit': max_iter, 'success': False, 'active': active}
+
+
+def min_volatility_weights(cov_matrix, bounds, x0=None, workspace=None):
+    '''
+    Minimizes portfolio volatility by solving the quadratic program min w'Cw over the
+    bounded weights summing to 1.
+    '''
+    cov_matrix=np.asarray(cov_matrix, dtype=float)
+    n=len(cov_matrix)
+    if workspace is None:
+        workspace=SolverWorkspace(n)
+    lower, upper=workspace.split_bounds(bounds)
+    if x0 is None:
+        x0=np.full(n, 1.0 / n)
+    x0=project_weights(x0, bounds)
+    result=solve_qp(cov_matrix, workspace.zeros_, workspace.budget_row_, lower, upper, x0)
+    del result['active']
+    return result
+
+
+def max_sharpe_weights(returns, cov_matrix, bounds, x0=None, workspace=None, max_vol=None):
+    '''
+    Maximizes the Sharpe ratio with SLSQP, supplying the exact gradient from 
+    SolverWorkspace.negative_sharpe so no finite-difference evaluations are needed.  With 
+    max_vol the portfolio volatility is also kept at or below max_vol.
+    '''
+    from scipy import optimize
+
+    returns=np.asarray(returns, dtype=float)
+    n=len(returns)
+    if workspace is None:
+        workspace=SolverWorkspace(n)
+    workspace.returns_=returns
+    workspace.cov_matrix_=np.asarray(cov_matrix, dtype=float)
+    if x0 is None:
+        x0=np.full(n, 1.0 / n)
+    constraints=workspace.budget_
+    if max_vol is not None:
+        constraints=[workspace.budget_, {'type': 'ineq', 'fun': workspace.vol_headroom, 'jac': workspace.vol_headroom_jac, 'args': (max_vol,)}]
+
+    result=optimize.minimize(
+        workspace.negative_sharpe,
+        x0,
+        jac=True,
+        method='SLSQP',
+        bounds=bounds,
+        constraints=constraints,
+    )
+    return {'x': result['x'], 'nit': result['nit'], 'success': bool(result['success'])}
+
+
+def efficient_frontier(returns, cov_matrix, bounds, n_points=50):
+    '''
+    Traces the efficient frontier of one asset combination: the minimum volatility weights
+    for each of n_points target returns evenly spaced from the return of the minimum 
+    volatility portfolio up to the highest return the bounds allow.
+
+    Each point is a quadratic program min w'Cw with the extra equality mu'w = target, solved
+    by solve_qp.  The start for the next target moves the previous solution towards the 
+    maximum return weights just far enough to reach the new target.  As a convex combination
+    of two feasible points it is feasible, and it is close to the next solution, so each 
+    solve only takes a few active-set iterations.
+
+    Parameters:
+    -----------
+        returns: array, annualized mean return of each asset.
+        cov_matrix: array, annualized covariance matrix of the assets.
+        bounds: sequence of (min, max) weight bounds for each asset.
+        n_points: int, optional (default=50), the number of points on the frontier.
+
+    Returns:
+    --------
+        dict, arrays 'weights' (n_points, assets), 'returns', 'vols' and 'sharpes' of the 
+        frontier portfolios, as fractions, in order of increasing return and volatility, and
+        the total active-set iterations 'nit'.
+    '''
+    returns=np.asarray(returns, dtype=float)
+    cov_matrix=np.asarray(cov_matrix, dtype=float)
+    n=len(returns)
+    workspace=SolverWorkspace(n)
+    lower, upper=workspace.split_bounds(bounds)
+    constraints=np.vstack([workspace.ones_, returns])
+
+    lowest=min_volatility_weights(cov_matrix, bounds, workspace=workspace)
+    highest=max_return_weights(returns, bounds, workspace=workspace)['x']
+    targets=np.linspace(returns @ lowest['x'], max(returns @ highest, returns @ lowest['x']), n_points)
+
+    weights=np.empty((n_points, n))
+    weights[0]=lowest['x']
+    nit=lowest['nit']
+    for i in range(1, n_points):
+        previous=weights[i - 1]
+        gap=returns @ highest - returns @ previous
+        step=0.0 if gap <= 0 else min(1.0, (targets[i] - returns @ previous) / gap)
+        x0=previous + step * (highest - previous)
+        result=solve_qp(cov_matrix, workspace.zeros_, constraints, lower, upper, x0)
+        weights[i]=result['x']
+        nit+=result['nit']
+
+    port_returns=weights @ returns
+    port_vols=np.sqrt(np.einsum('ij,jk,ik->i', weights, cov_matrix, weights))
+    return {'weights': weights,
+            'returns': port_returns,
+            'vols': port_vols,
+            'sharpes': port_returns / port_vols,
+            'nit': nit}
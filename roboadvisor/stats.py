@@ -0,0 +1,223 @@
+'''
+@author: Kevin Vecmanis
+'''
+#Standard Python libary imports
+import numpy as np
+from collections import deque
+
+#Local imports
+
+#3rd party imports
+
+
+class RunningMoments:
+    '''
+    Running mean vector and covariance matrix of a stream of return rows, so that a new
+    daily bar only costs an O(n^2) update instead of recomputing the statistics over the
+    whole history.
+
+    By default every row pushed is weighted equally (Welford's algorithm) and the results
+    match returns.mean(axis=0) and np.cov(returns, rowvar=False).  With a window only the
+    most recent window rows count, and with a halflife rows are exponentially weighted.
+
+    Parameters:
+    -----------
+        n : int
+            Number of assets (columns) in each row.
+        window : int, optional (default=None)
+            Number of most recent rows the statistics cover.  None covers every row.
+        halflife : float, optional (default=None)
+            Number of rows after which a row's weight halves.  Can't be combined with window.
+    '''
+
+    def __init__(self, n, window=None, halflife=None):
+        if (window is not None and halflife is not None):
+            raise ValueError('Use either window or halflife, not both')
+        if (window is not None and window < 2):
+            raise ValueError('window must be at least 2')
+        self.n_=n
+        self.window_=window
+        self.halflife_=halflife
+        self.alpha_=None if halflife is None else 1.0 - 0.5 ** (1.0 / halflife)
+        self.rows_=deque()
+        self.reset()
+
+    def reset(self):
+        '''
+        Forgets every row pushed so far.
+        '''
+        self.count_=0
+        self.mean_=np.zeros(self.n_)
+        self._m2=np.zeros((self.n_, self.n_))
+        self.rows_.clear()
+
+    def update(self, row):
+        '''
+        Pushes one row, dropping the oldest one when a window is full.
+        '''
+        row=np.asarray(row, dtype=float)
+        if self.alpha_ is not None:
+            if (self.count_ == 0):
+                self.mean_=row.copy()
+            else:
+                delta=row - self.mean_
+                self.mean_+=self.alpha_ * delta
+                self._m2=(1.0 - self.alpha_) * (self._m2 + self.alpha_ * np.outer(delta, delta))
+            self.count_+=1
+            return
+
+        self.count_+=1
+        delta=row - self.mean_
+        self.mean_+=delta / self.count_
+        self._m2+=np.outer(delta, row - self.mean_)
+        if self.window_ is not None:
+            self.rows_.append(row)
+            if (self.count_ > self.window_):
+                self._remove(self.rows_.popleft())
+
+    def _remove(self, row):
+        '''
+        Reverses the Welford update for a row leaving the window.
+        '''
+        self.count_-=1
+        delta=row - self.mean_
+        self.mean_-=delta / self.count_
+        self._m2-=np.outer(row - self.mean_, delta)
+
+    def extend(self, rows):
+        '''
+        Pushes a block of rows.  Equally weighted blocks are merged in one step from the
+        block's own mean and centred cross-products.
+        '''
+        rows=np.asarray(rows, dtype=float).reshape(-1, self.n_)
+        if (len(rows) == 0):
+            return
+        if self.window_ is not None:
+            if (len(rows) >= self.window_):
+                self.reset()
+                rows=rows[-self.window_:]
+                self.rows_.extend(rows)
+                self._merge(rows)
+            else:
+                for row in rows:
+                    self.update(row)
+            return
+        if self.alpha_ is not None:
+            for row in rows:
+                self.update(row)
+            return
+        self._merge(rows)
+
+    def _merge(self, rows):
+        '''
+        Combines the statistics so far with those of a block of rows (Chan et al.).
+        '''
+        count=len(rows)
+        mean=rows.mean(axis=0)
+        centred=rows - mean
+        m2=centred.T @ centred
+        total=self.count_ + count
+        delta=mean - self.mean_
+        self._m2=self._m2 + m2 + np.outer(delta, delta) * (self.count_ * count / total)
+        self.mean_=self.mean_ + delta * (count / total)
+        self.count_=total
+
+    def cov(self):
+        '''
+        The covariance matrix of the rows.  Equally weighted statistics use the n - 1
+        denominator like np.cov.
+        '''
+        if self.alpha_ is not None:
+            return self._m2.copy()
+        return self._m2 / max(self.count_ - 1, 1)
+
+
+class QuantileSketch:
+    '''
+    Mergeable sketch of a distribution that answers quantile queries with a bounded relative
+    error, in the manner of DDSketch.  Values are counted in logarithmically sized bins, so 
+    its size only grows with the range of the values, not their number, and two sketches 
+    merge exactly by adding their counts.  The result therefore doesn't depend on how the 
+    values were split into batches.
+
+    Parameters:
+    -----------
+        relative_accuracy : float, optional (default=0.005)
+            Every quantile is within this fraction of the true value.
+    '''
+
+    def __init__(self, relative_accuracy=0.005):
+        if not (0 < relative_accuracy < 1):
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        self.relative_accuracy_=relative_accuracy
+        self.gamma_=(1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma=np.log(self.gamma_)
+        self.positive_={}
+        self.negative_={}
+        self.zeros_=0
+        self.count_=0
+        self.min_=np.inf
+        self.max_=-np.inf
+
+    def _add(self, bins, values):
+        keys, counts=np.unique(np.ceil(np.log(values) / self._log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            bins[key]=bins.get(key, 0) + count
+
+    def extend(self, values):
+        '''
+        Adds a batch of values.
+        '''
+        values=np.asarray(values, dtype=float).ravel()
+        if (len(values) == 0):
+            return
+        self._add(self.positive_, values[values > 0])
+        self._add(self.negative_, -values[values < 0])
+        self.zeros_+=int(np.count_nonzero(values == 0))
+        self.count_+=len(values)
+        self.min_=min(self.min_, float(values.min()))
+        self.max_=max(self.max_, float(values.max()))
+
+    def merge(self, other):
+        '''
+        Adds the values of another sketch with the same relative accuracy.
+        '''
+        if (other.gamma_ != self.gamma_):
+            raise ValueError('Only sketches with the same relative accuracy can be merged')
+        for bins, other_bins in ((self.positive_, other.positive_), (self.negative_, other.negative_)):
+            for key, count in other_bins.items():
+                bins[key]=bins.get(key, 0) + count
+        self.zeros_+=other.zeros_
+        self.count_+=other.count_
+        self.min_=min(self.min_, other.min_)
+        self.max_=max(self.max_, other.max_)
+        return self
+
+    def _clip(self, value):
+        return min(max(value, self.min_), self.max_)
+
+    def quantile(self, q):
+        '''
+        The q-th quantile, 0 <= q <= 1, or nan when no values were added.  The minimum and
+        maximum are exact.
+        '''
+        if (self.count_ == 0):
+            return np.nan
+        if (q <= 0):
+            return self.min_
+        if (q >= 1):
+            return self.max_
+        rank=q * (self.count_ - 1)
+        seen=0
+        for key in sorted(self.negative_, reverse=True):
+            seen+=self.negative_[key]
+            if (seen > rank):
+                return self._clip(-2 * self.gamma_ ** key / (self.gamma_ + 1))
+        seen+=self.zeros_
+        if (seen > rank):
+            return 0.0
+        for key in sorted(self.positive_):
+            seen+=self.positive_[key]
+            if (seen > rank):
+                return self._clip(2 * self.gamma_ ** key / (self.gamma_ + 1))
+        return self.max_
@@ -0,0 +1,74 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import os
+import time
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.cache import ResultCache, content_key
+
+
+def _panel(periods=10):
+    index=pd.bdate_range('2019-01-01', periods=periods)
+    return pd.DataFrame({'SPY_Adj_Close': np.linspace(100.0, 110.0, periods),
+                         'TLT_Adj_Close': np.linspace(120.0, 115.0, periods)}, index=index)
+
+
+class TestContentKey(unittest.TestCase):
+
+    def test_key_follows_content(self):
+        """Test that the key changes with the prices and settings but not with object identity
+        """
+        key=content_key(_panel(), portfolio_size=2, max_pos=1.0)
+        self.assertEqual(key, content_key(_panel(), max_pos=1.0, portfolio_size=2))
+        self.assertNotEqual(key, content_key(_panel(11), portfolio_size=2, max_pos=1.0))
+        self.assertNotEqual(key, content_key(_panel(), portfolio_size=2, max_pos=0.5))
+        changed=_panel()
+        changed.iloc[-1, 0]+=0.01
+        self.assertNotEqual(key, content_key(changed, portfolio_size=2, max_pos=1.0))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root=tempfile.mkdtemp()
+
+    def test_round_trip_through_disk(self):
+        """Test that a stored result is found by a new cache on the same directory
+        """
+        ResultCache(self.root).put('a', [np.arange(3), 1.5])
+        cache=ResultCache(self.root)
+        value=cache.get('a')
+        np.testing.assert_array_equal(value[0], np.arange(3))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.hits_, cache.misses_), (1, 1))
+
+    def test_memory_layer_is_bounded(self):
+        """Test that the in-memory layer only keeps the most recently used results
+        """
+        cache=ResultCache(memory_items=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(list(cache.memory_), ['a', 'c'])
+        self.assertIsNone(cache.get('b'))
+
+    def test_disk_eviction(self):
+        """Test that the least recently used files are deleted to stay within max_bytes
+        """
+        cache=ResultCache(self.root, max_bytes=2500, memory_items=0)
+        for key in ('a', 'b'):
+            cache.put(key, np.zeros(100))
+            time.sleep(0.01)
+        cache.get('a')
+        time.sleep(0.01)
+        cache.put('c', np.zeros(100))
+        self.assertEqual(sorted(os.listdir(self.root)), ['a.pkl', 'c.pkl'])
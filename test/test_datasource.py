@@ -0,0 +1,88 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.datasource import LocalPriceStore, CachedPriceSource, PriceSource, TickerNotFoundError
+
+
+def _bars(periods=10):
+    index=pd.bdate_range('2019-01-01', periods=periods)
+    prices=np.linspace(100.0, 110.0, periods)
+    return pd.DataFrame({'Close': prices, 'Volume': 1000.0, 'Adj_Close': prices}, index=index)
+
+
+class _DictSource(PriceSource):
+
+    def __init__(self, bars):
+        self.bars=bars
+        self.calls=0
+
+    def get(self, ticker, start_date=None):
+        self.calls+=1
+        if ticker not in self.bars:
+            raise TickerNotFoundError(ticker)
+        df=self.bars[ticker]
+        if start_date is not None:
+            df=df[df.index >= pd.Timestamp(start_date)]
+        return df
+
+
+class TestLocalPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store=LocalPriceStore(tempfile.mkdtemp())
+
+    def test_write_and_read(self):
+        """Test that stored bars round-trip through the column files
+        """
+        bars=_bars()
+        self.store.write('SPY', bars)
+        stored=self.store.get('SPY')
+        self.assertEqual(list(stored.columns), list(bars.columns))
+        np.testing.assert_allclose(stored['Adj_Close'].values, bars['Adj_Close'].values)
+        self.assertEqual(self.store.last_date('SPY'), bars.index[-1])
+
+    def test_append_only_new_bars(self):
+        """Test that append skips bars that are already stored
+        """
+        bars=_bars(20)
+        self.store.write('SPY', bars.iloc[:12])
+        appended=self.store.append('SPY', bars.iloc[8:])
+        self.assertEqual(appended, 8)
+        np.testing.assert_allclose(self.store.get('SPY')['Adj_Close'].values, bars['Adj_Close'].values)
+
+    def test_missing_ticker(self):
+        """Test that unknown tickers raise TickerNotFoundError
+        """
+        self.assertRaises(TickerNotFoundError, self.store.get, 'XXXXX')
+
+
+class TestCachedPriceSource(unittest.TestCase):
+
+    def test_remote_only_hit_once(self):
+        """Test that a stored ticker is served without going back to the remote source
+        """
+        remote=_DictSource({'SPY': _bars()})
+        source=CachedPriceSource(LocalPriceStore(tempfile.mkdtemp()), remote)
+        source.get('SPY')
+        source.get('SPY')
+        self.assertEqual(remote.calls, 1)
+        self.assertRaises(TickerNotFoundError, source.get, 'XXXXX')
+
+    def test_refresh_appends(self):
+        """Test that refresh=True tops up the store with newer bars
+        """
+        bars=_bars(15)
+        remote=_DictSource({'SPY': bars.iloc[:10]})
+        source=CachedPriceSource(LocalPriceStore(tempfile.mkdtemp()), remote, refresh=True)
+        source.get('SPY')
+        remote.bars['SPY']=bars
+        self.assertEqual(len(source.get('SPY')), 15)
@@ -0,0 +1,29 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import os
+import sys
+import unittest
+import subprocess
+
+#3rd party imports
+
+#Local imports
+
+
+class TestImports(unittest.TestCase):
+
+    def test_optional_libraries_not_imported(self):
+        """Test that importing the optimizer and rebalancer loads neither SciPy, matplotlib, quandl nor the config
+        """
+        script=('import sys\n'
+                'import roboadvisor.optimizer, roboadvisor.rebalancer\n'
+                'print([name for name in ("scipy", "matplotlib", "quandl", "config.config") if name in sys.modules])\n')
+        root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output=subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
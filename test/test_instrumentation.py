@@ -0,0 +1,69 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import io
+import unittest
+import contextlib
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.instrumentation import Instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_records_and_callbacks(self):
+        """Test that a stage's counts reach the callbacks and are summed over runs in metrics_
+        """
+        records=[]
+        instrumentation=Instrumentation(callbacks=[records.append], verbose=False)
+        for n in (2, 3):
+            with instrumentation.stage('optimize') as stage:
+                stage.count('solver_calls', n)
+        self.assertEqual([record.counts for record in records], [{'solver_calls': 2}, {'solver_calls': 3}])
+        self.assertEqual(instrumentation.metrics_['optimize']['calls'], 2)
+        self.assertEqual(instrumentation.metrics_['optimize']['counts'], {'solver_calls': 5})
+        self.assertIs(instrumentation.last_['optimize'], records[-1])
+        self.assertGreaterEqual(records[-1].wall, 0.0)
+        self.assertIsNone(records[-1].peak_memory)
+
+    def test_printing(self):
+        """Test that only outermost stages are printed, with their notes, and verbose=False is silent
+        """
+        out=io.StringIO()
+        with contextlib.redirect_stdout(out):
+            instrumentation=Instrumentation()
+            with instrumentation.stage('fetch_data', 'fetch data') as stage:
+                stage.note('Omitted assets: ', [])
+                with instrumentation.stage('inner'):
+                    pass
+        lines=out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Omitted assets:  []')
+        self.assertTrue(lines[2].startswith('Time to fetch data: '))
+        self.assertEqual(len(lines), 4)
+        self.assertIn('inner', instrumentation.metrics_)
+
+        out=io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with Instrumentation(verbose=False).stage('fetch_data'):
+                pass
+        self.assertEqual(out.getvalue(), '')
+
+    def test_peak_memory(self):
+        """Test that a nested stage's allocations count towards the enclosing stage's peak
+        """
+        instrumentation=Instrumentation(verbose=False, trace_memory=True)
+        with instrumentation.stage('outer'):
+            with instrumentation.stage('inner'):
+                block=bytearray(4 * 2**20)
+                del block
+        inner=instrumentation.last_['inner'].peak_memory
+        outer=instrumentation.last_['outer'].peak_memory
+        self.assertGreaterEqual(inner, 4 * 2**20)
+        self.assertGreaterEqual(outer, inner)
+
+
+if __name__ == '__main__':
+    unittest.main()
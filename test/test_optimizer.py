@@ -0,0 +1,301 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import threading
+import numpy as np
+import pandas as pd
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.datasource import SyntheticPriceSource, PriceSource, TickerNotFoundError
+from roboadvisor.optimizer import PortfolioOptimizer
+from roboadvisor.profiles import ClientProfile
+from roboadvisor.instrumentation import Instrumentation
+from roboadvisor.cache import ResultCache
+
+
+class _CountingSource(SyntheticPriceSource):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls=0
+
+    def get(self, ticker, start_date=None):
+        self.calls+=1
+        return super().get(ticker, start_date)
+
+
+class _HistorySource(SyntheticPriceSource):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.days=len(self.index_)
+
+    def get(self, ticker, start_date=None):
+        return super().get(ticker, start_date).iloc[:self.days]
+
+
+class _ReversedSource(PriceSource):
+
+    def __init__(self, source, missing):
+        self.source=source
+        self.missing=missing
+        self.finished=[]
+        self.done={ticker: threading.Event() for ticker in source.tickers_}
+
+    def get(self, ticker, start_date=None):
+        #Each ticker waits for the next one, so concurrent fetches finish in reverse order.
+        i=self.source.tickers_.index(ticker)
+        if (i + 1 < len(self.source.tickers_)):
+            self.done[self.source.tickers_[i + 1]].wait(timeout=10)
+        self.finished.append(ticker)
+        self.done[ticker].set()
+        if (ticker == self.missing):
+            raise TickerNotFoundError(ticker)
+        return self.source.get(ticker, start_date)
+
+
+def _optimizer(source, **kwargs):
+    kwargs.setdefault('portfolio_size', 3)
+    kwargs.setdefault('max_pos', 0.6)
+    return PortfolioOptimizer(source.tickers_, price_source=source, print_init=False,
+                              instrumentation=Instrumentation(verbose=False), **kwargs)
+
+
+class TestLazyOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.source=_CountingSource(6, 300, seed=2)
+
+    def test_construction_does_no_work(self):
+        """Test that a lazy optimizer doesn't fetch or solve anything until a result is read
+        """
+        p=_optimizer(self.source, lazy=True)
+        self.assertEqual(self.source.calls, 0)
+        self.assertEqual(p.fitted_objectives_, [])
+        self.assertEqual(p.instrumentation_.metrics_, {})
+        self.assertNotIn('raw_asset_data', p.__dict__)
+        self.assertNotIn('max_iters_', p.__dict__)
+
+    def test_result_attribute_fits_its_objective(self):
+        """Test that reading best_sharpe_portfolio_ fetches the data and solves only the Sharpe objective
+        """
+        p=_optimizer(self.source, lazy=True)
+        best=p.best_sharpe_portfolio_
+        self.assertEqual(self.source.calls, 6)
+        self.assertEqual(p.fitted_objectives_, ['sharpe'])
+        self.assertNotIn('vol_scores_', p.__dict__)
+        self.assertEqual(best[4], _optimizer(self.source).best_sharpe_portfolio_[4])
+        self.assertEqual(p.max_iters_, 20)
+        p.vol_scores_
+        self.assertEqual(p.fitted_objectives_, ['sharpe', 'volatility'])
+
+    def test_public_methods_on_unfitted_instance(self):
+        """Test that every public method works on a lazy optimizer that hasn't been fitted
+        """
+        def _lazy():
+            p=_optimizer(self.source, lazy=True, max_iters=8, random_state=0)
+            p.sim_iterations_=50
+            return p
+
+        _lazy().fit(objectives=['return'])
+        p=_lazy()
+        p.portfolio_simulation()
+        self.assertEqual(p.sim_returns_.shape, (8, 50))
+        self.assertEqual(len(_lazy().efficient_frontier(n_points=5)['returns']), 5)
+        p=_lazy()
+        self.assertEqual(len(p.portfolio_stats([0.2, 0.3, 0.5], assets=['SYN0000', 'SYN0001', 'SYN0002'])), 3)
+        self.assertEqual(len(_lazy().portfolio_stats([0.2, 0.3, 0.5])), 3)
+        _lazy().optimize(objectives=['volatility'])
+        for method in ('optimize_for_sharpe', 'optimize_for_return', 'optimize_for_volatility'):
+            getattr(_lazy(), method)()
+        self.assertEqual(len(_lazy().optimize_profiles([ClientProfile(portfolio_size=3)])), 1)
+        p=_lazy()
+        bar=self.source.get('SYN0000').index[-1] + np.timedelta64(1, 'D')
+        p.update(p.raw_asset_data.iloc[-1].rename(bar).rename(lambda column: column.split('_')[0]))
+        self.assertEqual(len(p.raw_asset_data), 301)
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def test_concurrent_fetch(self):
+        """Test that columns come back in ticker order whatever order fetches finish in, and a missing ticker is only recorded
+        """
+        synthetic=SyntheticPriceSource(6, 300, seed=8)
+        source=_ReversedSource(synthetic, 'SYN0002')
+        p=PortfolioOptimizer(synthetic.tickers_, portfolio_size=3, price_source=source, print_init=False, lazy=True,
+                             fetch_workers=6, instrumentation=Instrumentation(verbose=False))
+        p._fetch_data()
+        self.assertEqual(source.finished, synthetic.tickers_[::-1])
+        self.assertEqual(p.asset_errors_, ['SYN0002'])
+        expected=[ticker + '_Adj_Close' for ticker in synthetic.tickers_ if ticker != 'SYN0002']
+        self.assertEqual(list(p.raw_asset_data.columns), expected)
+        np.testing.assert_array_equal(p.raw_asset_data['SYN0003_Adj_Close'].values, synthetic.prices_[:, 3])
+        self.assertEqual(p.n_combos_, 10)
+
+    def test_universe_stats_match_combination_stats(self):
+        """Test that a combination's sliced universe statistics equal its annualized pandas mean and covariance
+        """
+        p=_optimizer(SyntheticPriceSource(7, 300, seed=3), lazy=True, max_iters=6, random_state=2)
+        for package in np.vstack(list(p._iter_packages())):
+            assets=[p.universe_assets_[i] for i in package]
+            returns=np.log(p.raw_asset_data[assets] / p.raw_asset_data[assets].shift(1))
+            np.testing.assert_allclose(p.universe_mean_[package], returns.mean() * 252, rtol=1e-10)
+            np.testing.assert_allclose(p.universe_cov_[np.ix_(package, package)], returns.cov() * 252, rtol=1e-10)
+
+            p.portfolio_stats(np.full(len(package), 1 / len(package)), [asset.split('_')[0] for asset in assets])
+            np.testing.assert_allclose(p.return_matrix_, returns.mean() * 252, rtol=1e-10)
+            np.testing.assert_allclose(p.cov_matrix_, returns.cov() * 252, rtol=1e-10)
+
+    def test_prune_keeps_top_k(self):
+        """Test that pruning keeps the same top_k combinations with scores within solver tolerance
+        """
+        source=SyntheticPriceSource(12, 500, seed=1)
+        full=_optimizer(source, portfolio_size=4, max_pos=0.5, top_k=10)
+        pruned=_optimizer(source, portfolio_size=4, max_pos=0.5, top_k=10, prune=True)
+        self.assertGreater(min(pruned.pruned_counts_.values()), 0)
+        for attr, column in (('sharpe', 'sharpes_'), ('return', 'returns_'), ('vol', 'vols_')):
+            expected, found=[dict(zip(map(tuple, table.packages_), getattr(table, column)))
+                             for table in (getattr(full, attr + '_scores_'), getattr(pruned, attr + '_scores_'))]
+            self.assertEqual(set(found), set(expected))
+            for package, score in found.items():
+                self.assertAlmostEqual(score, expected[package], delta=1e-2)
+
+    def test_heuristic_counts(self):
+        """Test that a heuristic run records the solver calls and iterations it made
+        """
+        source=SyntheticPriceSource(12, 300, seed=6)
+        p=_optimizer(source, portfolio_size=4, top_k=5, selection='heuristic')
+        for name in ('sharpe', 'return', 'volatility'):
+            self.assertGreaterEqual(p.solver_calls_[name], 5)
+            self.assertGreater(p.solver_iterations_[name], 0)
+        counts=p.instrumentation_.metrics_['optimize']['counts']
+        self.assertEqual(counts['solver_calls'], sum(p.solver_calls_.values()))
+        self.assertEqual(counts['solver_iterations'], sum(p.solver_iterations_.values()))
+        self.assertEqual(counts['pruned'], 0)
+
+    def test_process_pool_matches_serial(self):
+        """Test that optimizing on a process pool gives exactly the results of a serial run
+        """
+        source=SyntheticPriceSource(9, 300, seed=4)
+        serial=_optimizer(source, top_k=15, chunk_size=16, n_jobs=1)
+        pooled=_optimizer(source, top_k=15, chunk_size=16, n_jobs=2)
+        for attr in ('sharpe', 'return', 'vol'):
+            expected, found=getattr(serial, attr + '_scores_'), getattr(pooled, attr + '_scores_')
+            for column in ('packages_', 'weights_', 'returns_', 'vols_', 'sharpes_', 'orders_'):
+                np.testing.assert_array_equal(getattr(found, column), getattr(expected, column))
+        self.assertEqual(pooled.solver_calls_, serial.solver_calls_)
+
+    def test_pruned_process_pool_matches_serial(self):
+        """Test that a pruned run on a process pool prunes and solves exactly like a serial run
+        """
+        source=SyntheticPriceSource(10, 300, seed=9)
+        serial=_optimizer(source, portfolio_size=4, top_k=10, chunk_size=8, prune=True, n_jobs=1)
+        pooled=_optimizer(source, portfolio_size=4, top_k=10, chunk_size=8, prune=True, n_jobs=3)
+        self.assertGreater(210 // 8, PortfolioOptimizer._prune_lag)
+        self.assertGreater(min(serial.pruned_counts_.values()), 0)
+        self.assertEqual(pooled.pruned_counts_, serial.pruned_counts_)
+        self.assertEqual(pooled.solver_iterations_, serial.solver_iterations_)
+        for attr in ('sharpe', 'return', 'vol'):
+            expected, found=getattr(serial, attr + '_scores_'), getattr(pooled, attr + '_scores_')
+            for column in ('packages_', 'weights_', 'returns_', 'vols_', 'sharpes_', 'orders_'):
+                np.testing.assert_array_equal(getattr(found, column), getattr(expected, column))
+
+    def test_cache_hit_skips_solving(self):
+        """Test that fit() restores cached results without solving, and a different chunk_size misses the cache
+        """
+        source=SyntheticPriceSource(7, 300, seed=5)
+        cache=ResultCache()
+        solved=_optimizer(source, result_cache=cache, chunk_size=8)
+        restored=_optimizer(source, result_cache=cache, chunk_size=8, lazy=True).fit()
+        self.assertEqual(restored.cache_hits_, ['sharpe', 'return', 'volatility'])
+        self.assertNotIn('optimize', restored.instrumentation_.metrics_)
+        for attr in ('sharpe', 'return', 'vol'):
+            expected, found=getattr(solved, 'best_' + attr + '_portfolio_'), getattr(restored, 'best_' + attr + '_portfolio_')
+            np.testing.assert_array_equal(found[0], expected[0])
+            self.assertEqual(found[1:], expected[1:])
+
+        other=_optimizer(source, result_cache=cache, chunk_size=16, lazy=True).fit()
+        self.assertEqual(other.cache_hits_, [])
+        self.assertIn('optimize', other.instrumentation_.metrics_)
+
+    def test_update_matches_rebuild(self):
+        """Test that update() with new bars matches rebuilding on the extended prices, with and without a window
+        """
+        for stats_window in (None, 120):
+            source=_HistorySource(6, 302, seed=6)
+            source.days=300
+            updated=_optimizer(source, top_k=None, stats_window=stats_window)
+            prices=pd.DataFrame(source.prices_[300:], index=source.index_[300:], columns=source.tickers_)
+            updated.update(prices.iloc[0])
+            updated.update(prices)
+            source.days=302
+            rebuilt=_optimizer(source, top_k=None, stats_window=stats_window)
+
+            pd.testing.assert_frame_equal(updated.raw_asset_data, rebuilt.raw_asset_data, check_freq=False)
+            np.testing.assert_allclose(updated.universe_mean_, rebuilt.universe_mean_, rtol=1e-9)
+            np.testing.assert_allclose(updated.universe_cov_, rebuilt.universe_cov_, rtol=1e-9)
+            #Only the leading results are compared: the maximum Sharpe ratio of a combination
+            #whose assets all have negative returns has several local optima.
+            for attr, column in (('sharpe', 'sharpes_'), ('return', 'returns_'), ('vol', 'vols_')):
+                expected, found=[getattr(table, column)[:5] for table in (getattr(rebuilt, attr + '_scores_'), getattr(updated, attr + '_scores_'))]
+                np.testing.assert_allclose(found, expected, atol=1e-3)
+                best, expected=getattr(updated, 'best_' + attr + '_portfolio_'), getattr(rebuilt, 'best_' + attr + '_portfolio_')
+                self.assertEqual([ticker for ticker, weight in best[1]], [ticker for ticker, weight in expected[1]])
+                np.testing.assert_allclose(best[0], expected[0], atol=1e-3)
+
+    def test_update_date_labels(self):
+        """Test that update() accepts dates as strings and rejects a Series without a date
+        """
+        source=_HistorySource(6, 302, seed=6)
+        source.days=300
+        expected=_optimizer(source, max_iters=4, random_state=0)
+        prices=pd.DataFrame(source.prices_[300:], index=source.index_[300:], columns=source.tickers_)
+        expected.update(prices)
+
+        labels=[date.strftime('%Y-%m-%d') for date in source.index_[300:]]
+        for bars in (prices.iloc[0].rename(labels[0]), prices.set_axis(labels, axis=0)):
+            updated=_optimizer(source, max_iters=4, random_state=0)
+            updated.update(bars)
+            self.assertIsInstance(updated.raw_asset_data.index, pd.DatetimeIndex)
+            pd.testing.assert_frame_equal(updated.raw_asset_data, expected.raw_asset_data.iloc[:len(updated.raw_asset_data)],
+                                          check_freq=False)
+        self.assertEqual(len(updated.raw_asset_data), 302)
+
+        with self.assertRaises(ValueError):
+            updated.update(prices.iloc[1].rename(None))
+        self.assertEqual(len(updated.raw_asset_data), 302)
+
+    def test_portfolio_simulation(self):
+        """Test that the simulated portfolios use weights summing to 1 and agree with simulation_results
+        """
+        p=_optimizer(SyntheticPriceSource(6, 300, seed=7), lazy=True, max_iters=8, random_state=1)
+        p.sim_iterations_=40
+        np.random.seed(0)
+        p.portfolio_simulation(batch_size=8)
+        for array in (p.sim_returns_, p.sim_vols_, p.sim_sharpes_):
+            self.assertEqual(array.shape, (8, 40))
+
+        #The same draws, redone one portfolio at a time.
+        np.random.seed(0)
+        weights=np.random.dirichlet(np.ones(3), size=(8, 40))
+        np.testing.assert_allclose(weights.sum(axis=2), 1.0)
+        packages=np.vstack(list(p._iter_packages()))
+        self.assertEqual(len(p.simulation_results), 8)
+        for i, (package, result) in enumerate(zip(packages, p.simulation_results)):
+            returns=p.universe_mean_[package]
+            cov_matrix=p.universe_cov_[np.ix_(package, package)]
+            vols=np.sqrt([w @ cov_matrix @ w for w in weights[i]])
+            np.testing.assert_allclose(p.sim_returns_[i], weights[i] @ returns, rtol=1e-12)
+            np.testing.assert_allclose(p.sim_vols_[i], vols, rtol=1e-12)
+            np.testing.assert_allclose(p.sim_sharpes_[i], p.sim_returns_[i] / p.sim_vols_[i], rtol=1e-12)
+            self.assertEqual(result[0], [p.universe_assets_[j] for j in package])
+            for array, expected in zip(result[1:], (p.sim_returns_, p.sim_vols_, p.sim_sharpes_)):
+                np.testing.assert_array_equal(array, expected[i])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import numpy as np
+from itertools import combinations
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.profiles import ClientProfile, solve_profile_packages, merge_profile_best
+from roboadvisor.objectives import OBJECTIVES
+from roboadvisor.search import iter_combination_chunks
+
+
+class TestProfileSolves(unittest.TestCase):
+
+    def setUp(self):
+        rng=np.random.default_rng(3)
+        factors=rng.normal(size=(8, 12))
+        self.universe_cov=factors @ factors.T / 60
+        self.universe_mean=rng.normal(0.08, 0.05, 8)
+        self.packages=np.array(list(combinations(range(8), 3)), dtype=np.intp)
+
+    def test_caps(self):
+        """Test that capped portfolios respect their cap, an uncapped one matches the Sharpe objective and an unreachable cap finds nothing
+        """
+        caps=np.array([0.01, 0.2, 0.3, np.inf])
+        best=solve_profile_packages(self.packages, 0, self.universe_mean, self.universe_cov, caps, 0.05, 0.6)
+        self.assertIsNone(best[0])
+        for cap, found in zip(caps[1:], best[1:]):
+            self.assertLessEqual(found[4][1], cap * 100 + 1e-3)
+        self.assertLessEqual(best[1][0], best[2][0])
+
+        objective=OBJECTIVES['sharpe']
+        scores=[]
+        for package in self.packages:
+            row, _=objective.solve_row(self.universe_mean[package], self.universe_cov[np.ix_(package, package)],
+                                       [(0.05, 0.6)] * 3, np.full(3, 1 / 3))
+            scores.append(objective.score_row(row))
+        self.assertAlmostEqual(best[3][0], max(scores), places=3)
+
+    def test_chunks_merge_like_one_pass(self):
+        """Test that merging chunk results matches solving every combination in one chunk
+        """
+        caps=np.array([0.2, np.inf])
+        whole=solve_profile_packages(self.packages, 0, self.universe_mean, self.universe_cov, caps, 0.0, 1.0)
+        merged=[None] * len(caps)
+        order=0
+        for chunk in iter_combination_chunks(8, 3, chunk_size=9):
+            merge_profile_best(merged, solve_profile_packages(chunk, order, self.universe_mean, self.universe_cov, caps, 0.0, 1.0))
+            order+=len(chunk)
+        for a, b in zip(whole, merged):
+            self.assertEqual(a[:2], b[:2])
+            np.testing.assert_array_equal(a[2], b[2])
+
+    def test_group_key(self):
+        """Test that profiles differing only in their cap are solved together
+        """
+        self.assertEqual(ClientProfile(5.0, max_pos=0.4).group_key(), ClientProfile(9.0, max_pos=0.4).group_key())
+        self.assertNotEqual(ClientProfile(5.0, portfolio_size=4).group_key(), ClientProfile(5.0).group_key())
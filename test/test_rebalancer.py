@@ -0,0 +1,203 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import io
+import unittest
+import contextlib
+import numpy as np
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.datasource import SyntheticPriceSource
+from roboadvisor.optimizer import PortfolioOptimizer
+from roboadvisor.rebalancer import RebalancingSimulator
+from roboadvisor.instrumentation import Instrumentation
+
+
+class TestRebalancingSimulator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        source=SyntheticPriceSource(6, 400, seed=1)
+        cls.portfolio=PortfolioOptimizer(source.tickers_, portfolio_size=3, price_source=source, print_init=False,
+                                         max_pos=0.6, instrumentation=Instrumentation(verbose=False))
+
+    def simulator(self, **kwargs):
+        r=RebalancingSimulator(self.portfolio, **kwargs)
+        r.random_walk_iters_=200
+        return r
+
+    def test_quiet_instrumentation(self):
+        """Test that a quiet instrumentation silences the reports, which a verbose one prints as stage notes
+        """
+        for verbose in (False, True):
+            output=io.StringIO()
+            with contextlib.redirect_stdout(output):
+                r=RebalancingSimulator(self.portfolio, instrumentation=Instrumentation(verbose=verbose))
+                r.random_walk_iters_=50
+                r.run_simulation(seed=0)
+            if verbose:
+                self.assertIn('Cash balance after portfolio initialization', output.getvalue())
+                self.assertIn('SIMULATION REPORT', output.getvalue())
+                self.assertIn('Time to run rebalancing simulation', output.getvalue())
+            else:
+                self.assertEqual(output.getvalue(), '')
+            self.assertIn('SIMULATION REPORT', r.instrumentation_.last_['run_simulation'].notes)
+            self.assertEqual(len(r.instrumentation_.last_['rebalancer_init'].notes), 2)
+
+    def test_random_walks(self):
+        """Test that the walks match compounding each asset's draws one step at a time
+        """
+        r=self.simulator()
+        np.random.seed(0)
+        walks=r._random_walks(paths=2)
+        self.assertEqual(walks.shape, (2, len(r.asset_list_), 201))
+
+        np.random.seed(0)
+        for path in walks:
+            for walk, (asset, price, mu, vol, weight) in zip(path, r.starting_vals_):
+                expected=[price]
+                for x in np.random.normal(mu, vol, 200) + 1:
+                    expected.append(expected[-1] * x)
+                np.testing.assert_array_equal(walk, expected)
+
+    def test_monte_carlo_blocks(self):
+        """Test that drawing the walks in blocks of paths doesn't change the Monte Carlo results
+        """
+        for batched in (True, False):
+            results=[]
+            for block_bytes in (RebalancingSimulator._walk_block_bytes, 1):
+                r=self.simulator(frac_units=False)
+                r._walk_block_bytes=block_bytes
+                r.run_monte_carlo(iterations=3, batched=batched, seed=1)
+                results.append([np.array(history) for history in (r.sim_port_vals_, r.sim_cash_history_, r.sim_trade_history_)])
+            for history, expected in zip(*results):
+                np.testing.assert_array_equal(history, expected)
+            self.assertEqual(len(results[0][0]), 3)
+
+    def test_batched_engine(self):
+        """Test that the batched engine matches stepping one path at a time on the same draws
+        """
+        for frac_units in (True, False):
+            for max_thresh, min_thresh in ((1.1, 0.9), (1.02, 0.98)):
+                r=self.simulator(frac_units=frac_units, max_thresh=max_thresh, min_thresh=min_thresh, starting_cash=5000)
+                r.run_monte_carlo(iterations=4, batched=False, seed=2)
+                scalar=[np.array(history) for history in (r.sim_port_vals_, r.sim_weight_vals_, r.sim_holding_history_,
+                                                          r.sim_cash_history_, r.sim_trade_history_)]
+                r.run_monte_carlo(iterations=4, seed=2)
+                batched=[r.sim_port_vals_, r.sim_weight_vals_, r.sim_holding_history_, r.sim_cash_history_, r.sim_trade_history_]
+                for expected, history in zip(scalar, batched):
+                    np.testing.assert_array_equal(history, expected)
+                self.assertGreater(batched[4].sum(), 0)
+
+    def test_summary(self):
+        """Test that summary statistics match those of the full histories and the sample keeps the first paths
+        """
+        r=self.simulator(frac_units=False, max_thresh=1.03, min_thresh=0.97)
+        r._walk_block_bytes=20000
+        r.run_monte_carlo(iterations=12, seed=3)
+        port_vals, weights, trades=r.sim_port_vals_, r.sim_weight_vals_, r.sim_trade_history_
+        r.run_monte_carlo(iterations=12, summary=True, sample_paths=2, seed=3)
+        summary=r.sim_summary_
+
+        terminal=port_vals[:, -1]
+        self.assertEqual(summary.paths_, 12)
+        self.assertAlmostEqual(summary.terminal_mean_, terminal.mean(), places=6)
+        self.assertAlmostEqual(summary.terminal_std_, terminal.std(ddof=1), places=6)
+        self.assertEqual(summary.total_trades_, trades.sum())
+        self.assertAlmostEqual(summary.trades_std_, trades.sum(axis=1).std(ddof=1), places=9)
+        drawdowns=(1 - port_vals / np.maximum.accumulate(port_vals, axis=1)).max(axis=1)
+        self.assertAlmostEqual(summary.max_drawdown_, drawdowns.max(), places=12)
+        self.assertAlmostEqual(summary.drawdown_mean_, drawdowns.mean(), places=12)
+        np.testing.assert_array_equal(summary.weight_min_, weights.min(axis=(0, 1)))
+        np.testing.assert_array_equal(summary.weight_max_, weights.max(axis=(0, 1)))
+        np.testing.assert_allclose(summary.weight_mean_, weights.mean(axis=(0, 1)), rtol=1e-12)
+        np.testing.assert_allclose(summary.weight_std_, weights.reshape(-1, weights.shape[2]).std(axis=0, ddof=1), rtol=1e-10)
+        np.testing.assert_array_equal(r.sim_port_vals_, port_vals[:2])
+        np.testing.assert_array_equal(r.sim_weight_vals_, weights[:2])
+
+    def test_seeded_parallel(self):
+        """Test that a seeded run is reproduced exactly by a process pool and by the scalar engine
+        """
+        r=self.simulator(frac_units=False, max_thresh=1.03, min_thresh=0.97)
+        r._block_paths=2
+        runs=[]
+        for options in ({}, {'n_jobs': 2}, {'batched': False}):
+            r.run_monte_carlo(iterations=5, seed=11, **options)
+            runs.append([np.array(history) for history in (r.sim_port_vals_, r.sim_cash_history_, r.sim_trade_history_)])
+        for run in runs[1:]:
+            for history, expected in zip(run, runs[0]):
+                np.testing.assert_array_equal(history, expected)
+
+        summaries=[]
+        for n_jobs in (1, 2):
+            r.run_monte_carlo(iterations=5, seed=11, summary=True, n_jobs=n_jobs)
+            summaries.append(r.sim_summary_.as_dict())
+        self.assertEqual(summaries[0], summaries[1])
+        self.assertEqual(r.sim_seed_, 11)
+
+        r.run_monte_carlo(iterations=5, seed=12)
+        self.assertFalse(np.array_equal(r.sim_port_vals_, runs[0][0]))
+
+    def test_unseeded_run_records_seed(self):
+        """Test that re-running with the sim_seed_ an unseeded run recorded reproduces it
+        """
+        r=self.simulator(frac_units=False, max_thresh=1.03, min_thresh=0.97)
+        r.run_monte_carlo(iterations=3)
+        first=r.sim_seed_
+        port_vals=r.sim_port_vals_
+        self.assertIsNotNone(first)
+        r.run_monte_carlo(iterations=3)
+        self.assertNotEqual(r.sim_seed_, first)
+        r.run_monte_carlo(iterations=3, seed=first)
+        np.testing.assert_array_equal(r.sim_port_vals_, port_vals)
+        self.assertEqual(r.sim_seed_, first)
+
+    def test_stacked_policies(self):
+        """Test that stepping several policies on shared walks matches stepping each policy on its own
+        """
+        policies=[{'max_thresh': 1.02, 'min_thresh': 0.98, 'trade_cost': 1.0, 'frac_units': True},
+                  {'max_thresh': 1.05, 'min_thresh': 0.95, 'trade_cost': 5.99, 'frac_units': False},
+                  {'max_thresh': 1.1, 'min_thresh': 0.9, 'trade_cost': 0.0, 'frac_units': False}]
+        r=self.simulator(starting_cash=5000)
+        walks=r._random_walks(paths=3, seed=np.random.SeedSequence(5))
+        stacked, stats=r._step_paths(walks, summarize=True, policies=policies)
+        self.assertEqual(len(stats), 3)
+        for k, policy in enumerate(policies):
+            single=self.simulator(starting_cash=5000, **policy)
+            histories, expected=single._step_paths(walks, summarize=True)
+            for history, full in zip(histories, stacked):
+                np.testing.assert_array_equal(full[..., 3 * k:3 * (k + 1)], history)
+            for key in expected:
+                np.testing.assert_array_equal(stats[k][key], expected[key])
+
+    def test_sweep_policies(self):
+        """Test that a sweep gives each policy the results of its own seeded run, and its tracking error
+        """
+        r=self.simulator(starting_cash=5000)
+        grid={'max_thresh': [1.03, 1.1], 'frac_units': [True, False]}
+        results=r.sweep_policies(grid, iterations=4, seed=7)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(list(results['min_thresh']), [0.9] * 4)
+        self.assertEqual(list(results['frac_units']), [True, False, True, False])
+        for row in results.itertuples():
+            single=self.simulator(starting_cash=5000, max_thresh=row.max_thresh, frac_units=row.frac_units)
+            single.run_monte_carlo(iterations=4, seed=7)
+            port_vals=single.sim_port_vals_
+            self.assertAlmostEqual(row.terminal_mean, port_vals[:, -1].mean(), places=6)
+            self.assertEqual(row.trades_mean, single.sim_trade_history_.sum(axis=1).mean())
+            self.assertAlmostEqual(row.trade_cost_mean, row.trades_mean * 5.99, places=9)
+
+            walks=single.random_walks
+            benchmark=np.einsum('a,pad->pd', single.target_weights_, walks[:, :, 2:-1] / walks[:, :, 1:-2] - 1)
+            active=port_vals[:, 1:] / port_vals[:, :-1] - 1 - benchmark
+            self.assertAlmostEqual(row.tracking_error, (active.std(axis=1, ddof=1) * np.sqrt(252)).mean(), places=9)
+
+        with self.assertRaises(ValueError):
+            r.sweep_policies({'max_threshold': [1.1]}, iterations=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import numpy as np
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.results import ResultTable
+
+
+def _table(sharpes):
+    rows=len(sharpes)
+    packages=np.array([[i % 3, 3 + i % 2] for i in range(rows)])
+    weights=np.tile([0.25, 0.75], (rows, 1))
+    return ResultTable(weights, packages, np.arange(rows), np.arange(rows) + 10.0, sharpes, ['A', 'B', 'C', 'D', 'E'])
+
+
+class TestResultTable(unittest.TestCase):
+
+    def test_entry_format(self):
+        """Test that rows read back in the [weights, [(ticker, weight), ...], return, vol, sharpe] format
+        """
+        entry=_table([0.5, 0.7])[1]
+        np.testing.assert_array_equal(entry[0], [0.25, 0.75])
+        self.assertEqual(entry[1], [('B', 0.25), ('E', 0.75)])
+        self.assertEqual(entry[2:], [1.0, 11.0, 0.7])
+
+    def test_top_matches_sort(self):
+        """Test that the partitioned top k matches a full sort with ties going to the earlier row
+        """
+        sharpes=np.random.RandomState(0).randint(0, 20, size=200) / 10.0
+        table=_table(sharpes)
+        for largest in (True, False):
+            keys=-sharpes if largest else sharpes
+            expected=sorted(range(200), key=lambda i: (keys[i], i))[:15]
+            top=table.top(15, 'sharpe', largest)
+            self.assertEqual(list(top.orders_), expected)
+            self.assertEqual(table.threshold(15, 'sharpe', largest), sharpes[expected[-1]])
+        self.assertIsNone(table.threshold(500, 'sharpe'))
+
+    def test_merge_matches_whole(self):
+        """Test that keeping the top k of each part and of their concatenation matches the top k of the whole
+        """
+        sharpes=np.random.RandomState(1).randint(0, 20, size=100) / 10.0
+        table=_table(sharpes)
+        merged=ResultTable.empty(2, table.tickers_)
+        for start in range(0, 100, 30):
+            part=table.take(np.arange(start, min(start + 30, 100))).top(10, 'sharpe')
+            merged=ResultTable.concat([merged, part]).top(10, 'sharpe')
+        self.assertEqual(list(merged.orders_), list(table.top(10, 'sharpe').orders_))
+        self.assertEqual(len(merged[:3]), 3)
@@ -0,0 +1,108 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import numpy as np
+from itertools import combinations
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.search import unrank_combination, iter_combination_chunks, heuristic_search, TopK
+from roboadvisor.objectives import OBJECTIVES
+from roboadvisor.results import ResultTable
+from roboadvisor.optimizer import _solve_packages
+
+
+class TestCombinationStream(unittest.TestCase):
+
+    def test_unrank_matches_itertools(self):
+        """Test that unranking reproduces the itertools.combinations order
+        """
+        for rank, combo in enumerate(combinations(range(8), 3)):
+            self.assertEqual(unrank_combination(rank, 8, 3), list(combo))
+
+    def test_chunks_cover_every_combination(self):
+        """Test that the chunks stream every combination exactly once
+        """
+        chunks=list(iter_combination_chunks(7, 3, chunk_size=10))
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+        self.assertEqual([tuple(row) for row in np.vstack(chunks)], list(combinations(range(7), 3)))
+
+    def test_budget_samples_distinct_combinations(self):
+        """Test that max_iters visits a reproducible sample of distinct combinations
+        """
+        sample=np.vstack(list(iter_combination_chunks(30, 5, max_iters=500, seed=1)))
+        self.assertEqual(len({tuple(row) for row in sample}), 500)
+        again=np.vstack(list(iter_combination_chunks(30, 5, max_iters=500, seed=1)))
+        np.testing.assert_array_equal(sample, again)
+
+
+class TestTopK(unittest.TestCase):
+
+    def test_threshold(self):
+        """Test that the threshold is the k-th best score pushed, and None until k scores are kept
+        """
+        top=TopK(3, largest=False)
+        for score in [5, 1, 4]:
+            self.assertIsNone(top.threshold())
+            top.push(score)
+        self.assertEqual(top.threshold(), 5)
+        for score in [2, 3]:
+            top.push(score)
+        self.assertEqual(top.threshold(), 3)
+        self.assertEqual(len(top), 3)
+
+
+class TestResultMerge(unittest.TestCase):
+
+    def test_merge_matches_serial(self):
+        """Test that merging chunk results out of order like optimize() ranks like solving every combination at once
+        """
+        rng=np.random.default_rng(5)
+        factors=rng.normal(size=(9, 12))
+        universe_cov=factors @ factors.T / 50
+        universe_mean=rng.normal(0.08, 0.05, 9)
+        tickers=['A%d' % i for i in range(9)]
+        packages=np.array(list(combinations(range(9), 3)), dtype=np.intp)
+        names=['sharpe', 'return', 'volatility']
+        settings=(names, tickers, 0.05, 0.6, 10, False)
+        serial=_solve_packages(packages, 0, universe_mean, universe_cov, *settings)
+        merged=[ResultTable.empty(3, tickers) for name in names]
+        for first in (60, 0, 30):
+            partials=_solve_packages(packages[first:first + 30], first, universe_mean, universe_cov, *settings)
+            for j, (name, partial) in enumerate(zip(names, partials)):
+                objective=OBJECTIVES[name]
+                merged[j]=ResultTable.concat([merged[j], partial['table']]).top(10, objective.rank_by, objective.largest)
+        for table, expected in zip(merged, serial):
+            np.testing.assert_array_equal(table.orders_, expected['table'].orders_)
+            np.testing.assert_array_equal(table.weights_, expected['table'].weights_)
+            np.testing.assert_array_equal(table.sharpes_, expected['table'].sharpes_)
+
+
+class TestHeuristicSearch(unittest.TestCase):
+
+    def test_matches_exhaustive_on_small_universe(self):
+        """Test that the heuristic finds the exhaustive optimum on a small universe
+        """
+        rng=np.random.default_rng(7)
+        factors=rng.normal(size=(10, 14))
+        universe_cov=factors @ factors.T / 40
+        universe_mean=rng.normal(0.08, 0.06, 10)
+        tickers=['A%d' % i for i in range(10)]
+        bounds=[(0.05, 0.5)] * 3
+        for name in ('sharpe', 'return', 'volatility'):
+            objective=OBJECTIVES[name]
+            scores=[]
+            for combo in combinations(range(10), 3):
+                package=list(combo)
+                row, _=objective.solve_row(universe_mean[package], universe_cov[np.ix_(package, package)],
+                                           bounds if objective.position_bounds else [(0, 1)] * 3,
+                                           np.full(3, 1 / 3))
+                scores.append(objective.score_row(row))
+            best=max(scores) if objective.largest else min(scores)
+            found=heuristic_search(objective, universe_mean, universe_cov, tickers, 3, 0.05, 0.5, 5)
+            self.assertEqual(found['table'].column(objective.rank_by)[0], best)
+            self.assertGreaterEqual(found['solves'], len(found['table']))
+            self.assertGreater(found['iterations'], 0)
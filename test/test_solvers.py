@@ -0,0 +1,105 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import numpy as np
+import scipy.optimize as optimize
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.solvers import max_return_weights, min_volatility_weights, max_sharpe_weights, project_weights, warm_start_weights, efficient_frontier
+from roboadvisor.objectives import tangency_sharpe_bound, best_asset_return_bound, min_variance_vol_bound
+
+
+def _problem(seed, k=6):
+    rng=np.random.default_rng(seed)
+    factors=rng.normal(size=(k, k + 4))
+    return rng.normal(0.08, 0.05, k), factors @ factors.T / 20
+
+
+class TestSolvers(unittest.TestCase):
+
+    bounds=[(0.05, 0.4)] * 6
+    budget={'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+
+    def assertFeasible(self, weights):
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertTrue(np.all(weights >= 0.05 - 1e-12) and np.all(weights <= 0.4 + 1e-12))
+
+    def test_max_return(self):
+        """Test that the greedy fill matches a linear program
+        """
+        returns, _=_problem(0)
+        weights=max_return_weights(returns, self.bounds)['x']
+        expected=optimize.linprog(-returns, A_eq=np.ones((1, 6)), b_eq=[1], bounds=self.bounds)['x']
+        self.assertFeasible(weights)
+        self.assertAlmostEqual(returns @ weights, returns @ expected)
+
+    def test_min_volatility(self):
+        """Test that the active-set QP is at least as good as SLSQP
+        """
+        for seed in range(10):
+            _, cov_matrix=_problem(seed)
+            weights=min_volatility_weights(cov_matrix, self.bounds)['x']
+            expected=optimize.minimize(lambda w: w @ cov_matrix @ w, np.full(6, 1 / 6), method='SLSQP',
+                                       bounds=self.bounds, constraints=self.budget)['x']
+            self.assertFeasible(weights)
+            self.assertLessEqual(weights @ cov_matrix @ weights, expected @ cov_matrix @ expected + 1e-10)
+
+    def test_max_sharpe(self):
+        """Test that the analytic-gradient solve reaches the finite-difference optimum
+        """
+        returns, cov_matrix=_problem(3)
+        sharpe=lambda w: (returns @ w) / np.sqrt(w @ cov_matrix @ w)
+        weights=max_sharpe_weights(returns, cov_matrix, self.bounds)['x']
+        expected=optimize.minimize(lambda w: -sharpe(w), np.full(6, 1 / 6), method='SLSQP',
+                                   bounds=self.bounds, constraints=self.budget)['x']
+        self.assertFeasible(weights)
+        self.assertGreaterEqual(sharpe(weights), sharpe(expected) - 1e-6)
+
+    def test_infeasible_bounds(self):
+        """Test that bounds no budget can satisfy raise ValueError
+        """
+        self.assertRaises(ValueError, max_return_weights, np.ones(3), [(0.0, 0.2)] * 3)
+
+    def test_project_weights(self):
+        """Test that projection lands inside the feasible set
+        """
+        self.assertFeasible(project_weights(np.array([0.9, 0.5, 0.0, 0.0, 0.1, 0.0]), self.bounds))
+
+    def test_warm_start_weights(self):
+        """Test that shared assets keep their weights and new assets split the rest
+        """
+        x0=warm_start_weights(np.array([0, 1, 2]), np.array([0.5, 0.3, 0.2]), np.array([0, 2, 5]), [(0.0, 1.0)] * 3)
+        np.testing.assert_allclose(x0, [0.5, 0.2, 0.3])
+
+    def test_efficient_frontier(self):
+        """Test that every frontier point is the minimum volatility portfolio for its return
+        """
+        returns, cov_matrix=_problem(5)
+        frontier=efficient_frontier(returns, cov_matrix, self.bounds, n_points=15)
+        self.assertTrue(np.all(np.diff(frontier['returns']) > 0) and np.all(np.diff(frontier['vols']) > 0))
+        for weights, target in zip(frontier['weights'], frontier['returns']):
+            self.assertFeasible(weights)
+            expected=optimize.minimize(lambda w: w @ cov_matrix @ w, np.full(6, 1 / 6), method='SLSQP', bounds=self.bounds,
+                                       constraints=[self.budget, {'type': 'eq', 'fun': lambda w: returns @ w - target}],
+                                       options={'ftol': 1e-14})['x']
+            self.assertLessEqual(weights @ cov_matrix @ weights, expected @ cov_matrix @ expected + 1e-10)
+
+
+class TestPruningBounds(unittest.TestCase):
+
+    def test_bounds_hold(self):
+        """Test that the pruning bounds are never beaten by the constrained optimum
+        """
+        bounds=[(0.0, 1.0)] * 6
+        for seed in range(10):
+            returns, cov_matrix=_problem(seed)
+            sharpe_weights=max_sharpe_weights(returns, cov_matrix, bounds)['x']
+            vol_weights=min_volatility_weights(cov_matrix, bounds)['x']
+            sharpe=(returns @ sharpe_weights) / np.sqrt(sharpe_weights @ cov_matrix @ sharpe_weights)
+            self.assertLessEqual(sharpe, tangency_sharpe_bound(returns, cov_matrix) + 1e-9)
+            self.assertLessEqual(returns @ max_return_weights(returns, bounds)['x'], best_asset_return_bound(returns, cov_matrix) + 1e-12)
+            self.assertGreaterEqual(np.sqrt(vol_weights @ cov_matrix @ vol_weights), min_variance_vol_bound(returns, cov_matrix) - 1e-12)
@@ -0,0 +1,70 @@
+"""
+@author: Kevin Vecmanis
+"""
+#Standard Python library imports
+import unittest
+import numpy as np
+import pandas as pd
+
+#3rd party imports
+
+#Local imports
+from roboadvisor.stats import RunningMoments, QuantileSketch
+
+
+class TestRunningMoments(unittest.TestCase):
+
+    def setUp(self):
+        self.rows=np.random.RandomState(0).normal(size=(300, 4))
+
+    def test_matches_numpy(self):
+        """Test that a block followed by single rows matches the batch mean and covariance
+        """
+        moments=RunningMoments(4)
+        moments.extend(self.rows[:200])
+        for row in self.rows[200:]:
+            moments.update(row)
+        np.testing.assert_allclose(moments.mean_, self.rows.mean(axis=0), atol=1e-14)
+        np.testing.assert_allclose(moments.cov(), np.cov(self.rows, rowvar=False), atol=1e-14)
+
+    def test_window(self):
+        """Test that a rolling window only covers the most recent rows
+        """
+        moments=RunningMoments(4, window=50)
+        moments.extend(self.rows[:120])
+        for row in self.rows[120:]:
+            moments.update(row)
+        self.assertEqual(moments.count_, 50)
+        np.testing.assert_allclose(moments.mean_, self.rows[-50:].mean(axis=0), atol=1e-13)
+        np.testing.assert_allclose(moments.cov(), np.cov(self.rows[-50:], rowvar=False), atol=1e-13)
+
+    def test_halflife(self):
+        """Test that exponential weighting matches pandas' recursive ewm statistics
+        """
+        moments=RunningMoments(4, halflife=20)
+        moments.extend(self.rows)
+        ewm=pd.DataFrame(self.rows).ewm(halflife=20, adjust=False)
+        np.testing.assert_allclose(moments.mean_, ewm.mean().values[-1], atol=1e-14)
+        np.testing.assert_allclose(moments.cov(), ewm.cov(bias=True).values[-4:], atol=1e-14)
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_accuracy_and_merge(self):
+        """Test that quantiles are within the relative accuracy and don't depend on how values were batched
+        """
+        values=np.random.RandomState(1).lognormal(10, 0.5, 20000)
+        values[:10]*=-1
+        whole=QuantileSketch(0.01)
+        whole.extend(values)
+        merged=QuantileSketch(0.01)
+        for batch in np.array_split(values[::-1], 7):
+            part=QuantileSketch(0.01)
+            part.extend(batch)
+            merged.merge(part)
+        for q in (0, 0.0002, 0.05, 0.5, 0.95, 1):
+            exact=np.quantile(values, q, method='lower')
+            self.assertLessEqual(abs(whole.quantile(q) - exact), 0.01 * abs(exact))
+            self.assertEqual(merged.quantile(q), whole.quantile(q))
+        self.assertEqual(whole.quantile(0), values.min())
+        self.assertTrue(np.isnan(QuantileSketch().quantile(0.5)))